@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add project root to sys.path to allow imports from src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from wordfreq import top_n_list, word_frequency
+from src.wiki_scraper.analyze_relative_word_frequency import get_keyness_df
+
+NUMBER_OF_WORDS = 1_000_000
+LOOP_SAMPLE = 20_000
+
+
+def make_word_counts(number_of_words, seed=0):
+    """
+    Vocabulary of real English words followed by a long tail of made-up
+    ones (like names, IDs and typos in a real crawl), with Zipf-like counts.
+    """
+    rng = np.random.default_rng(seed)
+    real_words = top_n_list('en', 200_000)
+    fake_words = [f"move{i}" for i in range(number_of_words - len(real_words))]
+    words = real_words + fake_words
+    counts = np.minimum(rng.zipf(1.5, size=len(words)), 10 ** 6)
+    return dict(zip(words, counts.tolist()))
+
+
+def loop_scores(word_counts_dict, lang='en'):
+    """
+    The previous approach: one word_frequency call per word.
+    """
+    total = sum(word_counts_dict.values())
+    return [(word, count / total, word_frequency(word, lang))
+            for word, count in word_counts_dict.items()]
+
+
+def run_benchmark():
+    word_counts = make_word_counts(NUMBER_OF_WORDS)
+    get_keyness_df({"warm": 1})  # Load the wordfreq list once
+
+    start = time.perf_counter()
+    df = get_keyness_df(word_counts)
+    vectorized = time.perf_counter() - start
+
+    sample = dict(list(word_counts.items())[:LOOP_SAMPLE])
+    start = time.perf_counter()
+    loop_scores(sample)
+    loop = (time.perf_counter() - start) * NUMBER_OF_WORDS / LOOP_SAMPLE
+
+    print(f"Scored {len(df)} words")
+    print(f"Vectorized keyness: {vectorized:.2f} s")
+    print(f"Python loop (extrapolated from {LOOP_SAMPLE} words): "
+          f"{loop:.2f} s")
+    print(df.head(10))
+    return vectorized
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+# Add project root to sys.path to allow imports from src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.wiki_scraper.ngram_counter_class import NGramCounter
+
+NUMBER_OF_PAGES = 300
+WORDS_PER_PAGE = 2000
+VOCABULARY_SIZE = 30000
+
+
+def make_pages(seed=0):
+    """
+    Synthetic articles with Zipf-distributed words.
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(VOCABULARY_SIZE)]
+    weights = [1 / (i + 1) for i in range(VOCABULARY_SIZE)]
+    return [[rng.choices(vocabulary, weights, k=WORDS_PER_PAGE)]
+            for _ in range(NUMBER_OF_PAGES)]
+
+
+def count_unigrams(pages):
+    counts = Counter()
+    for segments in pages:
+        for words in segments:
+            counts.update(words)
+    return counts
+
+
+def count_joined_strings(pages, n):
+    counts = Counter()
+    for segments in pages:
+        for words in segments:
+            counts.update(" ".join(words[i:i + n])
+                          for i in range(len(words) - n + 1))
+    return counts
+
+
+def count_compact(pages, n, max_ngrams=None):
+    counter = NGramCounter(n, max_ngrams)
+    for segments in pages:
+        counter.add(counter.count_segments(segments))
+    return counter
+
+
+def measure(name, function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<38} {elapsed:6.2f} s  kept {current / 2 ** 20:6.1f} MB  "
+          f"peak {peak / 2 ** 20:6.1f} MB  entries {len(result)}")
+    return result
+
+
+def run_benchmark():
+    pages = make_pages()
+    measure("unigrams (Counter of strings)", count_unigrams, pages)
+    for n in (2, 3):
+        measure(f"{n}-grams (Counter of joined strings)",
+                count_joined_strings, pages, n)
+        measure(f"{n}-grams (NGramCounter)", count_compact, pages, n)
+        measure(f"{n}-grams (NGramCounter, pruned)", count_compact, pages, n,
+                50000)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,67 @@
+import os
+import random
+import sys
+import time
+
+# Add project root to sys.path to allow imports from src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bs4 import BeautifulSoup
+from src.wiki_scraper.boilerplate_pruner_class import BoilerplatePruner
+from src.wiki_scraper.scraper_class import Scraper
+from tests.local_wiki_server import make_article
+
+NUMBER_OF_PAGES = 30
+
+
+def make_page(rng):
+    """
+    Synthetic Bulbapedia-like article: a few paragraphs of text followed by
+    a learnset table, navigation boxes and references.
+    """
+    words = [f"word{i}" for i in range(3000)]
+    paragraphs = [" ".join(rng.choices(words, k=80)) for _ in range(8)]
+    learnset = "".join(
+        f"<tr><td>{level}</td><td><a href='/wiki/Move_{level}'>Move "
+        f"{level}</a></td><td>Normal</td><td>Physical</td><td>40</td>"
+        f"<td>100%</td><td>35</td></tr>" for level in range(120))
+    navboxes = "".join(
+        f"<table class='expandable'><tr><td>" + " ".join(
+            f"<a href='/wiki/Pokemon_{i}'>Pokémon {i}</a>"
+            for i in range(start, start + 150)) + "</td></tr></table>"
+        for start in range(0, 600, 150))
+    references = "<div class='mw-references-wrap'><ol class='references'>" + \
+        "".join(f"<li>Source {i}</li>" for i in range(40)) + "</ol></div>"
+    extra_html = (f"<table class='sortable'>{learnset}</table>{navboxes}"
+                  f"{references}")
+    return make_article("Article", paragraphs, extra_html=extra_html)
+
+
+def count_pages(pages, pruner):
+    """
+    :return: Seconds spent on parsing and counting the pages, and the total
+             number of counted words.
+    """
+    start = time.perf_counter()
+    total_words = 0
+    for html in pages:
+        scraper = Scraper("unused", "Article", pruner=pruner)
+        scraper.soup = BeautifulSoup(html, "html.parser")
+        total_words += sum(scraper.count_words().values())
+        scraper.get_children_phrases()
+    return time.perf_counter() - start, total_words
+
+
+def run_benchmark():
+    rng = random.Random(0)
+    pages = [make_page(rng) for _ in range(NUMBER_OF_PAGES)]
+    seconds, words = count_pages(pages, None)
+    print(f"without pruning:   {seconds:6.2f} s  {words} words")
+    pruner = BoilerplatePruner.from_profile("bulbapedia")
+    seconds, words = count_pages(pages, pruner)
+    print(f"bulbapedia profile: {seconds:5.2f} s  {words} words")
+    print(pruner.report())
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -1,10 +1,17 @@
 import os
 import json
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from wordfreq import top_n_list, word_frequency
+from wordfreq import top_n_list, word_frequency, get_frequency_dict
+from .term_matrix_class import TermMatrix
 
 DEFAULT_JSON_PATH = os.path.join(os.getcwd(), 'data', 'word-counts.json')
+DEFAULT_TERM_MATRIX_PATH = os.path.join(os.getcwd(), 'data',
+                                        'term-matrix.npz')
+# wordfreq gives only relative frequencies, so the language is treated as
+# a reference corpus of this many words when computing keyness
+DEFAULT_REFERENCE_SIZE = 10 ** 9
 
 def load_word_counts(json_path):
     """
@@ -101,6 +108,136 @@ def get_frequency_df(word_counts_dict, mode, count, lang='en'):
 
     return pd.DataFrame(data)
 
+def get_keyness_df(word_counts_dict, lang='en',
+                   reference_size=DEFAULT_REFERENCE_SIZE):
+    """
+    Scores every word of the articles for how over- or under-represented it
+    is compared with the language. All the words are processed at once with
+    NumPy (no Python loop over the vocabulary).
+
+    Scores:
+      - log-likelihood (G2) of the difference between the articles and the
+        language, signed: positive when the word is over-represented in the
+        articles, negative when it's under-represented,
+      - log-ratio: binary logarithm of the ratio of the relative frequencies
+        (0.5 is added to both counts, so words missing from the language get
+        a finite score).
+
+    Words are looked up in the wordfreq list as they are (words containing
+    punctuation, e.g. "ii/iv", usually aren't there and are treated as
+    absent from the language).
+    :param word_counts_dict: A dictionary where a word is a key and frequency
+                             in the articles is a value.
+    :param lang: The language code of processed words.
+    :param reference_size: Assumed number of words of the language corpus.
+    :return: A pandas DataFrame with a row for every word, sorted by the
+        signed log-likelihood (the most over-represented words first).
+    """
+    columns = ["word", "count in the article", "frequency in the article",
+               "frequency in the language", "log-likelihood", "log-ratio"]
+    if not word_counts_dict:
+        return pd.DataFrame(columns=columns)
+
+    words = pd.Index(list(word_counts_dict.keys()), dtype=object)
+    a = np.fromiter(word_counts_dict.values(), dtype=np.float64,
+                    count=len(word_counts_dict))
+    language_freq = pd.Series(get_frequency_dict(lang)) \
+        .reindex(words, fill_value=0.0).to_numpy(dtype=np.float64)
+
+    c = a.sum()  # Number of words in the articles
+    d = float(reference_size)  # Number of words in the language corpus
+    b = language_freq * d  # Expected occurrences in the language corpus
+
+    expected_a = c * (a + b) / (c + d)
+    expected_b = d * (a + b) / (c + d)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 0 * log(0) is treated as 0
+        term_a = np.where(a > 0, a * np.log(a / expected_a), 0.0)
+        term_b = np.where(b > 0, b * np.log(b / expected_b), 0.0)
+    log_likelihood = 2 * (term_a + term_b)
+    sign = np.where(a / c >= b / d, 1.0, -1.0)
+    log_ratio = np.log2(((a + 0.5) / c) / ((b + 0.5) / d))
+
+    df = pd.DataFrame({
+        "word": words,
+        "count in the article": a.astype(np.int64),
+        "frequency in the article": a / c,
+        "frequency in the language": language_freq,
+        "log-likelihood": sign * log_likelihood,
+        "log-ratio": log_ratio
+    })
+    order = np.argsort(-df["log-likelihood"].to_numpy(), kind="stable")
+    return df.iloc[order].reset_index(drop=True)
+
+def get_tfidf_matrix(term_matrix):
+    """
+    Computes TF-IDF scores of all the terms of all the articles at once,
+    directly on the stored values of the sparse matrix (no dense article x
+    term array is created).
+
+    TF is the share of the term in the article's words, IDF is the smoothed
+    ln((1 + articles) / (1 + articles with the term)) + 1, and every row is
+    scaled to unit (L2) length, so that long and short articles can be
+    compared.
+    :param term_matrix: Matrix of counts (see TermMatrix).
+    :type term_matrix: TermMatrix
+    :return: Matrix of the same shape with the TF-IDF scores.
+    :rtype: TermMatrix
+    """
+    number_of_articles = term_matrix.shape[0]
+    counts = term_matrix.data.astype(np.float64)
+    rows = term_matrix.row_ids()
+    article_lengths = np.bincount(rows, weights=counts,
+                                  minlength=number_of_articles)
+    tf = counts / article_lengths[rows]
+    idf = np.log((1 + number_of_articles) /
+                 (1 + term_matrix.document_frequencies())) + 1
+    scores = tf * idf[term_matrix.indices]
+    norms = np.sqrt(np.bincount(rows, weights=scores ** 2,
+                                minlength=number_of_articles))
+    return term_matrix.with_data(scores / norms[rows])
+
+def get_top_terms_df(term_matrix, count, titles=None, scores=None):
+    """
+    Finds the `count` most distinctive terms (highest TF-IDF) of every
+    article. All the articles are ranked with one sort of the stored values;
+    only the selected terms are put into the DataFrame.
+    :param term_matrix: Matrix of counts (see TermMatrix).
+    :param count: Number of terms per article.
+    :param titles: Titles of the articles to include (all if None).
+    :param scores: Matrix of scores with the structure of `term_matrix`
+                   (TF-IDF computed with get_tfidf_matrix if None).
+    :return: A pandas DataFrame with a row for every selected term: the
+        article, rank of the term in it (from 1), the term, its count and
+        score. Rows are ordered by article and rank.
+    """
+    columns = ["article", "rank", "word", "count in the article", "tf-idf"]
+    if scores is None:
+        scores = get_tfidf_matrix(term_matrix)
+    rows = term_matrix.row_ids()
+    # Sorted by the row, then by the descending score
+    order = np.lexsort((-scores.data, rows))
+    ranks = np.arange(len(order)) - term_matrix.indptr[rows]
+    selected = ranks < count
+    if titles is not None:
+        titles = set(titles)
+        wanted_rows = [i for i, title in enumerate(term_matrix.titles)
+                       if title in titles]
+        selected &= np.isin(rows, wanted_rows)
+    positions = order[selected]
+    if len(positions) == 0:
+        return pd.DataFrame(columns=columns)
+
+    article_titles = np.array(term_matrix.titles, dtype=object)
+    terms = np.array(term_matrix.terms, dtype=object)
+    return pd.DataFrame({
+        "article": article_titles[rows[positions]],
+        "rank": ranks[selected] + 1,
+        "word": terms[term_matrix.indices[positions]],
+        "count in the article": term_matrix.data[positions],
+        "tf-idf": scores.data[positions]
+    })
+
 def create_chart(df, chart_path):
     """
     Create a chart for the provided DataFrame and save it to a file with a
@@ -137,7 +274,8 @@ def create_chart(df, chart_path):
     finally:
         plt.close()
 
-def analyze_relative_word_frequency(mode, count, json_path=None, chart_path=None):
+def analyze_relative_word_frequency(mode, count, json_path=None, chart_path=None,
+                                    output_path=None, term_matrix_path=None):
     """
     Analyzes the relative word frequency from a JSON file and prints
     frequency distribution. Optionally, generates and saves a chart
@@ -145,7 +283,10 @@ def analyze_relative_word_frequency(mode, count, json_path=None, chart_path=None
 
     :param mode: The mode of analysis to apply when processing the word
                  frequency data. Determines how the data is filtered or
-                 grouped.
+                 grouped. In the 'keyness' mode every word is scored and the
+                 `count` most over-represented words are displayed. The
+                 'tfidf' mode shows the `count` most distinctive words of
+                 every article of a term matrix instead.
     :param count: The number of words to include in the analysis (if this
                   number is larger than the number of available words, then
                   the number of available words is included)
@@ -153,8 +294,31 @@ def analyze_relative_word_frequency(mode, count, json_path=None, chart_path=None
     :param chart_path: Optional path (with PNG extension) to save the
                        generated frequency chart as a file. If None, no
                        chart will be generated.
+    :param output_path: Optional path to a CSV file for the full sorted
+                        keyness table (only in the 'keyness' mode) or the
+                        top terms of all articles (the 'tfidf' mode).
+    :param term_matrix_path: Path to the term matrix (only in the 'tfidf'
+                             mode).
     :return: None
     """
+    if mode == 'tfidf':
+        if term_matrix_path is None:
+            term_matrix_path = DEFAULT_TERM_MATRIX_PATH
+        if not os.path.exists(term_matrix_path):
+            print(f"File {term_matrix_path} doesn't exist!")
+            return
+        top_terms_df = get_top_terms_df(TermMatrix.load(term_matrix_path),
+                                        count)
+        if top_terms_df.empty:
+            print("No data to display.")
+            return
+        if output_path:
+            top_terms_df.to_csv(output_path, index=False)
+        print(top_terms_df.to_string(index=False))
+        if chart_path:
+            print("Charts aren't available in the 'tfidf' mode.")
+        return
+
     if json_path is None:
         json_path = DEFAULT_JSON_PATH
     if not json_path:
@@ -163,6 +327,26 @@ def analyze_relative_word_frequency(mode, count, json_path=None, chart_path=None
     if word_counts_dict is None:
         return
 
+    if mode == 'keyness':
+        keyness_df = get_keyness_df(word_counts_dict)
+        if output_path:
+            keyness_df.to_csv(output_path, index=False)
+        df = keyness_df.head(count)
+        if df.empty:
+            print("No data to display.")
+            return
+        print(df)
+        if chart_path:
+            # Normalize frequencies like in the other modes
+            df_chart = df.copy()
+            for column in ("frequency in the article",
+                           "frequency in the language"):
+                maximum = df_chart[column].max()
+                if maximum > 0:
+                    df_chart[column] = df_chart[column] / maximum
+            create_chart(df_chart, chart_path)
+        return
+
     df = get_frequency_df(word_counts_dict, mode, count)
     if df.empty:
         print("No data to display.")
@@ -171,4 +355,4 @@ def analyze_relative_word_frequency(mode, count, json_path=None, chart_path=None
     print(df)
 
     if chart_path:
-        create_chart(df, chart_path)
\ No newline at end of file
+        create_chart(df, chart_path)
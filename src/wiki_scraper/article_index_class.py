@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+from collections import Counter
+
+
+def file_digest(path):
+    """
+    :return: SHA-256 digest of the file's content (hex).
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArticleIndex:
+    """
+    Per-article bookkeeping of counted articles, stored in a JSON file next
+    to the word counts. For every article it keeps its revision id, a hash
+    of its content, the HTTP validators (ETag/Last-Modified), its own word
+    counts and its outgoing links. Thanks to it counting an article again
+    replaces its previous contribution instead of adding it twice, and
+    unchanged articles don't have to be parsed again.
+    Every record also keeps the settings its counts were made with (e.g. the
+    pruning profile). An article counted with other settings is treated as
+    changed, even if the page itself is the same.
+    Records are keyed by the caller's title, which should be canonical (see
+    canonical_title), so that "pikachu" and "Pikachu" share a record.
+    """
+
+    def __init__(self, index_path, settings=None, counts_path=None):
+        """
+        :param index_path: Path to the JSON file of the index (it's created
+                           on save if it doesn't exist).
+        :type index_path: str
+        :param settings: JSON serializable settings which affect the counts
+                         of an article.
+        :type settings: dict | None
+        :param counts_path: Counts file saved together with the index (see
+                            save). A save of both which was interrupted
+                            after the index had been written is completed
+                            here, so the index has to be created before the
+                            counts are loaded.
+        :type counts_path: str | None
+        """
+        self.index_path = index_path
+        self.settings = settings
+        self.counts_path = counts_path
+        self.articles = {}
+        # Digest of the counts saved together with the index
+        self.counts_digest = None
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    content = json.load(f)
+            except (json.JSONDecodeError, ValueError):
+                # If a JSON file is empty or damaged, ignore its content
+                content = {}
+            if isinstance(content, dict) and "counts_digest" in content \
+                    and isinstance(content.get("articles"), dict):
+                self.articles = content["articles"]
+                self.counts_digest = content["counts_digest"]
+            else:
+                # Index saved before it had a counts digest
+                self.articles = content
+        if counts_path is not None:
+            self._finish_save()
+
+    def _pending_counts_path(self):
+        return f"{self.counts_path}.pending"
+
+    def _finish_save(self):
+        """
+        Completes an interrupted save (see save). If the index was written
+        with the digest of the pending counts, they replace the counts file.
+        Otherwise the save was interrupted before the index was written, so
+        the index and the counts file still match and the pending counts
+        are dropped.
+        """
+        pending_path = self._pending_counts_path()
+        if not os.path.exists(pending_path):
+            return
+        if self.counts_digest is not None and \
+                file_digest(pending_path) == self.counts_digest:
+            os.replace(pending_path, self.counts_path)
+            print(f"Completed the interrupted save of {self.counts_path}")
+        else:
+            os.remove(pending_path)
+
+    def __contains__(self, title):
+        return title in self.articles
+
+    def __len__(self):
+        return len(self.articles)
+
+    def get(self, title):
+        """
+        :return: Stored record of the article or None.
+        :rtype: dict | None
+        """
+        return self.articles.get(title)
+
+    def get_counts(self, title):
+        """
+        :return: Word counts stored for the article (empty if unknown).
+        :rtype: Counter
+        """
+        record = self.articles.get(title)
+        return Counter(record["counts"]) if record else Counter()
+
+    def get_links(self, title):
+        """
+        :return: Stored outgoing links of the article (empty if unknown).
+        :rtype: list[str]
+        """
+        record = self.articles.get(title)
+        return list(record["links"]) if record else []
+
+    def has_current_settings(self, title):
+        """
+        :return: True if the article was counted with the settings of this
+                 index.
+        :rtype: bool
+        """
+        record = self.articles.get(title)
+        return record is not None and record.get("settings") == self.settings
+
+    def conditional_headers(self, title):
+        """
+        Headers of a conditional request for the article, based on the
+        validators of its previous download. Articles counted with other
+        settings are requested unconditionally, they have to be counted
+        again anyway.
+        :rtype: dict
+        """
+        record = self.articles.get(title)
+        headers = {}
+        if self.has_current_settings(title):
+            if record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record.get("last_modified"):
+                headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    def is_unchanged(self, title, revision_id, content_hash):
+        """
+        Checks whether the article is the same as when it was counted. The
+        revision id is used if both versions have it, the content hash
+        otherwise. Counts made with other settings are never unchanged.
+        :rtype: bool
+        """
+        record = self.articles.get(title)
+        if not record or not self.has_current_settings(title):
+            return False
+        if revision_id is not None and record.get("revision") is not None:
+            return revision_id == record["revision"]
+        return content_hash is not None and \
+            content_hash == record.get("content_hash")
+
+    def update(self, title, revision_id, content_hash, counts, links,
+               etag=None, last_modified=None):
+        """
+        Stores (or replaces) the record of the article.
+        """
+        self.articles[title] = {
+            "revision": revision_id,
+            "content_hash": content_hash,
+            "etag": etag,
+            "last_modified": last_modified,
+            "counts": dict(counts),
+            "links": list(links),
+            "settings": self.settings
+        }
+
+    def update_validators(self, title, etag=None, last_modified=None):
+        """
+        Refreshes the HTTP validators of an unchanged article.
+        """
+        record = self.articles.get(title)
+        if record:
+            if etag:
+                record["etag"] = etag
+            if last_modified:
+                record["last_modified"] = last_modified
+
+    def save(self, save_counts=None):
+        """
+        Writes the index to its JSON file (atomically, so an interrupted
+        save doesn't destroy the previous index).
+        With `save_counts` the counts file is saved together with the index,
+        so that an interruption can't leave new counts with an old index
+        (the next run would count the same articles twice) or the other way
+        round. The counts are written to a pending file first, then the
+        index with the digest of the pending file, and at last the pending
+        file replaces the counts file. If the last step doesn't happen, the
+        next ArticleIndex of the counts file does it.
+        :param save_counts: Function which writes the counts to the given
+                            path (requires `counts_path`).
+        :type save_counts: Callable[[str], None] | None
+        """
+        if save_counts is not None and self.counts_path is None:
+            raise ValueError("Counts can't be saved with an index without "
+                             "a counts file")
+        temporary_path = f"{self.index_path}.tmp"
+        pending_path = None
+        try:
+            if save_counts is not None:
+                pending_path = self._pending_counts_path()
+                save_counts(pending_path)
+                self.counts_digest = file_digest(pending_path)
+            with open(temporary_path, 'w', encoding='utf-8') as f:
+                json.dump({"counts_digest": self.counts_digest,
+                           "articles": self.articles}, f, ensure_ascii=False)
+            os.replace(temporary_path, self.index_path)
+            if pending_path is not None:
+                os.replace(pending_path, self.counts_path)
+        except IOError as e:
+            raise IOError(f"Error while writing to {self.index_path}: {e}")
+
+
+def replace_contribution(total_counts, old_counts, new_counts):
+    """
+    Replaces the contribution of one article in the total counts: subtracts
+    its old counts and adds the new ones. Words whose count drops to zero are
+    removed.
+    :param total_counts: Counter updated in place.
+    :param old_counts: Previously added counts of the article.
+    :param new_counts: Current counts of the article.
+    """
+    total_counts.subtract(old_counts)
+    total_counts.update(new_counts)
+    for word in old_counts:
+        if total_counts[word] <= 0:
+            del total_counts[word]
@@ -0,0 +1,53 @@
+class ArticleRecord:
+    """
+    Compact result of processing one article: everything a consumer of a
+    crawl needs, without the parsed page.
+    """
+
+    def __init__(self, title, depth, counts, links, summary=None,
+                 bytes_fetched=0, new_words=0, previous_counts=None,
+                 unchanged=False):
+        """
+        :param title: Title of the article.
+        :type title: str
+        :param depth: Depth of the article in the crawl tree.
+        :type depth: int
+        :param counts: Word counts of the article.
+        :type counts: Counter
+        :param links: Titles of the linked articles.
+        :type links: list[str]
+        :param summary: First paragraph of the article.
+        :type summary: str | None
+        :param bytes_fetched: Size of the downloaded page.
+        :type bytes_fetched: int
+        :param new_words: Number of words of the article which weren't seen
+                          before in the crawl.
+        :type new_words: int
+        :param previous_counts: Counts of the article from an earlier crawl,
+                                replaced by `counts` (incremental mode).
+        :type previous_counts: Counter | None
+        :param unchanged: True if the article didn't change since an earlier
+                          crawl (`counts` are the stored ones).
+        :type unchanged: bool
+        """
+        self.title = title
+        self.depth = depth
+        self.counts = counts
+        self.links = links
+        self.summary = summary
+        self.bytes_fetched = bytes_fetched
+        self.new_words = new_words
+        self.previous_counts = previous_counts
+        self.unchanged = unchanged
+
+    @property
+    def novelty(self):
+        """
+        Share of the article's distinct words which were new to the crawl.
+        """
+        return self.new_words / len(self.counts) if self.counts else 0.0
+
+    def __repr__(self):
+        return (f"ArticleRecord(title={self.title!r}, depth={self.depth}, "
+                f"words={sum(self.counts.values())}, "
+                f"links={len(self.links)})")
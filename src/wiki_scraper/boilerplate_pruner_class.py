@@ -0,0 +1,225 @@
+import re
+import threading
+import time
+import soupsieve
+from bs4 import CData, NavigableString, Tag
+
+# Subtrees of MediaWiki article content which aren't part of the article's
+# text: edit links, navigation boxes, references, tables of contents,
+# hidden metadata and embedded scripts/styles
+MEDIAWIKI_SELECTORS = (
+    ".mw-editsection",
+    ".navbox",
+    ".vertical-navbox",
+    ".navbox-styles",
+    ".reflist",
+    ".mw-references-wrap",
+    "ol.references",
+    "sup.reference",
+    "#toc",
+    ".toc",
+    ".catlinks",
+    ".printfooter",
+    ".metadata",
+    ".noprint",
+    ".mw-empty-elt",
+    "[style*='display:none']",
+    "[style*='display: none']",
+    "script",
+    "style",
+    "noscript",
+)
+
+# Bulbapedia's templates on top of the MediaWiki ones: collapsible
+# navigation boxes at the bottom of articles (class "expandable"), sortable
+# learnset and stat tables, and the "Project" notices
+BULBAPEDIA_SELECTORS = MEDIAWIKI_SELECTORS + (
+    "table.expandable",
+    "table.sortable",
+    "table.roundy[style*='border: 2px solid']",
+    "div.messagebox",
+)
+
+PRUNING_PROFILES = {
+    "mediawiki": MEDIAWIKI_SELECTORS,
+    "bulbapedia": BULBAPEDIA_SELECTORS,
+}
+
+
+def selector_key(selector):
+    """
+    Finds what an element needs to have to possibly match a selector, so
+    that the (slow) full match is only tried on a few elements.
+    :return: ('id' | 'class' | 'attr' | 'tag', name), or None if the
+             selector can match any element.
+    :rtype: tuple[str, str] | None
+    """
+    # The last compound selector is the one matched against the element
+    # itself (attribute values may contain spaces, so they are hidden first)
+    without_values = re.sub(r"\[[^\]]*\]", "[]", selector.strip())
+    subject = re.split(r"\s*[\s>+~]\s*", without_values)[-1]
+    match = re.search(r"#([\w-]+)", subject)
+    if match:
+        return "id", match.group(1)
+    match = re.search(r"\.([\w-]+)", subject)
+    if match:
+        return "class", match.group(1)
+    if "[]" in subject:
+        attribute = re.findall(r"\[\s*([\w-]+)", selector)[-1]
+        return "attr", attribute
+    match = re.match(r"[a-zA-Z][\w-]*", subject)
+    if match:
+        return "tag", match.group(0).lower()
+    return None
+
+
+class BoilerplatePruner:
+    """
+    Removes boilerplate subtrees (matching CSS selectors) from a parsed page
+    before its text and links are extracted, which makes the extraction
+    faster and keeps template words out of the counts. The selectors are
+    compiled once and shared by all pages.
+
+    Matching every element against every selector (e.g. with
+    soupsieve.select) costs more than parsing the page, so the selectors are
+    indexed by their id, class, attribute or tag name, and an element is
+    only matched against the selectors it may satisfy. Subtrees which are
+    removed aren't visited at all.
+
+    After each page `last_report` describes what was removed; the totals
+    over all pages are kept as well (see report).
+    """
+
+    def __init__(self, selectors):
+        """
+        :param selectors: CSS selectors of the removed subtrees.
+        :type selectors: Iterable[str]
+        """
+        self.selectors = tuple(selectors)
+        if not self.selectors:
+            raise ValueError("At least one selector is required")
+        # Kind of the key -> name -> compiled selectors
+        self.index = {"id": {}, "class": {}, "attr": {}, "tag": {}}
+        # Selectors which have to be tried on every element
+        self.unindexed = []
+        for selector in self.selectors:
+            compiled = soupsieve.compile(selector)
+            key = selector_key(selector)
+            if key is None:
+                self.unindexed.append(compiled)
+            else:
+                kind, name = key
+                self.index[kind].setdefault(name, []).append(compiled)
+        self.last_report = None
+        self.pages = 0
+        self.removed_elements = 0
+        self.removed_chars = 0
+        self.kept_chars = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_profile(cls, profile):
+        """
+        Creates a pruner with the selectors of a named profile.
+        :param profile: 'mediawiki' or 'bulbapedia'.
+        :type profile: str
+        :rtype: BoilerplatePruner
+        """
+        if profile not in PRUNING_PROFILES:
+            raise ValueError(f"Invalid pruning profile: {profile}")
+        return cls(PRUNING_PROFILES[profile])
+
+    def prune(self, root):
+        """
+        Removes the matching subtrees from the root element (in place).
+        :param root: Element whose descendants are checked (e.g. the
+                     div#mw-content-text of an article).
+        :type root: bs4.Tag
+        :return: Report of the page: removed elements and characters of
+                 text, characters left and the duration in seconds.
+        :rtype: dict
+        """
+        start = time.perf_counter()
+        removed = []
+        kept_chars = 0
+        stack = [root]
+        while stack:
+            element = stack.pop()
+            for child in element.contents:
+                if isinstance(child, Tag):
+                    if self.matches(child):
+                        removed.append(child)
+                    else:
+                        stack.append(child)
+                elif type(child) in (NavigableString, CData):
+                    # The same strings as get_text() would return
+                    kept_chars += len(child)
+
+        removed_chars = 0
+        for element in removed:
+            removed_chars += len(element.get_text())
+            element.decompose()
+        removed_elements = len(removed)
+        seconds = time.perf_counter() - start
+
+        report = {
+            "removed_elements": removed_elements,
+            "removed_chars": removed_chars,
+            "kept_chars": kept_chars,
+            "seconds": seconds
+        }
+        with self._lock:
+            self.last_report = report
+            self.pages += 1
+            self.removed_elements += removed_elements
+            self.removed_chars += removed_chars
+            self.kept_chars += kept_chars
+            self.seconds += seconds
+        return report
+
+    def matches(self, element):
+        """
+        :return: Whether the element matches any of the selectors.
+        :rtype: bool
+        """
+        attributes = element.attrs
+        candidates = list(self.unindexed)
+        candidates += self.index["tag"].get(element.name, ())
+        if attributes:
+            element_id = attributes.get("id")
+            if element_id:
+                candidates += self.index["id"].get(element_id, ())
+            classes = attributes.get("class")
+            if classes:
+                for name in classes:
+                    candidates += self.index["class"].get(name, ())
+            for name, selectors in self.index["attr"].items():
+                if name in attributes:
+                    candidates += selectors
+        return any(selector.match(element) for selector in candidates)
+
+    @staticmethod
+    def describe(report):
+        """
+        :return: One-line description of a page report.
+        :rtype: str
+        """
+        total = report["removed_chars"] + report["kept_chars"]
+        share = report["removed_chars"] / total if total else 0.0
+        return (f"pruned {report['removed_elements']} elements, "
+                f"{report['removed_chars']} characters ({share:.0%} of the "
+                f"text) in {report['seconds'] * 1000:.1f} ms")
+
+    def report(self):
+        """
+        :return: Human-readable summary of the pruning of all pages.
+        :rtype: str
+        """
+        total = self.removed_chars + self.kept_chars
+        share = self.removed_chars / total if total else 0.0
+        average = self.seconds / self.pages if self.pages else 0.0
+        return (f"Boilerplate pruning: {self.pages} pages, "
+                f"{self.removed_elements} elements and {self.removed_chars} "
+                f"characters removed ({share:.0%} of the text), "
+                f"{average * 1000:.1f} ms per page")
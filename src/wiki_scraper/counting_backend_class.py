@@ -0,0 +1,498 @@
+import heapq
+import json
+import os
+import re
+import tempfile
+from collections import Counter
+
+# Rough memory cost of one counted word in a dict (the key string, the int
+# and the hash table slot). Used to turn a memory budget in bytes into a
+# number of words kept in memory.
+BYTES_PER_ENTRY = 160
+# Number of words loaded from a counts file at once (see iter_count_batches)
+LOAD_BATCH_SIZE = 10000
+
+_COUNT_PATTERN = re.compile(r"-?\d+")
+
+
+def write_counts_json(items, json_path):
+    """
+    Writes (word, count) pairs to a JSON file one by one, so that the
+    counts never have to be in memory at once. The output has the same
+    format as save_counter_to_json. The file is replaced atomically, so an
+    interrupted write leaves the previous counts.
+    :param items: Iterable of (word, count) pairs.
+    :param json_path: Path to the JSON file.
+    """
+    temporary_path = f"{json_path}.tmp"
+    try:
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            f.write("{")
+            separator = "\n"
+            for word, count in items:
+                f.write(f"{separator}    "
+                        f"{json.dumps(word, ensure_ascii=False)}: {count}")
+                separator = ",\n"
+            f.write("\n}" if separator != "\n" else "}")
+        os.replace(temporary_path, json_path)
+    except IOError as e:
+        raise IOError(f"Error while writing to {json_path}: {e}")
+
+
+def iter_counts_json(json_path, chunk_size=64 * 1024):
+    """
+    Reads (word, count) pairs of a counts file (a flat JSON object, as
+    written by save_counter_to_json or write_counts_json) one by one, so
+    that the file never has to be in memory at once. Like
+    load_counter_from_json, a missing or empty file gives no pairs; reading
+    stops with a warning at the first damaged part of the file.
+    :param json_path: Path to the JSON file.
+    :param chunk_size: Number of characters read from the file at once.
+    """
+    if not os.path.exists(json_path):
+        return
+    decoder = json.JSONDecoder()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        position = 0
+        eof = False
+
+        def fill():
+            # Appends the next chunk; tokens may be split between chunks
+            nonlocal buffer, position, eof
+            chunk = f.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+
+        expected = "{"  # "{", "key", ":", "count", "," or "end"
+        word = None
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    break
+                fill()
+                continue
+            character = buffer[position]
+            if expected == "{" and character == "{":
+                expected = "key"
+                position += 1
+            elif expected in ("key", ",") and character == "}":
+                expected = "end"
+                position += 1
+            elif expected == "," and character == ",":
+                expected = "key"
+                position += 1
+            elif expected == ":" and character == ":":
+                expected = "count"
+                position += 1
+            elif expected == "key" and character == '"':
+                try:
+                    word, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        break
+                    fill()
+                    continue
+                expected = ":"
+            elif expected == "count" and \
+                    _COUNT_PATTERN.match(buffer, position) is not None:
+                match = _COUNT_PATTERN.match(buffer, position)
+                if match.end() == len(buffer) and not eof:
+                    fill()  # The number may have more digits
+                    continue
+                yield word, int(match.group(0))
+                position = match.end()
+                expected = ","
+            else:
+                break
+        if expected not in ("{", "end"):
+            print(f"File {json_path} is damaged, only its beginning was "
+                  f"loaded")
+
+
+def iter_count_batches(json_path, batch_size=LOAD_BATCH_SIZE):
+    """
+    Reads a counts file in dictionaries of at most `batch_size` words, so
+    that a counting backend can load it without a full in-memory copy.
+    :rtype: Iterator[dict]
+    """
+    batch = {}
+    for word, count in iter_counts_json(json_path):
+        batch[word] = count
+        if len(batch) >= batch_size:
+            yield batch
+            batch = {}
+    if batch:
+        yield batch
+
+
+class BloomFilter:
+    """
+    Compact set of strings which answers "possibly seen" or "certainly not
+    seen" (a few bytes per word, instead of about BYTES_PER_ENTRY for a
+    stored word). It grows by adding filters of
+    doubling size, so the number of words doesn't have to be known in
+    advance; every new filter gets more bits per word, so that the false
+    positive rates of all the filters add up to about 2%. Hashes come from
+    hash(), so a filter is only valid within one process.
+    """
+    # Bits per word of the first filter (1% false positives) and the
+    # increase for every further one (halves its false positive rate)
+    BITS_PER_WORD = 10.0
+    BITS_PER_WORD_STEP = 1.5
+
+    def __init__(self, initial_capacity=1024):
+        """
+        :param initial_capacity: Number of words of the first filter.
+        :type initial_capacity: int
+        """
+        # Filters as [bits, number of bits, number of hashes, capacity,
+        # number of added words]
+        self.filters = []
+        self.added = 0
+        self.next_capacity = initial_capacity
+
+    @staticmethod
+    def _positions(word, number_of_bits, number_of_hashes):
+        # Double hashing: k positions from two halves of one 64-bit hash
+        value = hash(word) & 0xFFFFFFFFFFFFFFFF
+        first, second = value & 0xFFFFFFFF, (value >> 32) | 1
+        return [(first + i * second) % number_of_bits
+                for i in range(number_of_hashes)]
+
+    def __contains__(self, word):
+        for bits, number_of_bits, number_of_hashes, _, _ in self.filters:
+            if all(bits[p >> 3] & (1 << (p & 7)) for p in
+                   self._positions(word, number_of_bits, number_of_hashes)):
+                return True
+        return False
+
+    def add(self, word):
+        if word in self:
+            return
+        if not self.filters or self.filters[-1][4] >= self.filters[-1][3]:
+            bits_per_word = self.BITS_PER_WORD + \
+                self.BITS_PER_WORD_STEP * len(self.filters)
+            number_of_bits = int(self.next_capacity * bits_per_word)
+            number_of_hashes = max(1, round(bits_per_word * 0.693))
+            self.filters.append([bytearray((number_of_bits + 7) // 8),
+                                 number_of_bits, number_of_hashes,
+                                 self.next_capacity, 0])
+            self.next_capacity *= 2
+        current = self.filters[-1]
+        bits = current[0]
+        for p in self._positions(word, current[1], current[2]):
+            bits[p >> 3] |= 1 << (p & 7)
+        current[4] += 1
+        self.added += 1
+
+    def __len__(self):
+        return self.added
+
+    @property
+    def nbytes(self):
+        return sum(len(current[0]) for current in self.filters)
+
+
+class ExactCountingBackend:
+    """
+    Default backend: exact counts of every word in a Counter (memory grows
+    with the vocabulary).
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def add(self, counts):
+        self.counts.update(counts)
+
+    def remove(self, counts):
+        self.counts.subtract(counts)
+        for word in counts:
+            if self.counts[word] <= 0:
+                del self.counts[word]
+
+    def __contains__(self, word):
+        return word in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def most_common(self, n=None):
+        return self.counts.most_common(n)
+
+    def save(self, json_path):
+        write_counts_json(self.counts.items(), json_path)
+
+    def close(self):
+        pass
+
+
+class SpaceSavingCountingBackend:
+    """
+    Approximate backend which keeps at most `capacity` words (Space-Saving
+    algorithm). When a new word arrives and the table is full, the word with
+    the smallest count is replaced and the new word inherits its count as
+    a possible overestimation ("error").
+
+    Guarantees, with N being the sum of all added counts:
+      - every stored count is an upper bound: true <= count <= true + error,
+        and error <= N / capacity,
+      - every word occurring more than N / capacity times is stored,
+      - so the top-K words are exact as long as the K-th word's count minus
+        its error is larger than the smallest stored count.
+    """
+    # The lazy heap is compacted when it has more entries than this per
+    # stored word
+    MAX_HEAP_ENTRIES_PER_WORD = 2
+    # Rough memory cost of one stored word: its count (BYTES_PER_ENTRY), its
+    # error (a second dict entry) and its heap entries (a tuple, the count
+    # and the list slot). Used to turn a memory budget into a capacity.
+    BYTES_PER_WORD = BYTES_PER_ENTRY + 80 + MAX_HEAP_ENTRIES_PER_WORD * 100
+
+    def __init__(self, capacity):
+        """
+        :param capacity: Maximum number of stored words.
+        :type capacity: int
+        """
+        if capacity < 1:
+            raise ValueError(f"Invalid capacity: {capacity}")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # Lazy min-heap of (count, word); entries with outdated counts are
+        # skipped when popped
+        self.heap = []
+
+    def add(self, counts):
+        for word, count in counts.items():
+            self.total += count
+            if word in self.counts:
+                self.counts[word] += count
+            elif len(self.counts) < self.capacity:
+                self.counts[word] = count
+                self.errors[word] = 0
+            else:
+                evicted, minimum = self._pop_minimum()
+                del self.counts[evicted]
+                del self.errors[evicted]
+                self.counts[word] = minimum + count
+                self.errors[word] = minimum
+            heapq.heappush(self.heap, (self.counts[word], word))
+            if len(self.heap) > \
+                    self.MAX_HEAP_ENTRIES_PER_WORD * self.capacity:
+                self._compact_heap()
+
+    def _compact_heap(self):
+        # Drops the outdated entries in place, so that the heap is never
+        # copied (a copy would exceed the memory budget)
+        kept = 0
+        for entry in self.heap:
+            if self.counts.get(entry[1]) == entry[0]:
+                self.heap[kept] = entry
+                kept += 1
+        del self.heap[kept:]
+        heapq.heapify(self.heap)
+
+    def _pop_minimum(self):
+        while True:
+            count, word = heapq.heappop(self.heap)
+            if self.counts.get(word) == count:
+                return word, count
+
+    def remove(self, counts):
+        raise ValueError("Approximate counting can't remove counts "
+                         "(incremental mode needs exact counting)")
+
+    def __contains__(self, word):
+        return word in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def error_bound(self):
+        """
+        :return: Maximum overestimation of any stored count (N / capacity).
+        :rtype: float
+        """
+        return self.total / self.capacity
+
+    def guaranteed_top(self, n):
+        """
+        Returns the words of the top `n` whose rank is certain: their
+        lower bound (count - error) is at least the upper bound of every
+        word ranked below them.
+        :rtype: list[tuple[str, int]]
+        """
+        ranked = self.most_common()
+        result = []
+        for i, (word, count) in enumerate(ranked[:n]):
+            next_upper = ranked[i + 1][1] if i + 1 < len(ranked) else 0
+            if count - self.errors[word] < next_upper:
+                break
+            result.append((word, count))
+        return result
+
+    def most_common(self, n=None):
+        ranked = sorted(self.counts.items(), key=lambda x: x[1],
+                        reverse=True)
+        return ranked if n is None else ranked[:n]
+
+    def save(self, json_path):
+        write_counts_json(self.most_common(), json_path)
+
+    def close(self):
+        pass
+
+
+class SpillingCountingBackend:
+    """
+    Exact backend with bounded memory. Counts are kept in memory until
+    `capacity` words are stored, then they are written to a sorted run file
+    on disk and the memory is freed. At the end all runs are merged (k-way
+    merge of sorted files), so the result is exactly the same as with
+    ExactCountingBackend.
+
+    Words which were spilled are remembered in a BloomFilter, so that
+    `word in backend` (used to find new words for the novelty and
+    saturation of crawls) stays correct after a spill, except for rare
+    false positives (a new word reported as seen).
+    """
+
+    def __init__(self, capacity, spill_dir=None):
+        """
+        :param capacity: Maximum number of words kept in memory.
+        :type capacity: int
+        :param spill_dir: Directory for the run files (a temporary directory
+                          by default).
+        :type spill_dir: str | None
+        """
+        if capacity < 1:
+            raise ValueError(f"Invalid capacity: {capacity}")
+        self.capacity = capacity
+        self.spill_dir = tempfile.mkdtemp(prefix="word-counts-",
+                                          dir=spill_dir)
+        self.counts = Counter()
+        self.run_paths = []
+        self.spilled_words = BloomFilter(capacity)
+        # Number of distinct words, known after a merge (see __len__)
+        self.merged_length = None
+
+    def add(self, counts):
+        self.merged_length = None
+        for word, count in counts.items():
+            self.counts[word] += count
+            if len(self.counts) >= self.capacity:
+                self._spill()
+
+    def remove(self, counts):
+        # Negative counts are summed during the merge
+        self.add({word: -count for word, count in counts.items()})
+
+    def _spill(self):
+        path = os.path.join(self.spill_dir, f"run-{len(self.run_paths)}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            for word in sorted(self.counts):
+                # JSON encoding keeps words with tabs or newlines on one line
+                f.write(f"{json.dumps(word, ensure_ascii=False)}\t"
+                        f"{self.counts[word]}\n")
+                self.spilled_words.add(word)
+        self.run_paths.append(path)
+        self.counts = Counter()
+
+    def __contains__(self, word):
+        return word in self.counts or word in self.spilled_words
+
+    def __len__(self):
+        """
+        Number of distinct counted words. The words of the runs and of the
+        memory overlap, so they are merged to be counted, unless the number
+        is known from the last save.
+        """
+        if self.merged_length is None:
+            self.merged_length = sum(1 for _ in self.merged_items())
+        return self.merged_length
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                word, count = line.rstrip("\n").rsplit("\t", 1)
+                yield json.loads(word), int(count)
+
+    def merged_items(self):
+        """
+        Yields (word, count) pairs of all counted words in sorted order,
+        reading the runs from disk.
+        """
+        runs = [self._read_run(path) for path in self.run_paths]
+        runs.append(iter(sorted(self.counts.items())))
+        current_word, current_count = None, 0
+        for word, count in heapq.merge(*runs):
+            if word != current_word:
+                if current_word is not None and current_count > 0:
+                    yield current_word, current_count
+                current_word, current_count = word, 0
+            current_count += count
+        if current_word is not None and current_count > 0:
+            yield current_word, current_count
+
+    def most_common(self, n=None):
+        if n is None:
+            return sorted(self.merged_items(), key=lambda x: x[1],
+                          reverse=True)
+        return heapq.nlargest(n, self.merged_items(), key=lambda x: x[1])
+
+    def save(self, json_path):
+        def counted(items):
+            self.merged_length = 0
+            for item in items:
+                self.merged_length += 1
+                yield item
+
+        write_counts_json(counted(self.merged_items()), json_path)
+
+    def close(self):
+        """
+        Removes the run files (the number of words stays known after a
+        save).
+        """
+        for path in self.run_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.run_paths = []
+        if os.path.isdir(self.spill_dir):
+            os.rmdir(self.spill_dir)
+
+
+def create_counting_backend(kind="exact", memory_budget=None,
+                            spill_dir=None):
+    """
+    Creates a counting backend.
+    :param kind: 'exact' (unbounded Counter), 'top-k' (approximate,
+                 Space-Saving) or 'spill' (exact, sorted runs on disk).
+    :type kind: str
+    :param memory_budget: Approximate memory (in bytes) the counts may use.
+                          Required for 'top-k' and 'spill'.
+    :type memory_budget: int | None
+    :param spill_dir: Directory for the run files of 'spill'.
+    :type spill_dir: str | None
+    """
+    if kind == "exact":
+        return ExactCountingBackend()
+    if kind not in ("top-k", "spill"):
+        raise ValueError(f"Invalid counting backend: {kind}")
+    bytes_per_word = BYTES_PER_ENTRY
+    if kind == "top-k":
+        bytes_per_word = SpaceSavingCountingBackend.BYTES_PER_WORD
+    if not memory_budget or memory_budget < bytes_per_word:
+        raise ValueError(f"Counting backend {kind} requires a memory budget "
+                         f"of at least {bytes_per_word} bytes")
+    capacity = memory_budget // bytes_per_word
+    if kind == "top-k":
+        return SpaceSavingCountingBackend(capacity)
+    return SpillingCountingBackend(capacity, spill_dir)
@@ -0,0 +1,102 @@
+import time
+from collections import deque
+
+
+class CrawlBudget:
+    """
+    Hard limits of a crawl: number of pages, time and downloaded bytes.
+    Each limit is optional (None means unlimited).
+    """
+
+    def __init__(self, max_pages=None, max_seconds=None, max_bytes=None):
+        """
+        :param max_pages: Maximum number of processed pages.
+        :type max_pages: int | None
+        :param max_seconds: Maximum duration of the crawl in seconds.
+        :type max_seconds: float | None
+        :param max_bytes: Maximum number of downloaded bytes.
+        :type max_bytes: int | None
+        """
+        for name, value in (("max_pages", max_pages),
+                            ("max_seconds", max_seconds),
+                            ("max_bytes", max_bytes)):
+            if value is not None and value <= 0:
+                raise ValueError(f"Invalid {name}: {value}")
+        self.max_pages = max_pages
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.pages = 0
+        self.bytes = 0
+        self.start_time = time.monotonic()
+
+    def record_page(self, number_of_bytes):
+        """
+        Registers one processed page.
+        :param number_of_bytes: Size of the downloaded page.
+        """
+        self.pages += 1
+        self.bytes += number_of_bytes
+
+    def exhausted(self):
+        """
+        :return: Description of the exhausted limit or None if the crawl
+                 can continue.
+        :rtype: str | None
+        """
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            return f"page budget ({self.max_pages} pages)"
+        if self.max_bytes is not None and self.bytes >= self.max_bytes:
+            return f"byte budget ({self.max_bytes} bytes)"
+        if self.max_seconds is not None and \
+                time.monotonic() - self.start_time >= self.max_seconds:
+            return f"time budget ({self.max_seconds} s)"
+        return None
+
+
+class SaturationMonitor:
+    """
+    Detects when the crawl stops finding new vocabulary: the average number
+    of new words per page over the last `window` pages drops below the
+    threshold.
+    """
+
+    def __init__(self, threshold, window=20):
+        """
+        :param threshold: Minimal average number of new words per page.
+        :type threshold: float
+        :param window: Number of the most recent pages taken into account.
+        :type window: int
+        """
+        if threshold < 0:
+            raise ValueError(f"Invalid saturation threshold: {threshold}")
+        if window < 1:
+            raise ValueError(f"Invalid saturation window: {window}")
+        self.threshold = threshold
+        self.window = window
+        self.recent = deque(maxlen=window)
+
+    def record(self, new_words):
+        """
+        :param new_words: Number of words of the page which weren't seen
+                          before.
+        """
+        self.recent.append(new_words)
+
+    def marginal_new_words(self):
+        """
+        :return: Average number of new words per page in the window.
+        :rtype: float | None
+        """
+        if not self.recent:
+            return None
+        return sum(self.recent) / len(self.recent)
+
+    def saturated(self):
+        """
+        :return: True if the window is full and its average is below the
+                 threshold.
+        :rtype: bool
+        """
+        if len(self.recent) < self.window:
+            return False
+        return self.marginal_new_words() < self.threshold
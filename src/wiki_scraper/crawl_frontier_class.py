@@ -0,0 +1,113 @@
+import heapq
+from collections import deque, Counter
+
+
+class BFSFrontier:
+    """
+    Frontier of the crawl which returns phrases in the breadth-first order
+    (by depth, then in order of discovery).
+    """
+
+    def __init__(self):
+        self.queue = deque()
+
+    def push(self, phrase, depth, parent_novelty=None):
+        """
+        Adds a phrase to the frontier.
+        :param phrase: Title of the article.
+        :param depth: Depth of the article in the crawl tree.
+        :param parent_novelty: Ignored (kept for a common interface).
+        """
+        self.queue.append((phrase, depth))
+
+    def pop(self):
+        """
+        :return: Tuple (phrase, depth) of the next article to process.
+        """
+        return self.queue.popleft()
+
+    def __len__(self):
+        return len(self.queue)
+
+
+class BestFirstFrontier:
+    """
+    Frontier of the crawl which returns the most promising phrase first.
+    Priority can be:
+      - 'inlinks': number of already processed articles linking to a phrase
+        (articles linked from many places are usually central to the wiki),
+      - 'novelty': the highest share of new words among the articles linking
+        to a phrase (articles next to novel articles tend to be novel too).
+    Ties are broken by depth and then by the order of discovery.
+    """
+    PRIORITIES = ("inlinks", "novelty")
+
+    def __init__(self, priority="inlinks"):
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"Invalid priority: {priority}. Available: "
+                             f"{', '.join(self.PRIORITIES)}")
+        self.priority = priority
+        self.heap = []
+        # Current score and the smallest depth of every waiting phrase
+        self.scores = {}
+        self.depths = {}
+        self.inlinks = Counter()
+        self.counter = 0  # Order of discovery
+
+    def push(self, phrase, depth, parent_novelty=None):
+        """
+        Adds a phrase to the frontier or raises its priority if it's
+        already waiting.
+        :param phrase: Title of the article.
+        :param depth: Depth of the article in the crawl tree.
+        :param parent_novelty: Share of new words in the linking article
+                               (0..1). None for the starting phrase.
+        """
+        self.inlinks[phrase] += 1
+        if self.priority == "inlinks":
+            score = self.inlinks[phrase]
+        else:
+            score = max(self.scores.get(phrase, 0.0), parent_novelty or 0.0)
+        depth = min(depth, self.depths.get(phrase, depth))
+
+        if self.scores.get(phrase) == score and \
+                self.depths.get(phrase) == depth:
+            return
+        self.scores[phrase] = score
+        self.depths[phrase] = depth
+        # Old entries of this phrase stay in the heap and are skipped in pop
+        self.counter += 1
+        heapq.heappush(self.heap, (-score, depth, self.counter, phrase))
+
+    def pop(self):
+        """
+        :return: Tuple (phrase, depth) of the waiting article with the
+                 highest priority.
+        :raises IndexError: If the frontier is empty.
+        """
+        while self.heap:
+            neg_score, depth, _, phrase = heapq.heappop(self.heap)
+            if self.scores.get(phrase) != -neg_score or \
+                    self.depths.get(phrase) != depth:
+                continue  # Stale entry
+            del self.scores[phrase]
+            del self.depths[phrase]
+            return phrase, depth
+        raise IndexError("pop from an empty frontier")
+
+    def __len__(self):
+        return len(self.scores)
+
+
+def create_frontier(strategy):
+    """
+    Creates a frontier for the given crawl strategy.
+    :param strategy: 'bfs', 'inlinks' or 'novelty'.
+    :type strategy: str
+    :rtype: BFSFrontier | BestFirstFrontier
+    """
+    if strategy == "bfs":
+        return BFSFrontier()
+    if strategy in BestFirstFrontier.PRIORITIES:
+        return BestFirstFrontier(strategy)
+    raise ValueError(f"Invalid crawl strategy: {strategy}")
@@ -0,0 +1,191 @@
+import json
+import os
+import socket
+import time
+from collections import Counter
+from .scraper_class import Scraper, PageNotFoundError
+from .fetcher_class import Fetcher
+from .boilerplate_pruner_class import BoilerplatePruner
+from .shared_work_queue_class import SharedWorkQueue
+
+
+class CrawlWorker:
+    """
+    Worker of a coordinated crawl. Claims phrases from a SharedWorkQueue,
+    counts words of the articles, adds the linked articles to the queue and
+    writes the counts to its own shard file.
+
+    Items are marked as done only after their counts were written to the
+    shard, so a worker that dies doesn't lose pages (their leases expire
+    and other workers process them again).
+    """
+
+    def __init__(self, queue, worker_id, wiki_url, max_depth,
+                 waiting_time=0.0, fetcher=None, flush_every=10,
+                 poll_interval=0.5, pruner=None):
+        """
+        :param queue: Queue shared by all the workers of the crawl.
+        :type queue: SharedWorkQueue
+        :param worker_id: Unique identifier of the worker.
+        :type worker_id: str
+        :param wiki_url: URL to the main wiki site.
+        :type wiki_url: str
+        :param max_depth: The maximum depth to traverse from the starting
+                          article.
+        :type max_depth: int
+        :param waiting_time: Number of seconds to wait between articles.
+        :type waiting_time: float
+        :param fetcher: Fetcher used for HTTP requests.
+        :type fetcher: Fetcher | None
+        :param flush_every: Number of articles after which the shard is
+                            written.
+        :type flush_every: int
+        :param poll_interval: Seconds to wait when nothing is pending but
+                              other workers are still processing articles.
+        :type poll_interval: float
+        :param pruner: Removes boilerplate before words and links are
+                       extracted (optional).
+        :type pruner: BoilerplatePruner | None
+        """
+        if not worker_id or "__" in worker_id:
+            raise ValueError(f"Invalid worker id: {worker_id}")
+        self.queue = queue
+        self.worker_id = worker_id
+        self.wiki_url = wiki_url
+        self.max_depth = max_depth
+        self.waiting_time = waiting_time
+        self.fetcher = fetcher if fetcher is not None else Fetcher()
+        self.flush_every = flush_every
+        self.poll_interval = poll_interval
+        self.pruner = pruner
+        self.pages_processed = 0
+
+        # Items processed since the last flush with their counts
+        self.held_items = []
+        self.shard_counts = Counter()
+        shard_path = self.queue.shard_path(self.worker_id)
+        if os.path.exists(shard_path):
+            # Restarted worker continues its own shard
+            with open(shard_path, "r", encoding="utf-8") as f:
+                self.shard_counts.update(json.load(f))
+
+    def run(self):
+        """
+        Processes articles until the whole queue is finished.
+        :return: Number of articles processed by this worker.
+        :rtype: int
+        """
+        while True:
+            item = self.queue.claim(self.worker_id)
+            if item is None:
+                self.flush()
+                if self.queue.is_finished():
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            self.process(item)
+            if len(self.held_items) >= self.flush_every:
+                self.flush()
+            if self.waiting_time > 0:
+                time.sleep(self.waiting_time)
+        return self.pages_processed
+
+    def process(self, item):
+        """
+        Counts words of a single claimed article and adds its links to the
+        queue.
+        :type item: WorkItem
+        """
+        if item.depth > self.max_depth:
+            self.queue.complete(item)
+            return
+        print(f"[{self.worker_id}] Currently processing: {item.phrase}")
+        scraper = Scraper(self.wiki_url, item.phrase, fetcher=self.fetcher,
+                          pruner=self.pruner)
+        try:
+            scraper.fetch_data()
+        except ConnectionError as e:
+            print(f"[{self.worker_id}] Error while fetching the data for "
+                  f"{item.phrase}. Error: {e}")
+            self.queue.release(item)
+            return
+        except PageNotFoundError as e:
+            # Retrying a missing article (e.g. a red link) doesn't help
+            print(f"[{self.worker_id}] {e}. Skipping this phrase.")
+            self.queue.fail(item)
+            return
+
+        current_counts = scraper.count_words() or Counter()
+        children_phrases = scraper.get_children_phrases() or []
+        # Only the counts are kept, the parsed page is freed right away
+        scraper.release()
+        if item.depth < self.max_depth:
+            for phrase in dict.fromkeys(children_phrases):
+                self.queue.add(phrase, item.depth + 1)
+
+        self.held_items.append((item, current_counts))
+        self.pages_processed += 1
+        # Keep the leases of the not yet flushed items alive
+        for held_item, _ in self.held_items:
+            self.queue.renew(held_item)
+
+    def flush(self):
+        """
+        Writes the counts of the held items to the shard and marks them as
+        done. Items whose leases were lost are dropped, because another
+        worker processes them again.
+        """
+        if not self.held_items:
+            return
+        kept = [(item, counts) for item, counts in self.held_items
+                if self.queue.renew(item)]
+        for _, counts in kept:
+            self.shard_counts.update(counts)
+        self.queue.write_json_atomically(
+            self.queue.shard_path(self.worker_id), self.shard_counts)
+        for item, _ in kept:
+            self.queue.complete(item)
+        self.held_items = []
+
+
+def default_worker_id(number=0):
+    """
+    :return: Identifier unique across hosts and processes.
+    :rtype: str
+    """
+    hostname = socket.gethostname().replace("__", "_")
+    return f"{hostname}-{os.getpid()}-{number}"
+
+
+def run_crawl_worker(queue_dir, worker_id=None):
+    """
+    Runs a worker on an existing queue directory. Settings of the crawl
+    (wiki URL, depth, waiting time, fetcher settings and pruning profile)
+    are read from the queue, so this is all that has to be started on
+    another host.
+    :param queue_dir: Directory of the shared queue.
+    :type queue_dir: str
+    :param worker_id: Unique identifier of the worker (generated if None).
+    :type worker_id: str | None
+    :return: Number of articles processed by this worker.
+    :rtype: int
+    """
+    config = SharedWorkQueue(queue_dir).load_config()
+    queue = SharedWorkQueue(queue_dir, config["lease_seconds"])
+    pruner = None
+    if config.get("pruning_profile"):
+        pruner = BoilerplatePruner.from_profile(config["pruning_profile"])
+    fetcher = Fetcher(**config.get("fetcher", {}))
+    worker = CrawlWorker(
+        queue=queue,
+        worker_id=worker_id or default_worker_id(),
+        wiki_url=config["wiki_url"],
+        max_depth=config["max_depth"],
+        waiting_time=config["waiting_time"],
+        fetcher=fetcher,
+        pruner=pruner
+    )
+    try:
+        return worker.run()
+    finally:
+        fetcher.close()
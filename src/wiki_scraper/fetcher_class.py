@@ -0,0 +1,335 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+
+
+class Fetcher:
+    """
+    Class responsible for the HTTP side of scraping: timeouts, bounded
+    retries with jittered exponential backoff, a per-page deadline, optional
+    hedged requests and latency bookkeeping.
+    """
+    DEFAULT_HEADERS = {"User-Agent": "WikiScraperAcademicProject"}
+    # Status codes which are worth retrying (the server is overloaded or
+    # temporarily unavailable). Every other error status is final.
+    RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+    # Size of the pieces in which bodies are downloaded (the page deadline is
+    # checked after every piece)
+    BODY_CHUNK_SIZE = 16384
+    # Number of latencies kept for the percentiles. Above it a uniform
+    # sample of all the latencies is kept (reservoir sampling), so long
+    # crawls don't use more and more memory; p50/p99 of 10000 samples are
+    # accurate enough for tuning.
+    LATENCY_SAMPLE_SIZE = 10000
+
+    def __init__(self, connect_timeout=5.0, read_timeout=30.0, max_retries=3,
+                 backoff_base=0.5, backoff_max=10.0, page_deadline=90.0,
+                 hedge_after=None, session=None):
+        """
+        :param connect_timeout: Seconds to wait for the TCP connection.
+        :type connect_timeout: float
+        :param read_timeout: Seconds to wait between bytes of the response.
+        :type read_timeout: float
+        :param max_retries: Number of additional attempts after the first
+                            failed one.
+        :type max_retries: int
+        :param backoff_base: Base (in seconds) of the exponential backoff.
+        :type backoff_base: float
+        :param backoff_max: Upper limit (in seconds) of a single backoff.
+        :type backoff_max: float
+        :param page_deadline: Overall number of seconds one page may take,
+                              including all retries. None means no deadline.
+        :type page_deadline: float | None
+        :param hedge_after: If set, a second identical request is sent when
+                            the first one didn't finish after this number of
+                            seconds. The first response wins.
+        :type hedge_after: float | None
+        :param session: requests.Session to use (a new one by default).
+        :type session: requests.Session | None
+        """
+        if connect_timeout <= 0 or read_timeout <= 0:
+            raise ValueError("Timeouts have to be positive numbers")
+        if max_retries < 0:
+            raise ValueError(f"Invalid number of retries: {max_retries}")
+        if page_deadline is not None and page_deadline <= 0:
+            raise ValueError(f"Invalid page deadline: {page_deadline}")
+        if hedge_after is not None and hedge_after <= 0:
+            raise ValueError(f"Invalid hedging delay: {hedge_after}")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.page_deadline = page_deadline
+        self.hedge_after = hedge_after
+        self.session = session if session is not None else requests.Session()
+
+        # Latencies (in seconds) of finished page fetches (all of them or a
+        # sample, see LATENCY_SAMPLE_SIZE)
+        self.latencies = []
+        self.pages_fetched = 0
+        self._sampling_random = random.Random()
+        self.retries_done = 0
+        self.hedges_sent = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def settings(self):
+        """
+        :return: Arguments which create a Fetcher with the same timeouts,
+                 retries, deadline and hedging (e.g. in another process).
+        :rtype: dict
+        """
+        return {"connect_timeout": self.connect_timeout,
+                "read_timeout": self.read_timeout,
+                "max_retries": self.max_retries,
+                "backoff_base": self.backoff_base,
+                "backoff_max": self.backoff_max,
+                "page_deadline": self.page_deadline,
+                "hedge_after": self.hedge_after}
+
+    def get(self, url, headers=None, stream=False):
+        """
+        Sends a GET request for the given URL. Connection errors, timeouts
+        and retryable status codes are retried until `max_retries` is
+        exhausted or the page deadline passes.
+        :param url: URL to fetch.
+        :type url: str
+        :param headers: Additional headers (User-Agent is always sent).
+        :type headers: dict | None
+        :param stream: If True, only the headers are downloaded and the body
+                       can be read in chunks with iter_content (the caller
+                       has to close the response and the page deadline
+                       doesn't cover the body). Otherwise the body is
+                       downloaded within the page deadline.
+        :type stream: bool
+        :return: The final response (its status code isn't checked apart
+                 from retryable ones).
+        :rtype: requests.Response
+        :raises requests.RequestException: If every attempt failed.
+        """
+        all_headers = dict(self.DEFAULT_HEADERS)
+        if headers:
+            all_headers.update(headers)
+
+        start = time.monotonic()
+        deadline = None
+        if self.page_deadline is not None:
+            deadline = start + self.page_deadline
+
+        attempt = 0
+        while True:
+            try:
+                timeout = self._timeout_for_attempt(deadline)
+                response = self._attempt(url, all_headers, timeout)
+                if not stream:
+                    self._read_body(response, deadline)
+                if response.status_code not in self.RETRYABLE_STATUS_CODES:
+                    self._record_latency(time.monotonic() - start)
+                    return response
+                error = requests.HTTPError(
+                    f"{response.status_code} response for {url}",
+                    response=response
+                )
+                retry_after = self._retry_after(response)
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                error = e
+                retry_after = None
+
+            delay = self._backoff(attempt, retry_after)
+            out_of_time = deadline is not None and \
+                time.monotonic() + delay >= deadline
+            if attempt >= self.max_retries or out_of_time:
+                self._record_latency(time.monotonic() - start)
+                if isinstance(error, requests.HTTPError):
+                    # The last response is still a valid answer, let the
+                    # caller decide what to do with the status code.
+                    return error.response
+                raise error
+            if isinstance(error, requests.HTTPError):
+                error.response.close()
+            attempt += 1
+            with self._lock:
+                self.retries_done += 1
+            time.sleep(delay)
+
+    def _timeout_for_attempt(self, deadline):
+        """
+        Returns (connect, read) timeouts for the next attempt, shortened so
+        that the attempt can't outlive the page deadline.
+        """
+        if deadline is None:
+            return self.connect_timeout, self.read_timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout("Page deadline exceeded")
+        return (min(self.connect_timeout, remaining),
+                min(self.read_timeout, remaining))
+
+    def _read_body(self, response, deadline):
+        """
+        Downloads the body of a streamed response in chunks. The read timeout
+        only limits the pause between two chunks, so without the deadline
+        check a server trickling the body could hold the page indefinitely.
+        read1 returns whatever arrived (iter_content waits for a full chunk).
+        :raises requests.Timeout: If the page deadline passed.
+        """
+        chunks = []
+        finished = False
+        try:
+            while True:
+                chunk = response.raw.read1(self.BODY_CHUNK_SIZE,
+                                           decode_content=True)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise requests.Timeout(f"Page deadline exceeded while "
+                                           f"downloading {response.url}")
+            finished = True
+        # The same translation of urllib3 errors as in iter_content
+        except ReadTimeoutError as e:
+            raise requests.ConnectionError(e)
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        finally:
+            if not finished:
+                response.close()
+        # Makes response.content work as for a non-streamed request
+        response._content = b"".join(chunks)
+
+    def _backoff(self, attempt, retry_after=None):
+        """
+        Returns the number of seconds to sleep before the next attempt.
+        Uses "full jitter": a random value between 0 and the exponential
+        bound, so that many clients don't retry at the same moment.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        bound = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, bound)
+
+    @staticmethod
+    def _retry_after(response):
+        """
+        Reads the Retry-After header (only the number of seconds form).
+        :return: Number of seconds or None if the header is missing/invalid.
+        """
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+    def _attempt(self, url, headers, timeout):
+        """
+        Performs a single attempt, hedged if `hedge_after` is set. Only the
+        headers of the response are downloaded.
+        """
+        if self.hedge_after is None:
+            return self.session.get(url, headers=headers, timeout=timeout,
+                                    stream=True)
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=8, thread_name_prefix="hedge")
+
+        pending = {self._executor.submit(self.session.get, url,
+                                         headers=headers, timeout=timeout,
+                                         stream=True)}
+        done, pending = wait(pending, timeout=self.hedge_after)
+        if not done:
+            # The first request is slow, send a backup one and take
+            # whichever finishes first.
+            with self._lock:
+                self.hedges_sent += 1
+            pending.add(self._executor.submit(self.session.get, url,
+                                              headers=headers,
+                                              timeout=timeout,
+                                              stream=True))
+
+        last_error = None
+        while True:
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    last_error = e
+                    continue
+                # Close the loser's connection once it finishes
+                for other in pending:
+                    other.add_done_callback(self._close_response)
+                return response
+            if not pending:
+                raise last_error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+    @staticmethod
+    def _close_response(future):
+        if not future.cancelled() and future.exception() is None:
+            future.result().close()
+
+    def close(self):
+        """
+        Stops the threads used for hedged requests and closes the pooled
+        connections. The fetcher can still be used afterwards, both are
+        created again when needed.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def _record_latency(self, seconds):
+        with self._lock:
+            self.pages_fetched += 1
+            if len(self.latencies) < self.LATENCY_SAMPLE_SIZE:
+                self.latencies.append(seconds)
+                return
+            # Every latency stays in the sample with the same probability
+            position = self._sampling_random.randrange(self.pages_fetched)
+            if position < self.LATENCY_SAMPLE_SIZE:
+                self.latencies[position] = seconds
+
+    def latency_percentile(self, percentile):
+        """
+        Returns the given percentile (nearest-rank method) of the page fetch
+        latencies (estimated from a sample after LATENCY_SAMPLE_SIZE
+        pages).
+        :param percentile: Value from the range (0, 100].
+        :type percentile: float
+        :return: Latency in seconds or None if nothing was fetched yet.
+        :rtype: float | None
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError(f"Invalid percentile: {percentile}")
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return None
+        rank = -(-len(latencies) * percentile // 100)  # ceil
+        return latencies[int(rank) - 1]
+
+    def latency_report(self):
+        """
+        Returns a human-readable summary of the fetch latencies.
+        :rtype: str
+        """
+        if not self.latencies:
+            return "No pages were fetched."
+        return (f"Fetched {self.pages_fetched} pages: "
+                f"p50 = {self.latency_percentile(50):.3f}s, "
+                f"p99 = {self.latency_percentile(99):.3f}s, "
+                f"retries = {self.retries_done}, "
+                f"hedged requests = {self.hedges_sent}")
@@ -0,0 +1,86 @@
+import sys
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS isn't reported there
+    resource = None
+
+
+def peak_rss_bytes():
+    """
+    :return: Peak resident set size of the process in bytes or None if it
+             can't be read on this platform.
+    :rtype: int | None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryMonitor:
+    """
+    Reports memory usage of a crawl every `every` pages: memory currently
+    allocated by Python objects and its peak since the previous report
+    (tracemalloc) and the peak RSS of the process. Tracing allocations slows
+    Python down, so it's only enabled while the monitor runs.
+    """
+
+    def __init__(self, every):
+        """
+        :param every: Number of pages between reports.
+        :type every: int
+        """
+        if every < 1:
+            raise ValueError(f"Invalid report interval: {every}")
+        self.every = every
+        self.pages = 0
+        self.peak_traced = 0  # Highest peak over all reports (in bytes)
+        self.started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self):
+        """
+        Stops tracing (if this monitor started it).
+        """
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def record_page(self):
+        """
+        Counts a processed page and prints a report every `every` pages.
+        :return: The report or None.
+        :rtype: str | None
+        """
+        self.pages += 1
+        if self.pages % self.every != 0:
+            return None
+        report = self.report()
+        print(report)
+        return report
+
+    def report(self):
+        """
+        :return: Description of the current memory usage. The traced peak
+                 is reset afterwards, so every report shows the peak of its
+                 own interval.
+        :rtype: str
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        self.peak_traced = max(self.peak_traced, peak)
+        text = (f"Memory after {self.pages} pages: "
+                f"{current / 2 ** 20:.1f} MB allocated, "
+                f"peak {peak / 2 ** 20:.1f} MB")
+        rss = peak_rss_bytes()
+        if rss is not None:
+            text += f", peak RSS {rss / 2 ** 20:.1f} MB"
+        return text
@@ -0,0 +1,160 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from .fetcher_class import Fetcher
+from .scraping_manager_class import ScrapingManager
+
+
+def wiki_host(wiki_url):
+    """
+    :return: Host (with the port, if given) of the wiki URL.
+    :rtype: str
+    """
+    host = urlparse(wiki_url).netloc
+    if not host:
+        raise ValueError(f"Invalid wiki URL: {wiki_url}")
+    return host
+
+
+def path_for_wiki(wiki_url, default_path):
+    """
+    Returns the path of a data file of one wiki in a multi-wiki crawl: the
+    default file name prefixed with the wiki's host, e.g.
+    data/bulbapedia.bulbagarden.net-word-counts.json.
+    :rtype: str
+    """
+    host = wiki_host(wiki_url).replace(":", "_")
+    return os.path.join(os.path.dirname(default_path),
+                        f"{host}-{os.path.basename(default_path)}")
+
+
+class WikiCrawlJob:
+    """
+    Crawl of one wiki within a MultiWikiCrawl.
+    """
+
+    def __init__(self, wiki_url, starting_phrase, json_path=None,
+                 waiting_time=None):
+        """
+        :param wiki_url: URL to the main wiki site.
+        :type wiki_url: str
+        :param starting_phrase: The initial phrase of the crawl.
+        :type starting_phrase: str
+        :param json_path: Output of the counts (default: see
+                          path_for_wiki).
+        :type json_path: str | None
+        :param waiting_time: Seconds between articles of this wiki (the
+                             crawl's default if None).
+        :type waiting_time: float | None
+        """
+        self.wiki_url = wiki_url.rstrip("/")
+        self.host = wiki_host(self.wiki_url)
+        self.starting_phrase = starting_phrase
+        self.json_path = json_path
+        self.waiting_time = waiting_time
+        self.seconds = None  # Duration of the crawl
+        self.error = None  # Exception which stopped the crawl
+
+
+class MultiWikiCrawl:
+    """
+    Runs auto_count_words on several wikis at once, one thread per wiki.
+    Every wiki gets its own ScrapingManager with its own Fetcher (so its own
+    connection pool), its own waiting time between articles, frontier and
+    output file. The crawls only wait for their own host, so the total
+    throughput is the sum of what each host allows.
+    """
+
+    def __init__(self, jobs, fetcher_factory=Fetcher, pruning_profile=None):
+        """
+        :param jobs: Crawls to run (at most one per host, so that the rate
+                     limit of a host isn't exceeded).
+        :type jobs: list[WikiCrawlJob]
+        :param fetcher_factory: Function creating the Fetcher of one wiki.
+        :type fetcher_factory: Callable[[], Fetcher]
+        :param pruning_profile: Boilerplate pruning profile of all the wikis
+                                (see ScrapingManager).
+        :type pruning_profile: str | None
+        """
+        if not jobs:
+            raise ValueError("At least one wiki is required")
+        hosts = [job.host for job in jobs]
+        duplicates = {host for host in hosts if hosts.count(host) > 1}
+        if duplicates:
+            raise ValueError(f"Each host can be crawled only once at a time: "
+                             f"{', '.join(sorted(duplicates))}")
+        self.jobs = jobs
+        self.managers = {
+            job.host: ScrapingManager(job.wiki_url, fetcher=fetcher_factory(),
+                                      pruning_profile=pruning_profile)
+            for job in jobs
+        }
+
+    def run(self, max_depth, waiting_time=0.0, **options):
+        """
+        Crawls all the wikis and waits until every crawl has finished. A
+        failed crawl doesn't stop the others; its exception is kept in the
+        job's `error`.
+        :param max_depth: The maximum depth to traverse from the starting
+                          articles.
+        :type max_depth: int
+        :param waiting_time: Default number of seconds to wait between
+                             articles of one wiki.
+        :type waiting_time: float
+        :param options: Other arguments of auto_count_words (strategy,
+                        budgets, counting etc.), applied to every wiki.
+                        In the incremental mode every wiki has its own
+                        index (next to its counts file), and with
+                        archive_path or term_matrix_path its own archive
+                        or matrix (see path_for_wiki). Memory reports
+                        (memory_report_every) aren't supported.
+        :return: The jobs.
+        :rtype: list[WikiCrawlJob]
+        """
+        if "index_path" in options:
+            raise ValueError("Every wiki has its own index, index_path "
+                             "can't be shared")
+        if options.get("memory_report_every") is not None:
+            # tracemalloc is global, the reports of the wikis would overlap
+            # and the first finished crawl would stop the tracing of others
+            raise ValueError("Memory reports can't be used in a multi-wiki "
+                             "crawl")
+        default_path = ScrapingManager.default_json_path(
+            options.get("ngram", 1), options.get("counting", "exact"))
+        for job in self.jobs:
+            if job.json_path is None:
+                job.json_path = path_for_wiki(job.wiki_url, default_path)
+            if job.waiting_time is None:
+                job.waiting_time = waiting_time
+
+        with ThreadPoolExecutor(max_workers=len(self.jobs)) as executor:
+            for job in self.jobs:
+                executor.submit(self._run_job, job, max_depth, options)
+
+        for job in self.jobs:
+            if job.error is not None:
+                print(f"Crawl of {job.host} failed: {job.error}")
+            else:
+                print(f"Crawl of {job.host} finished in {job.seconds:.1f} s, "
+                      f"counts saved to {job.json_path}")
+        return self.jobs
+
+    def _run_job(self, job, max_depth, options):
+        start = time.monotonic()
+        for name in ("archive_path", "term_matrix_path"):
+            if options.get(name):
+                options = dict(options, **{name: path_for_wiki(
+                    job.wiki_url, options[name])})
+        try:
+            self.managers[job.host].auto_count_words(
+                job.starting_phrase, max_depth,
+                waiting_time=job.waiting_time,
+                json_path=job.json_path,
+                **options
+            )
+        except Exception as e:
+            job.error = e
+        finally:
+            self.managers[job.host].close()
+        job.seconds = time.monotonic() - start
@@ -0,0 +1,189 @@
+from collections import Counter
+from .counting_backend_class import write_counts_json
+
+
+class NGramCounter:
+    """
+    Compact counter of n-grams for long crawls. Every word gets an integer
+    id from a shared vocabulary and an n-gram is stored as a single integer
+    made of the ids of its words (ID_BITS bits per word), which takes less
+    memory and hashes faster than a tuple or a joined string. N-grams are
+    turned back into strings only when they're saved.
+
+    With `max_ngrams` set, rare n-grams are pruned whenever the table grows
+    above the limit: all n-grams with a count below a threshold are dropped,
+    with the lowest threshold which leaves the table at most half full.
+    Pruned counts are lost, so kept counts may be lower than the true ones
+    (by less than the threshold of every pruning round, see
+    `prune_threshold` and `pruning_rounds`), while the frequent n-grams
+    survive. Words which no kept n-gram uses are dropped from the vocabulary
+    as well and their ids are given to new words, so the vocabulary stays
+    bounded too. Keys of n-grams which aren't stored (e.g. the counts of an
+    article from count_segments) are only valid until the next pruning.
+    """
+    # 30 bits per word keep bigram keys within 60 bits, the cheapest size of
+    # a multi-digit Python int
+    ID_BITS = 30
+
+    def __init__(self, n, max_ngrams=None):
+        """
+        :param n: Length of the n-grams (number of words).
+        :type n: int
+        :param max_ngrams: Maximum number of stored n-grams (optional).
+        :type max_ngrams: int | None
+        """
+        if n < 1:
+            raise ValueError(f"Invalid n-gram length: {n}")
+        if max_ngrams is not None and max_ngrams < 2:
+            raise ValueError(f"Invalid maximum number of n-grams: "
+                             f"{max_ngrams}")
+        self.n = n
+        self.max_ngrams = max_ngrams
+        self.word_ids = {}
+        self.words = []  # Word of every id (None for a free id)
+        self.free_ids = []
+        self.counts = Counter()
+        self.prune_threshold = 1
+        self.pruning_rounds = 0
+
+    def word_id(self, word):
+        """
+        :return: Id of the word (a new one for an unknown word).
+        :rtype: int
+        """
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            if self.free_ids:
+                word_id = self.free_ids.pop()
+                self.words[word_id] = word
+            else:
+                word_id = len(self.words)
+                self.words.append(word)
+            self.word_ids[word] = word_id
+        return word_id
+
+    def encode(self, words):
+        """
+        :param words: Sequence of n words.
+        :return: Key of the n-gram.
+        :rtype: int
+        """
+        key = 0
+        for word in words:
+            key = (key << self.ID_BITS) | self.word_id(word)
+        return key
+
+    def decode(self, key):
+        """
+        :param key: Key of the n-gram.
+        :return: Words of the n-gram joined with a space.
+        :rtype: str
+        """
+        mask = (1 << self.ID_BITS) - 1
+        ids = []
+        for _ in range(self.n):
+            ids.append(key & mask)
+            key >>= self.ID_BITS
+        return " ".join(self.words[i] for i in reversed(ids))
+
+    def count_segments(self, segments):
+        """
+        Counts n-grams of a single article.
+        :param segments: Lists of words (n-grams don't cross the lists).
+        :type segments: list[list[str]]
+        :return: Counter of n-gram keys.
+        :rtype: Counter
+        """
+        counts = Counter()
+        known_ids = self.word_ids
+        for words in segments:
+            ids = [known_ids[word] if word in known_ids
+                   else self.word_id(word) for word in words]
+            # Build the keys of all the n-grams at once: start with the ids
+            # of the first words and append the following words' ids
+            keys = ids[:len(ids) - self.n + 1]
+            for offset in range(1, self.n):
+                keys = [(key << self.ID_BITS) | word_id
+                        for key, word_id in zip(keys, ids[offset:])]
+            counts.update(keys)
+        return counts
+
+    def add(self, counts):
+        """
+        Adds counts of n-gram keys (e.g. from count_segments).
+        """
+        self.counts.update(counts)
+        if self.max_ngrams is not None and len(self.counts) > self.max_ngrams:
+            self.prune()
+
+    def add_joined(self, counts):
+        """
+        Adds counts of n-grams given as strings (words joined with a space),
+        e.g. loaded from a JSON file. Entries of a different length are
+        ignored.
+        """
+        encoded = Counter()
+        for ngram, count in counts.items():
+            words = ngram.split(" ")
+            if len(words) == self.n:
+                encoded[self.encode(words)] += count
+        self.add(encoded)
+
+    def remove(self, counts):
+        raise ValueError("N-gram counting doesn't support removing counts "
+                         "(incremental mode counts single words only)")
+
+    def prune(self):
+        """
+        Drops the rare n-grams until the table is at most half full, and the
+        words which aren't used anymore. The threshold is found from the
+        current counts in every round, so n-grams first seen late in a crawl
+        aren't held to the (higher) threshold of an earlier round.
+        """
+        self.pruning_rounds += 1
+        remaining = len(self.counts)
+        threshold = 1
+        for count, number in sorted(Counter(self.counts.values()).items()):
+            if remaining <= self.max_ngrams // 2:
+                break
+            remaining -= number
+            threshold = count + 1
+        self.prune_threshold = threshold
+        self.counts = Counter({key: count
+                               for key, count in self.counts.items()
+                               if count >= threshold})
+        self._prune_vocabulary()
+
+    def _prune_vocabulary(self):
+        # Frees the ids of the words no stored n-gram uses
+        mask = (1 << self.ID_BITS) - 1
+        used = set()
+        for key in self.counts:
+            for _ in range(self.n):
+                used.add(key & mask)
+                key >>= self.ID_BITS
+        for word_id, word in enumerate(self.words):
+            if word is not None and word_id not in used:
+                del self.word_ids[word]
+                self.words[word_id] = None
+                self.free_ids.append(word_id)
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def most_common(self, n=None):
+        """
+        :return: List of (n-gram string, count) pairs.
+        """
+        return [(self.decode(key), count)
+                for key, count in self.counts.most_common(n)]
+
+    def save(self, json_path):
+        write_counts_json(((self.decode(key), count)
+                           for key, count in self.counts.items()), json_path)
+
+    def close(self):
+        pass
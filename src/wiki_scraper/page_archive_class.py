@@ -0,0 +1,223 @@
+import gzip
+import json
+import os
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+
+class ArchiveRecord:
+    """
+    Location and metadata of one page stored in a PageArchive.
+    """
+
+    def __init__(self, title, url, offset, length, date):
+        """
+        :param title: Title of the article.
+        :param url: URL the page was downloaded from.
+        :param offset: Position of the record's gzip member in the archive.
+        :param length: Size of the compressed record in bytes.
+        :param date: Download time (ISO 8601, UTC).
+        """
+        self.title = title
+        self.url = url
+        self.offset = offset
+        self.length = length
+        self.date = date
+
+    def to_dict(self):
+        return {"title": self.title, "url": self.url, "offset": self.offset,
+                "length": self.length, "date": self.date}
+
+
+class PageArchive:
+    """
+    Append-only archive of downloaded pages in the WARC format: every page
+    is a WARC 'resource' record compressed as a separate gzip member, so
+    the file is a valid .warc.gz and any record can be read on its own by
+    seeking to its offset. The offsets are kept in an index next to the
+    archive (<path>.idx, one JSON line per record); if the index is missing
+    or incomplete, it's rebuilt by scanning the archive.
+    """
+
+    # Size of the blocks read by scan
+    SCAN_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        """
+        :param path: Path to the archive (created on the first write).
+        :type path: str
+        """
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self._lock = threading.Lock()
+
+    def append(self, title, url, html):
+        """
+        Appends a downloaded page to the archive and its index.
+        :param title: Title of the article.
+        :type title: str
+        :param url: URL the page was downloaded from.
+        :type url: str
+        :param html: Body of the response.
+        :type html: bytes
+        :rtype: ArchiveRecord
+        """
+        date = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        headers = (
+            "WARC/1.0\r\n"
+            "WARC-Type: resource\r\n"
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+            f"WARC-Date: {date}\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            f"WikiScraper-Title: {json.dumps(title)}\r\n"
+            "Content-Type: text/html\r\n"
+            f"Content-Length: {len(html)}\r\n"
+            "\r\n"
+        ).encode("utf-8")
+        member = gzip.compress(headers + html + b"\r\n\r\n")
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                offset = f.tell()
+                f.write(member)
+            record = ArchiveRecord(title, url, offset, len(member), date)
+            # The index is written after the record, so it never points to
+            # a record which isn't complete
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record.to_dict(), ensure_ascii=False) +
+                        "\n")
+        return record
+
+    def records(self):
+        """
+        :return: All records of the archive in the order they were written.
+        :rtype: list[ArchiveRecord]
+        """
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(ArchiveRecord(**json.loads(line)))
+                    except (json.JSONDecodeError, TypeError):
+                        # Interrupted write of the last line
+                        break
+        indexed_size = records[-1].offset + records[-1].length \
+            if records else 0
+        if indexed_size < os.path.getsize(self.path):
+            # Records without index lines (e.g. the index was deleted)
+            records += self.scan(indexed_size)
+        return records
+
+    def latest_records(self):
+        """
+        :return: The newest record of every title (a recrawl appends new
+                 versions of the pages).
+        :rtype: list[ArchiveRecord]
+        """
+        latest = {}
+        for record in self.records():
+            latest.pop(record.title, None)
+            latest[record.title] = record
+        return list(latest.values())
+
+    def scan(self, start=0):
+        """
+        Finds the records by decompressing the archive from the given
+        offset, member by member. The file is read in chunks of
+        SCAN_CHUNK_SIZE bytes and only the headers of the records are kept,
+        so the time is linear in the size of the archive and the memory
+        doesn't depend on it.
+        :rtype: list[ArchiveRecord]
+        """
+        records = []
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            pending = memoryview(b"")  # Read, but not yet decompressed
+            while True:
+                if not pending:
+                    pending = memoryview(f.read(self.SCAN_CHUNK_SIZE))
+                    if not pending:
+                        break
+                decompressor = zlib.decompressobj(wbits=31)
+                headers = b""
+                length = 0
+                while True:
+                    try:
+                        output = decompressor.decompress(pending)
+                    except zlib.error:
+                        return records
+                    if b"\r\n\r\n" not in headers:
+                        headers += output
+                    if decompressor.eof:
+                        used = len(pending) - len(decompressor.unused_data)
+                        length += used
+                        pending = pending[used:]
+                        break
+                    length += len(pending)
+                    pending = memoryview(f.read(self.SCAN_CHUNK_SIZE))
+                    if not pending:
+                        # Incomplete record at the end of the file
+                        return records
+                title, url, date = self.parse_record_headers(headers)
+                records.append(ArchiveRecord(title, url, offset, length,
+                                             date))
+                offset += length
+        return records
+
+    def read(self, record, file=None):
+        """
+        Reads the page of a record.
+        :param record: Record to read.
+        :type record: ArchiveRecord
+        :param file: Already opened archive (binary mode), to avoid opening
+                     it for every record.
+        :return: HTML of the page.
+        :rtype: bytes
+        """
+        if file is None:
+            with open(self.path, 'rb') as f:
+                return self.read(record, f)
+        file.seek(record.offset)
+        content = gzip.decompress(file.read(record.length))
+        return self.parse_record(content)[3]
+
+    @staticmethod
+    def parse_headers(content):
+        """
+        Reads the headers at the beginning of a decompressed WARC record.
+        :return: Dictionary of the headers (lower case names).
+        :rtype: dict
+        """
+        header_bytes = content.partition(b"\r\n\r\n")[0]
+        headers = {}
+        for line in header_bytes.decode("utf-8").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return headers
+
+    @classmethod
+    def parse_record_headers(cls, content):
+        """
+        :return: Tuple (title, url, date) of a decompressed WARC record (or
+                 its beginning containing the headers).
+        :rtype: tuple[str, str, str]
+        """
+        headers = cls.parse_headers(content)
+        return (json.loads(headers["wikiscraper-title"]),
+                headers["warc-target-uri"], headers["warc-date"])
+
+    @classmethod
+    def parse_record(cls, content):
+        """
+        Splits a decompressed WARC record.
+        :return: Tuple (title, url, date, body).
+        :rtype: tuple[str, str, str, bytes]
+        """
+        header_bytes, _, rest = content.partition(b"\r\n\r\n")
+        length = int(cls.parse_headers(header_bytes)["content-length"])
+        return cls.parse_record_headers(header_bytes) + (rest[:length],)
@@ -0,0 +1,142 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+
+def canonical_title(title):
+    """
+    Normalizes an article title the way MediaWiki does, so that "pikachu",
+    "Pikachu" and " Pikachu_" share a cache entry: underscores become
+    spaces, repeated and surrounding whitespace is dropped and the first
+    letter is capitalized.
+    :rtype: str
+    """
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+class PageCache:
+    """
+    Least-recently-used cache of fetched and parsed pages (Scrapers with a
+    loaded soup), bounded by an estimate of their memory in bytes. All
+    operations are guarded by a lock, so the cache can be shared by threads.
+    A cached Scraper is handed out to every thread asking for its page, so
+    it must never be changed (pruned or released), even after its eviction:
+    another thread may still be reading it. Changes are made on a copy
+    (Scraper.copy).
+    """
+    # Memory of a parsed BeautifulSoup tree per byte of its HTML (measured
+    # on article-like pages with tracemalloc)
+    PARSED_BYTES_PER_HTML_BYTE = 15
+
+    def __init__(self, max_bytes):
+        """
+        :param max_bytes: Maximum estimated memory of the cached pages.
+        :type max_bytes: int
+        """
+        if max_bytes < 1:
+            raise ValueError(f"Invalid cache size: {max_bytes}")
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # Key -> (scraper, estimated size)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Every scraper which was ever stored (and so possibly shared)
+        self._shared = weakref.WeakSet()
+
+    def estimate_size(self, scraper):
+        """
+        :return: Estimated memory of the parsed page of the scraper and of
+                 its downloaded HTML.
+        :rtype: int
+        """
+        raw_bytes = len(scraper.raw_html) if scraper.raw_html else 0
+        return scraper.bytes_fetched * self.PARSED_BYTES_PER_HTML_BYTE + \
+            raw_bytes
+
+    def shares(self, scraper):
+        """
+        :return: True if the scraper was stored in the cache, so other
+                 threads may use it and it mustn't be changed.
+        :rtype: bool
+        """
+        with self._lock:
+            return scraper in self._shared
+
+    def get(self, key):
+        """
+        :return: Cached scraper or None (counted as a hit or a miss).
+        :rtype: Scraper | None
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """
+        :return: Cached scraper or None, without changing the order of the
+                 pages or the statistics.
+        :rtype: Scraper | None
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def put(self, key, scraper):
+        """
+        Stores a scraper with a loaded page and evicts the least recently
+        used pages until the cache fits in its size. A page larger than the
+        whole cache isn't stored.
+        """
+        size = self.estimate_size(scraper)
+        with self._lock:
+            old_entry = self.entries.pop(key, None)
+            if old_entry is not None:
+                self.bytes -= old_entry[1]
+            if size > self.max_bytes:
+                return
+            self._shared.add(scraper)
+            self.entries[key] = (scraper, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self.entries)
+
+    def hit_rate(self):
+        """
+        :return: Fraction of lookups answered from the cache.
+        :rtype: float
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self):
+        """
+        :return: Human-readable summary of the cache statistics.
+        :rtype: str
+        """
+        return (f"Page cache: {self.hits} hits, {self.misses} misses "
+                f"(hit rate {self.hit_rate():.0%}), {len(self)} pages, "
+                f"{self.bytes} of {self.max_bytes} bytes, "
+                f"{self.evictions} evictions")
@@ -0,0 +1,188 @@
+import json
+import multiprocessing
+import os
+import re
+from collections import Counter
+from .scraper_class import Scraper
+from .fetcher_class import Fetcher
+from .page_archive_class import PageArchive
+from .boilerplate_pruner_class import BoilerplatePruner
+from .scraping_manager_class import ScrapingManager, save_counter_to_json
+
+# What reprocess_archive can rebuild
+EXTRACTS = ("counts", "links", "tables")
+# Number of records processed by a worker process at once
+CHUNK_SIZE = 64
+# Characters which can't be a part of a file name (subpage titles contain
+# "/", e.g. "Pikachu (Pokémon)/Generation I learnset")
+UNSAFE_FILE_NAME_CHARACTERS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def table_file_name(title):
+    """
+    :return: Name of the CSV file with a table of the given article.
+    :rtype: str
+    """
+    name = UNSAFE_FILE_NAME_CHARACTERS.sub("_", title.replace(" ", "_"))
+    if name.strip(".") == "":
+        name = name.replace(".", "_")
+    return f"{name}.csv"
+
+
+def archived_wiki_url(record):
+    """
+    :return: URL of the wiki a page of the archive was downloaded from (its
+             URL without the title, see Scraper.exact_url).
+    :rtype: str
+    """
+    suffix = "/" + record.title.replace(" ", "_")
+    if record.url.endswith(suffix):
+        return record.url[:-len(suffix)]
+    return record.url.rsplit("/", 1)[0]
+
+
+def _process_chunk(task):
+    """
+    Processes a chunk of archived pages in a worker process.
+    :param task: Tuple (archive path, records, extract, options).
+    :return: Counter (counts), dictionary title -> links (links) or number of
+             saved tables (tables).
+    """
+    archive_path, records, extract, options = task
+    archive = PageArchive(archive_path)
+    pruner = None
+    if options.get("pruning_profile"):
+        pruner = BoilerplatePruner.from_profile(options["pruning_profile"])
+    counts = Counter()
+    links = {}
+    tables_saved = 0
+    # Pages come from the archive, the fetcher (one session for the chunk)
+    # is never used
+    fetcher = Fetcher()
+    with open(archive_path, 'rb') as f:
+        for record in records:
+            scraper = Scraper(archived_wiki_url(record), record.title,
+                              fetcher=fetcher, pruner=pruner)
+            scraper.load_html(archive.read(record, f))
+            if extract == "counts":
+                counts.update(scraper.count_words(options["ngram"]) or {})
+            elif extract == "links":
+                links[record.title] = scraper.get_children_phrases() or []
+            else:
+                try:
+                    df = scraper.get_table(options["table_number"],
+                                           options["first_row_header"])
+                except ValueError:
+                    # The article doesn't have that many tables
+                    df = None
+                except Exception as e:
+                    # A table pandas can't read mustn't stop the others
+                    print(f"Skipping the table of {record.title}: {e}")
+                    df = None
+                if df is not None:
+                    df.to_csv(os.path.join(options["output_path"],
+                                           table_file_name(record.title)),
+                              index=True)
+                    tables_saved += 1
+            scraper.release()
+    fetcher.close()
+    if extract == "counts":
+        return counts
+    if extract == "links":
+        return links
+    return tables_saved
+
+
+def reprocess_archive(archive_path, extract="counts", output_path=None,
+                      processes=None, ngram=1, pruning_profile=None,
+                      table_number=None, first_row_header=False,
+                      chunk_size=CHUNK_SIZE):
+    """
+    Rebuilds results from a page archive written by auto_count_words,
+    without the network. The newest version of every archived article is
+    processed, in parallel by worker processes (one per core by default).
+
+    :param archive_path: Path to the archive.
+    :type archive_path: str
+    :param extract: What to rebuild: 'counts' (word counts, saved as JSON
+                    like count_words), 'links' (link graph: JSON dictionary
+                    title -> linked titles) or 'tables' (the table number
+                    `table_number` of every article, saved as CSV files).
+    :type extract: str
+    :param output_path: JSON file (counts, links; replaced, not merged) or
+                        directory (tables). Defaults:
+                        data/reprocessed-word-counts.json (or
+                        data/reprocessed-<N>-gram-counts.json),
+                        data/link-graph.json and data/tables.
+    :type output_path: str | None
+    :param processes: Number of worker processes (all cores if None).
+    :type processes: int | None
+    :param ngram: Length of the counted sequences of words.
+    :type ngram: int
+    :param pruning_profile: Boilerplate pruning profile (optional).
+    :type pruning_profile: str | None
+    :param table_number: Number of the table (required for 'tables').
+    :type table_number: int | None
+    :param first_row_header: Whether the first row of a table is a header.
+    :type first_row_header: bool
+    :param chunk_size: Number of articles sent to a worker at once.
+    :type chunk_size: int
+    :return: Number of processed articles.
+    :rtype: int
+    """
+    if extract not in EXTRACTS:
+        raise ValueError(f"Invalid extract: {extract}")
+    if extract == "tables" and table_number is None:
+        raise ValueError("Table number is required to extract tables")
+    if not os.path.exists(archive_path):
+        raise FileNotFoundError(f"File {archive_path} doesn't exist")
+    data_dir = os.path.dirname(ScrapingManager.DEFAULT_JSON_PATH)
+    if output_path is None:
+        if extract == "counts":
+            # Not the counts file of the crawls, which would be replaced
+            name = os.path.basename(ScrapingManager.default_json_path(ngram))
+            output_path = os.path.join(data_dir, f"reprocessed-{name}")
+        elif extract == "links":
+            output_path = os.path.join(data_dir, "link-graph.json")
+        else:
+            output_path = os.path.join(data_dir, "tables")
+    if extract == "tables":
+        os.makedirs(output_path, exist_ok=True)
+
+    records = PageArchive(archive_path).latest_records()
+    options = {"ngram": ngram, "pruning_profile": pruning_profile,
+               "table_number": table_number,
+               "first_row_header": first_row_header,
+               "output_path": output_path}
+    tasks = [(archive_path, records[i:i + chunk_size], extract, options)
+             for i in range(0, len(records), chunk_size)]
+
+    if processes == 1 or len(tasks) <= 1:
+        results = map(_process_chunk, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(_process_chunk, tasks)
+
+    try:
+        if extract == "counts":
+            total_counts = Counter()
+            for counts in results:
+                total_counts.update(counts)
+            save_counter_to_json(total_counts, output_path)
+        elif extract == "links":
+            link_graph = {}
+            for links in results:
+                link_graph.update(links)
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(link_graph, f, ensure_ascii=False, indent=4)
+        else:
+            tables_saved = sum(results)
+            print(f"Saved {tables_saved} tables to {output_path}")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    print(f"Reprocessed {len(records)} articles from {archive_path}")
+    return len(records)
@@ -1,19 +1,43 @@
+import codecs
+import copy
+import hashlib
 import io
 import os
 import re
+import threading
 from collections import Counter
 from urllib.parse import unquote
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 import pandas as pd
+from .fetcher_class import Fetcher
+from .streaming_parser_class import SummaryParser, TableParser
+
+
+class PageNotFoundError(ValueError):
+    """
+    Raised when the wiki has no article with the requested title (404).
+    Unlike connection errors, retrying doesn't help.
+    """
 
 
 class Scraper:
     """
     Class for processing single page/file for provided phrase
     """
-
-    def __init__(self, wiki_url, phrase=None, use_local_html_file_instead=False):
+    # Size of the chunks fed to the incremental parser in streaming mode
+    STREAM_CHUNK_SIZE = 16 * 1024
+    # MediaWiki puts the revision id of the page into an inline script
+    REVISION_ID_PATTERN = re.compile(r'"wgRevisionId"\s*:\s*(\d+)')
+    # Version of the tokenize rules. It has to be increased whenever they
+    # change, so that incremental indexes count their articles again.
+    TOKENIZER_VERSION = 1
+    # BeautifulSoup copies a tree with the parser (TreeBuilder) of the
+    # original, which isn't thread-safe, so copies are made one at a time
+    COPY_LOCK = threading.Lock()
+
+    def __init__(self, wiki_url, phrase=None, use_local_html_file_instead=False,
+                 fetcher=None, pruner=None):
         """
         :param wiki_url: URL link to the wiki (or path to a local file)
                          which will be scraped from
@@ -26,6 +50,17 @@ class Scraper:
         :param use_local_html_file_instead: True/False if wiki_url is a path to
                                             a single local HTML file.
         :type use_local_html_file_instead: bool
+
+        :param fetcher: Fetcher used for HTTP requests (timeouts, retries).
+                        A Fetcher with default settings is created if None.
+        :type fetcher: Fetcher | None
+
+        :param pruner: If set, boilerplate (navigation boxes, references
+                       etc.) is removed from the article before its words
+                       and links are extracted. The removal changes the
+                       loaded page, so tables and the summary read
+                       afterwards come from the pruned page.
+        :type pruner: BoilerplatePruner | None
         """
         if not use_local_html_file_instead and phrase is None:
             raise ValueError("Phrase can only be None when "
@@ -39,12 +74,65 @@ class Scraper:
         self.base_url = wiki_url
         self.read_local_file = use_local_html_file_instead  # Bool value
         self.soup = None  # Page content will be loaded as a BeautifulSoup inst
+        self.fetcher = fetcher if fetcher is not None else Fetcher()
+        self.bytes_fetched = 0  # Size of the downloaded page (in bytes)
+        self.raw_html = None  # Downloaded page (bytes), e.g. for archiving
+        # HTTP validators of the downloaded page (used by conditional
+        # requests) and whether the server answered "304 Not Modified"
+        self.etag = None
+        self.last_modified = None
+        self.not_modified = False
+        self.pruner = pruner
+        self.pruned = False
+        self.pruning_report = None  # What the pruner removed from the page
 
         if use_local_html_file_instead:
             self.exact_url = wiki_url
         else:
             self.exact_url = f"{wiki_url}/{phrase.replace(' ', '_')}"
 
+    def release(self):
+        """
+        Frees the parsed page. BeautifulSoup trees are full of reference
+        cycles (parents, siblings), so without this a dropped tree stays in
+        memory until the cyclic garbage collector runs, and during a crawl
+        many trees pile up. Methods called afterwards load the page again.
+        """
+        self.raw_html = None
+        if self.soup is not None:
+            # The BeautifulSoup object isn't linked to its first element,
+            # so decomposing it alone leaves the tree intact
+            for child in list(self.soup.contents):
+                if isinstance(child, Tag):
+                    child.decompose()
+            self.soup.decompose()
+            self.soup = None
+        self.pruned = False
+
+    def copy(self):
+        """
+        Returns a Scraper of the same page with its own copy of the parsed
+        tree, which can be pruned or released without affecting this one.
+        :rtype: Scraper
+        """
+        other = copy.copy(self)
+        if self.soup is not None:
+            with self.COPY_LOCK:
+                other.soup = copy.copy(self.soup)
+        return other
+
+    def load_html(self, html):
+        """
+        Loads the page from already downloaded HTML (e.g. from an archive)
+        instead of fetching it.
+        :param html: HTML of the page.
+        :type html: bytes
+        """
+        self.raw_html = html
+        self.bytes_fetched = len(html)
+        self.soup = BeautifulSoup(html, "html.parser")
+        self.pruned = False
+
     def get_children_phrases(self):
         """
         Extracts and returns all relevant child phrases from the parsed HTML
@@ -57,6 +145,7 @@ class Scraper:
         """
         if not self.soup:
             self.fetch_data()
+        self.prune_boilerplate()
 
         content = self.soup.find('div', id='mw-content-text')
         if not content:
@@ -76,27 +165,66 @@ class Scraper:
             result_phrases.append(link_title)
         return result_phrases
 
-    def fetch_data_from_wiki(self):
+    def prune_boilerplate(self):
+        """
+        Removes boilerplate from the article's content with the Scraper's
+        pruner (once per loaded page; does nothing without a pruner).
+        :return: Report of the pruning or None.
+        :rtype: dict | None
+        """
+        if self.pruner is None or self.pruned or not self.soup:
+            return self.pruning_report
+        content = self.soup.find('div', id='mw-content-text')
+        if content:
+            self.pruning_report = self.pruner.prune(content)
+        self.pruned = True
+        return self.pruning_report
+
+    def fetch_data_from_wiki(self, headers=None):
         """
         Fetch data from the Wiki page with a title which is equal to Scraper's phrase
+        :param headers: Additional request headers (e.g. If-None-Match for a
+                        conditional request). If the server answers with
+                        "304 Not Modified", `not_modified` is set and no soup
+                        is loaded.
+        :type headers: dict | None
         :return: True in case of a success, otherwise raises an Exception
+        :raises ConnectionError: If the page couldn't be downloaded even after
+            retries.
         """
+        try:
+            # Timeouts, retries of transient errors and hedging are handled
+            # by the fetcher
+            response = self.fetcher.get(self.exact_url, headers=headers)
+        except requests.RequestException as e:
+            # Every attempt failed, so the page is treated as unreachable
+            raise ConnectionError(f"Error while fetching the data: {e}")
 
-        headers = {"User-Agent": "WikiScraperAcademicProject"}
         try:
-            response = requests.get(self.exact_url, headers=headers)
             # Check if such site exists (404 - Not Found, 200 - OK)
             if response.status_code == 404:
-                raise ValueError(f"{self.phrase} not found on {self.base_url}")
+                raise PageNotFoundError(f"{self.phrase} not found on "
+                                        f"{self.base_url}")
 
             # If an error occurred, return HTTPError object
             response.raise_for_status()
 
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+            if response.status_code == 304:
+                self.not_modified = True
+                return True
+
             # Save BeautifulSoup object
-            self.soup = BeautifulSoup(response.content, "html.parser")
+            self.load_html(response.content)
 
             return True
 
+        except requests.HTTPError as e:
+            # Server errors which persisted through all the retries
+            raise ConnectionError(f"Error while fetching the data: {e}")
+        except PageNotFoundError:
+            raise
         except Exception as e:
             raise Exception(f"Error while fetching the data: {e}")
 
@@ -110,11 +238,13 @@ class Scraper:
         try:
             with open(self.exact_url, 'r', encoding='utf-8') as f:
                 self.soup = BeautifulSoup(f, "html.parser")
+            self.pruned = False
+            self.bytes_fetched = os.path.getsize(self.exact_url)
         except Exception as e:
             raise Exception(f"Error {e} while accessing the file: {self.exact_url}")
         return True
 
-    def fetch_data(self):
+    def fetch_data(self, headers=None):
         """
         Fetches data from either a local file or a remote URL depending on the
         `read_local_file` attribute. If `read_local_file` is set to True, it
@@ -123,6 +253,8 @@ class Scraper:
         remote URL using the `fetch_data_from_wiki` method. If there was an
         error, ConnectionError is raised.
 
+        :param headers: Additional request headers (ignored for local files).
+        :type headers: dict | None
         :return: `True` if data is successfully fetched and the soup object is
                  initialized.
         :rtype: bool
@@ -134,20 +266,130 @@ class Scraper:
                 raise ConnectionError(f"Failed to load data from local file: "
                                       f"{self.base_url}")
         else:
-            if not self.fetch_data_from_wiki():
+            if not self.fetch_data_from_wiki(headers):
                 raise ConnectionError(f"Failed to load data from "
                                       f"{self.exact_url}")
+            if self.not_modified:
+                # Nothing to parse, the caller already has the content
+                return True
         if not self.soup:
             raise ConnectionError(f"Couldn't load soup from {self.exact_url}")
         return True
 
-    def get_summary(self):
+    def get_revision_id(self):
+        """
+        Reads the MediaWiki revision id of the loaded page.
+        :return: Revision id or None if the page doesn't contain it.
+        :rtype: int | None
+        """
+        if not self.soup:
+            self.fetch_data()
+        for script in self.soup.find_all('script'):
+            match = self.REVISION_ID_PATTERN.search(script.get_text())
+            if match:
+                return int(match.group(1))
+        return None
+
+    def get_content_hash(self):
+        """
+        Computes a hash of the article's text. Unlike a hash of the whole
+        response, it doesn't change when only the page's surroundings (menus,
+        timestamps) change.
+        :return: Hex digest or None if the content wasn't found.
+        :rtype: str | None
+        """
+        if not self.soup:
+            self.fetch_data()
+        main_soup = self.soup.find("div", id="mw-content-text")
+        if not main_soup:
+            return None
+        text = main_soup.get_text()
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def stream_encoding(response):
+        """
+        Returns the encoding of a streamed page: the charset of its
+        Content-Type header, or UTF-8 (the encoding of MediaWiki pages) if
+        the header has none. requests would assume ISO-8859-1 for text/html
+        without a charset, and its guess from the content (apparent_encoding)
+        needs the whole page.
+        :rtype: str
+        """
+        content_type = response.headers.get('content-type', '')
+        if response.encoding and 'charset' in content_type.lower():
+            try:
+                return codecs.lookup(response.encoding).name
+            except LookupError:
+                pass
+        return 'utf-8'
+
+    def stream_parse(self, parser):
+        """
+        Downloads (or reads) the page in chunks and feeds them into the
+        incremental parser until it reports that it's done. The rest of the
+        page is never downloaded - the connection is closed right away.
+        :param parser: Parser from streaming_parser_class.
+        :type parser: SummaryParser | TableParser
+        :return: The parser (with its result filled in if it was found).
+        :raises ConnectionError: If the page couldn't be downloaded.
+        """
+        self.bytes_fetched = 0
+        if self.read_local_file:
+            if not os.path.exists(self.exact_url):
+                raise FileNotFoundError(f"File {self.exact_url} doesn't exist")
+            with open(self.exact_url, 'r', encoding='utf-8') as f:
+                while not parser.done:
+                    chunk = f.read(self.STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    self.bytes_fetched += len(chunk)
+                    parser.feed(chunk)
+            parser.close()
+            return parser
+
+        try:
+            response = self.fetcher.get(self.exact_url, stream=True)
+        except requests.RequestException as e:
+            raise ConnectionError(f"Error while fetching the data: {e}")
+        try:
+            if response.status_code == 404:
+                raise PageNotFoundError(f"{self.phrase} not found on "
+                                        f"{self.base_url}")
+            try:
+                response.raise_for_status()
+            except requests.HTTPError as e:
+                raise ConnectionError(f"Error while fetching the data: {e}")
+            decoder = codecs.getincrementaldecoder(
+                self.stream_encoding(response))(errors='replace')
+            for chunk in response.iter_content(self.STREAM_CHUNK_SIZE):
+                self.bytes_fetched += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                if parser.done:
+                    break
+            else:
+                parser.feed(decoder.decode(b'', final=True))
+                parser.close()
+        except requests.RequestException as e:
+            raise ConnectionError(f"Error while fetching the data: {e}")
+        finally:
+            # Don't download the rest of the page
+            response.close()
+        return parser
+
+    def get_summary(self, streaming=False):
         """
         Gets the first paragraph of an article corresponding with Scraper's
         phrase.
+        :param streaming: If True and the page isn't loaded yet, the page is
+                          parsed while it's downloaded and the download stops
+                          right after the first paragraph.
+        :type streaming: bool
         :return: String value of the first paragraph's text or None if nothing
                  was found.
         """
+        if not self.soup and streaming:
+            return self.stream_parse(SummaryParser()).result
         if not self.soup:
             self.fetch_data()
 
@@ -169,7 +411,8 @@ class Scraper:
                 return text
         return None
 
-    def get_table(self, table_number, first_row_header=False):
+    def get_table(self, table_number, first_row_header=False,
+                  streaming=False):
         """
         Extracts a specific HTML table from a processed article and converts it
         into a pandas DataFrame. Supports optionally treating the first row of
@@ -185,12 +428,25 @@ class Scraper:
             assigned. Default is False.
         :type first_row_header: bool
 
+        :param streaming: If True and the page isn't loaded yet, the page is
+            parsed while it's downloaded and the download stops right after
+            the wanted table.
+        :type streaming: bool
+
         :return: A pandas DataFrame object containing the desired table's data
             if successfully extracted, or None if the table is unavailable or
             an error occurs during the extraction.
         :rtype: DataFrame | None
         """
 
+        if not self.soup and streaming:
+            parser = self.stream_parse(TableParser(table_number))
+            if parser.result is None:
+                raise ValueError(f"Asked for {table_number} table, but only "
+                                 f"{parser.tables_seen} are available.")
+            return self.table_to_dataframe(parser.result, table_number,
+                                           first_row_header)
+
         if not self.soup:
             self.fetch_data()
 
@@ -202,11 +458,27 @@ class Scraper:
                   f"are available.")
 
         target_table = tables[table_number - 1]  # table_number is indexed from 1
+        # convert content into a string
+        return self.table_to_dataframe(str(target_table), table_number,
+                                       first_row_header)
 
+    def table_to_dataframe(self, html_string, table_number,
+                           first_row_header=False):
+        """
+        Converts HTML of a single table into a pandas DataFrame (the first
+        column is treated as a header of rows).
+        :param html_string: HTML of the table.
+        :type html_string: str
+        :param table_number: Index of the table (used in error messages).
+        :type table_number: int
+        :param first_row_header: Whether the first row is a columns header.
+        :type first_row_header: bool
+        :return: DataFrame with the table or None if it couldn't be read.
+        :rtype: DataFrame | None
+        """
         # Use pandas.read_html( ... ) to read from target_table
         try:
             header_arg = 0 if first_row_header else None
-            html_string = str(target_table)  # convert content into a string
             html_file = io.StringIO(html_string)
             # if a header parameter is x, then xth row becomes a columns
             # header (if header == None, then there's no columns header)
@@ -221,17 +493,41 @@ class Scraper:
             raise Exception(f"Error while reading {table_number} table from "
                   f"{self.exact_url}: {e}")
 
-    def count_words(self):
+    @staticmethod
+    def tokenize(text):
         """
-        Counts the frequency of each word in the provided article (skips
-        common page elements like a menu etc.)
-        :return: Counter of how many times each word occurred in the article
-                 or None if couldn't find content.
-        :rtype: Counter | None
+        Splits text into a list of processed (lowercase) words.
+        :param text: Text to split.
+        :type text: str
+        :rtype: list[str]
         """
+        # split text into a list of processed words
+        raw_words = text.lower().split()
+        # List of all processed words
+        words = []
+        for word in raw_words:
+            # Remove punctuation and irrelevant characters from the edges.
+            # Words having non-letter characters inside (without any blank
+            # space around non-letter character) are treated as a single word
+            # (e.g. "II/IV" is considered one word: "II/IV", "word." is
+            # processed into "word")
+            cleaned = re.sub(r'^\W+|\W+$', '', word, flags=re.UNICODE)
+            if cleaned:  # Only add non-empty words
+                words.append(cleaned)
+        return words
 
+    def get_word_segments(self):
+        """
+        Returns processed words of the article: of the main content and of
+        the title, as two separate lists (so that n-grams don't join the end
+        of the article with its title).
+        :return: [main content words, title words] or None if couldn't find
+                 content.
+        :rtype: list[list[str]] | None
+        """
         if not self.soup:
             self.fetch_data()
+        self.prune_boilerplate()
 
         # Count words from both the main article content and title
         title_soup = self.soup.find("h1",
@@ -248,22 +544,31 @@ class Scraper:
             # Content wasn't found
             return None
         main_text = main_soup.get_text().strip()
-        # Add title text to the main text and convert resulting text to lower
-        main_text = (main_text + " " + title_text).lower()
-
-        # split main_text into a list of processed words
-        raw_words = main_text.split()
-        # List of all processed words of the current article to be counted
-        words = []
-        for word in raw_words:
-            # Remove punctuation and irrelevant characters from the edges.
-            # Words having non-letter characters inside (without any blank
-            # space around non-letter character) are treated as a single word
-            # (e.g. "II/IV" is considered one word: "II/IV", "word." is
-            # processed into "word")
-            cleaned = re.sub(r'^\W+|\W+$', '', word, flags=re.UNICODE)
-            if cleaned:  # Only add non-empty words
-                words.append(cleaned)
+        return [self.tokenize(main_text), self.tokenize(title_text)]
 
-        current_counts = Counter(words)
-        return current_counts
+    def count_words(self, ngram=1):
+        """
+        Counts the frequency of each word in the provided article (skips
+        common page elements like a menu etc.)
+        :param ngram: Length of the counted sequences of words (1 counts
+                      single words, 2 bigrams etc.). N-grams are returned as
+                      words joined with a space.
+        :type ngram: int
+        :return: Counter of how many times each word occurred in the article
+                 or None if couldn't find content.
+        :rtype: Counter | None
+        """
+        if ngram < 1:
+            raise ValueError(f"Invalid n-gram length: {ngram}")
+        segments = self.get_word_segments()
+        if segments is None:
+            return None
+        main_words, title_words = segments
+        if ngram == 1:
+            current_counts = Counter(main_words + title_words)
+            return current_counts
+        return Counter(
+            " ".join(words[i:i + ngram])
+            for words in segments
+            for i in range(len(words) - ngram + 1)
+        )
@@ -1,23 +1,43 @@
 import json
+import multiprocessing
 import os
+import threading
 import time
 from collections import Counter
-from queue import Queue
-from .scraper_class import Scraper
+from queue import Queue, Empty, Full
+from .scraper_class import Scraper, PageNotFoundError
+from .fetcher_class import Fetcher
+from .crawl_frontier_class import create_frontier
+from .crawl_budget_class import CrawlBudget, SaturationMonitor
+from .shared_work_queue_class import SharedWorkQueue
+from .crawl_worker_class import run_crawl_worker, default_worker_id
+from .article_index_class import ArticleIndex, replace_contribution
+from .counting_backend_class import create_counting_backend, \
+    iter_count_batches
+from .ngram_counter_class import NGramCounter
+from .article_record_class import ArticleRecord
+from .page_cache_class import PageCache, canonical_title
+from .boilerplate_pruner_class import BoilerplatePruner
+from .memory_monitor_class import MemoryMonitor
+from .page_archive_class import PageArchive
+from .term_matrix_class import TermMatrix, TermMatrixBuilder
 
 
 def save_counter_to_json(counter, json_path):
     """
-    Saves a Counter object to a JSON file.
+    Saves a Counter object to a JSON file. The file is replaced atomically,
+    so an interrupted save leaves the previous counts.
     :param counter: The Counter object to save.
     :param json_path: Path to the JSON file.
     """
+    temporary_path = f"{json_path}.tmp"
     try:
-        with open(json_path, 'w', encoding='utf-8') as file:
+        with open(temporary_path, 'w', encoding='utf-8') as file:
             # ensure_ascii=False is crucial for dealing with non-English
             # characters.
             # indent=4 makes a file easily readable.
             json.dump(counter, file, indent=4, ensure_ascii=False)
+        os.replace(temporary_path, json_path)
     except IOError as e:
         raise IOError(f"Error while writing to {json_path}: {e}")
 
@@ -45,26 +65,144 @@ class ScrapingManager:
     # encountered when running count_words
     DEFAULT_JSON_PATH = os.path.join(os.getcwd(), 'data', 'word-counts.json')
 
-    def __init__(self, wiki_url, use_local_html_file_instead=False):
+    @classmethod
+    def default_json_path(cls, ngram=1, counting="exact"):
+        """
+        Returns the default JSON path for counts of n-grams of the given
+        length (n-grams are kept apart from the single words, so that the
+        word frequency analysis isn't affected by them). Approximate
+        ('top-k') counts are kept apart from the exact ones as well, e.g.
+        in data/word-counts.top-k.json.
+        :rtype: str
+        """
+        if ngram == 1:
+            path = cls.DEFAULT_JSON_PATH
+        else:
+            path = os.path.join(os.path.dirname(cls.DEFAULT_JSON_PATH),
+                                f"{ngram}-gram-counts.json")
+        if counting == "top-k":
+            root, extension = os.path.splitext(path)
+            path = f"{root}.top-k{extension}"
+        return path
+
+    @staticmethod
+    def default_index_path(json_path):
+        """
+        Returns the default path of the index used by the incremental mode
+        with the given counts file (e.g. data/word-counts.index.json for
+        data/word-counts.json). The index records which contributions are
+        in one counts file, so every counts file has its own index.
+        :rtype: str
+        """
+        root, _ = os.path.splitext(json_path)
+        return f"{root}.index.json"
+
+    def __init__(self, wiki_url, use_local_html_file_instead=False,
+                 fetcher=None, cache_bytes=None, pruning_profile=None):
         """
         Initialize ScrapingManager class
         :param wiki_url: URL to the main wiki site or path to a local file.
         :param use_local_html_file_instead: Whether to use a local HTML file.
                                             Default=False
+        :param fetcher: Fetcher shared by all created Scrapers (timeouts,
+                        retries, hedging and latency statistics). A Fetcher
+                        with default settings is used if None.
+        :param cache_bytes: If set, parsed pages are kept in an LRU cache of
+                            about this many bytes and reused by the following
+                            operations on the same article (summary, tables,
+                            word counts, crawls).
+        :type cache_bytes: int | None
+        :param pruning_profile: If set, boilerplate of the given profile
+                                ('mediawiki' or 'bulbapedia', see
+                                boilerplate_pruner_class) is removed before
+                                words and links are extracted.
+        :type pruning_profile: str | None
         """
         self.wiki_url = wiki_url
         self.use_local_file = use_local_html_file_instead
+        self.fetcher = fetcher if fetcher is not None else Fetcher()
+        self.page_cache = PageCache(cache_bytes) if cache_bytes else None
+        self.pruning_profile = pruning_profile
+        self.pruner = BoilerplatePruner.from_profile(pruning_profile) \
+            if pruning_profile else None
+
+    def _index_settings(self):
+        """
+        :return: Settings which affect the counts of an article, stored in
+                 the incremental index with every article.
+        :rtype: dict
+        """
+        return {"pruning_profile": self.pruning_profile,
+                "tokenizer": Scraper.TOKENIZER_VERSION}
+
+    def close(self):
+        """
+        Releases the network resources of the fetcher (pooled connections,
+        hedging threads).
+        """
+        self.fetcher.close()
+
+    def _load_scraper(self, phrase=None, full_page=False):
+        """
+        Returns a Scraper with the loaded page of the phrase (or of the local
+        file), taken from the page cache if possible. Cached pages are kept
+        unpruned; with a pruner the caller gets its own copy to prune.
+        :param full_page: If True, the page is only read as it is (e.g. for
+                          tables), so a cached page is returned without
+                          copying and without a pruner.
+        :type full_page: bool
+        :raises ConnectionError: If the page couldn't be loaded.
+        :rtype: Scraper
+        """
+        if self.page_cache is None:
+            scraper = Scraper(self.wiki_url, phrase, self.use_local_file,
+                              self.fetcher, self.pruner)
+            scraper.fetch_data()
+            return scraper
+
+        key = canonical_title(phrase) if phrase is not None else self.wiki_url
+        scraper = self.page_cache.get(key)
+        if scraper is None:
+            scraper = Scraper(self.wiki_url, phrase, self.use_local_file,
+                              self.fetcher)
+            scraper.fetch_data()
+            self.page_cache.put(key, scraper)
+        if self.pruner is None or full_page or \
+                not self.page_cache.shares(scraper):
+            return scraper
+        # Other threads may be reading the cached tree, pruning changes it
+        scraper = scraper.copy()
+        scraper.pruner = self.pruner
+        return scraper
+
+    def _release_scraper(self, scraper):
+        """
+        Frees the parsed page of a processed article, unless it's shared
+        through the page cache.
+        """
+        if self.page_cache is None or not self.page_cache.shares(scraper):
+            scraper.release()
 
     def auto_count_words(self, starting_phrase, max_depth,
-                         waiting_time=0.0, json_path=DEFAULT_JSON_PATH):
+                         waiting_time=0.0, json_path=None,
+                         strategy="bfs", max_pages=None, max_seconds=None,
+                         max_bytes=None, saturation_threshold=None,
+                         saturation_window=20, incremental=False,
+                         index_path=None, counting="exact",
+                         memory_budget=None, ngram=1, max_ngrams=None,
+                         seeds=None, memory_report_every=None,
+                         archive_path=None, term_matrix_path=None):
         """
         Automatically traverses through linked articles starting from the
         given phrase, counts words in each article, and processes linked
         articles up to the maximum depth. Creates or updates JSON file with
         counted values.
+        With `seeds` the given titles are processed instead, and no links are
+        followed.
 
-        :param json_path: JSON path
-        :type json_path: str
+        :param json_path: JSON path (default depends on `ngram` and
+                          `counting`, see default_json_path)
+        :type json_path: str | None
         :param starting_phrase: The initial phrase to start processing from.
         :type starting_phrase: str
         :param max_depth: The maximum depth to traverse from the starting
@@ -73,70 +211,540 @@ class ScrapingManager:
         :param waiting_time: number of seconds to wait between processing
                             articles.
         :type waiting_time: float
+        :param strategy: Order of processing articles: 'bfs' (by depth),
+                         'inlinks' (most linked articles first) or 'novelty'
+                         (articles linked from the most novel ones first).
+        :type strategy: str
+        :param max_pages: Maximum number of processed articles (optional).
+        :type max_pages: int | None
+        :param max_seconds: Maximum duration of the crawl (optional).
+        :type max_seconds: float | None
+        :param max_bytes: Maximum number of downloaded bytes (optional).
+        :type max_bytes: int | None
+        :param saturation_threshold: If set, the crawl stops when the average
+                                     number of new words per article (over the
+                                     last `saturation_window` articles) drops
+                                     below this value.
+        :type saturation_threshold: float | None
+        :param saturation_window: Number of articles used by the saturation
+                                  rule.
+        :type saturation_window: int
+        :param incremental: If True, every article's own counts are kept in
+                            the index, so a recrawl replaces the previous
+                            contribution of changed articles and skips the
+                            unchanged ones (their stored links are followed).
+        :type incremental: bool
+        :param index_path: Path to the index used in the incremental mode
+                           (default depends on `json_path`, see
+                           default_index_path).
+        :type index_path: str | None
+        :param counting: How the total counts are kept: 'exact' (in memory),
+                         'spill' (exact, sorted runs spilled to disk when the
+                         memory budget is used up) or 'top-k' (approximate
+                         counts of the most frequent words within the memory
+                         budget).
+        :type counting: str
+        :param memory_budget: Approximate memory (in bytes) for the counts,
+                              required by 'spill' and 'top-k'.
+        :type memory_budget: int | None
+        :param ngram: Length of the counted sequences of words (1 counts
+                      single words, 2 bigrams etc.).
+        :type ngram: int
+        :param max_ngrams: If set, rare n-grams are pruned whenever more
+                           than this number of n-grams is stored.
+        :type max_ngrams: int | None
+        :param seeds: Titles which are the exact work list of the crawl
+                      (e.g. from a seed source, see seed_source_class).
+                      `starting_phrase` and `max_depth` are ignored.
+        :type seeds: Iterable[str] | None
+        :param memory_report_every: If set, memory usage (tracemalloc and
+                                    peak RSS) is printed every this many
+                                    articles.
+        :type memory_report_every: int | None
+        :param archive_path: If set, every downloaded page is appended to a
+                             compressed archive (WARC) at this path, from
+                             which counts, links and tables can be rebuilt
+                             later without the network (see
+                             reprocess_archive).
+        :type archive_path: str | None
+        :param term_matrix_path: If set, the counts of every article are
+                                 also kept apart, as a row of a sparse
+                                 document-term matrix saved to this path
+                                 (see TermMatrix). An existing matrix is
+                                 extended; recounted articles replace their
+                                 rows.
+        :type term_matrix_path: str | None
         :return: None
         """
         if self.use_local_file:
             raise ValueError("Can't use auto_count_words on a single local "
                              "file!")
+        if seeds is None and not starting_phrase:
+            raise ValueError("Starting phrase is required without seeds")
+        if incremental and counting == "top-k":
+            raise ValueError("Incremental mode requires exact counting")
+        if ngram > 1 and (incremental or counting != "exact"):
+            raise ValueError("N-gram counting can't be combined with the "
+                             "incremental mode or other counting backends")
+        if json_path is None:
+            json_path = self.default_json_path(ngram, counting)
+        if counting == "top-k" and os.path.abspath(json_path) == \
+                os.path.abspath(self.default_json_path(ngram)):
+            # save() would replace the exact counts with the top words only
+            raise ValueError(f"Approximate counts can't be saved to the "
+                             f"exact counts file {json_path}")
+
+        frontier = create_frontier(strategy)
+        if seeds is None:
+            frontier.push(starting_phrase, 0)
+        else:
+            # All seeds are at depth 0, so no links are followed
+            max_depth = 0
+            for phrase in dict.fromkeys(seeds):
+                frontier.push(phrase, 0)
+            print(f"Seeded the crawl with {len(frontier)} articles.")
+        budget = CrawlBudget(max_pages, max_seconds, max_bytes)
+        saturation = None
+        if saturation_threshold is not None:
+            saturation = SaturationMonitor(saturation_threshold,
+                                           saturation_window)
+
+        index = None
+        if incremental:
+            # Created first, it completes an interrupted save of the counts
+            index = ArticleIndex(index_path or
+                                 self.default_index_path(json_path),
+                                 self._index_settings(), json_path)
+        # Load the initial content of the JSON file and update it as the
+        # crawl goes. At the end of this function load new content only once
+        # to the JSON file. The file is read in batches, so that its whole
+        # content is never in memory next to the counting backend.
+        if ngram > 1:
+            total_counts = NGramCounter(ngram, max_ngrams)
+            for batch in iter_count_batches(json_path):
+                total_counts.add_joined(batch)
+        else:
+            total_counts = create_counting_backend(counting, memory_budget)
+            for batch in iter_count_batches(json_path):
+                total_counts.add(batch)
+        unchanged_articles = 0
+        archive = PageArchive(archive_path) if archive_path else None
+        term_matrix = None
+        if term_matrix_path:
+            if os.path.exists(term_matrix_path):
+                term_matrix = TermMatrixBuilder.from_matrix(
+                    TermMatrix.load(term_matrix_path))
+            else:
+                term_matrix = TermMatrixBuilder()
+
+        def fetch(phrase):
+            if index is None:
+                return self._load_scraper(phrase)
+            # Conditional requests bypass the page cache
+            scraper = Scraper(self.wiki_url, phrase, fetcher=self.fetcher,
+                              pruner=self.pruner)
+            scraper.fetch_data(
+                index.conditional_headers(canonical_title(phrase)))
+            return scraper
+
+        def process(scraper, phrase, depth):
+            if archive is not None and scraper.raw_html is not None:
+                archive.append(phrase, scraper.exact_url, scraper.raw_html)
+
+            old_counts = None
+            if index is not None:
+                old_counts, counts, links = self._refresh_article(
+                    scraper, canonical_title(phrase), index)
+            elif ngram > 1:
+                segments = scraper.get_word_segments() or []
+                counts = total_counts.count_segments(segments)
+                links = scraper.get_children_phrases() or []
+            else:
+                counts = scraper.count_words() or Counter()
+                # Get titles of all articles linked from the current phrase.
+                links = scraper.get_children_phrases() or []
+            if scraper.pruning_report is not None:
+                print(f"{phrase}: " + BoilerplatePruner.describe(
+                    scraper.pruning_report))
+
+            if counts is None:
+                # Unchanged article, its contribution is already counted
+                return ArticleRecord(phrase, depth, old_counts, links,
+                                     bytes_fetched=scraper.bytes_fetched,
+                                     unchanged=True)
+            new_words = sum(1 for word in counts if word not in total_counts)
+            return ArticleRecord(phrase, depth, counts, links,
+                                 bytes_fetched=scraper.bytes_fetched,
+                                 new_words=new_words,
+                                 previous_counts=old_counts)
+
+        memory_monitor = None
+        if memory_report_every is not None:
+            memory_monitor = MemoryMonitor(memory_report_every)
+            memory_monitor.start()
+        try:
+            for record in self._crawl_articles(frontier, max_depth,
+                                               waiting_time, budget, process,
+                                               fetch):
+                if term_matrix is not None:
+                    # Unchanged articles keep their stored counts. N-gram
+                    # keys are decoded before adding, which may prune the
+                    # words they use.
+                    article_counts = record.counts
+                    if ngram > 1:
+                        article_counts = {total_counts.decode(key): count
+                                          for key, count in
+                                          article_counts.items()}
+                    term_matrix.add_article(record.title, article_counts)
+                if record.unchanged:
+                    unchanged_articles += 1
+                else:
+                    # Combine the counts of the article with the total ones
+                    if record.previous_counts:
+                        total_counts.remove(record.previous_counts)
+                    total_counts.add(record.counts)
+                if memory_monitor is not None:
+                    memory_monitor.record_page()
+
+                if saturation is not None and not record.unchanged:
+                    saturation.record(record.new_words)
+                    if saturation.saturated():
+                        print(f"Stopping the crawl: only "
+                              f"{saturation.marginal_new_words():.2f} new "
+                              f"words per article recently.")
+                        break
+
+            # End of the crawl. Update JSON files
+            if index is not None:
+                # The counts have to match the index
+                index.save(total_counts.save)
+                print(f"Unchanged articles skipped: {unchanged_articles}")
+            else:
+                total_counts.save(json_path)
+            if term_matrix is not None:
+                matrix = term_matrix.build()
+                matrix.save(term_matrix_path)
+                print(f"Term matrix: {matrix.shape[0]} articles x "
+                      f"{matrix.shape[1]} terms, {matrix.nnz} values "
+                      f"({matrix.nbytes} bytes), saved to "
+                      f"{term_matrix_path}")
+            print(f"Processed {budget.pages} articles ({budget.bytes} "
+                  f"bytes), vocabulary size: {len(total_counts)}")
+            print(self.fetcher.latency_report())
+            if self.page_cache is not None:
+                print(self.page_cache.report())
+            if self.pruner is not None:
+                print(self.pruner.report())
+            if memory_monitor is not None:
+                print(memory_monitor.report())
+        finally:
+            # Spilled runs are temporary files, even when the crawl fails
+            total_counts.close()
+            # Tracing slows everything down, it mustn't outlive the crawl
+            if memory_monitor is not None:
+                memory_monitor.stop()
+
+    def iter_articles(self, starting_phrase, max_depth, waiting_time=0.0,
+                      buffer_size=8, strategy="bfs", max_pages=None):
+        """
+        Crawls linked articles like auto_count_words, but instead of merging
+        the results it yields a record for every article as soon as it's
+        processed. Articles are fetched in a background thread which stays
+        at most `buffer_size` records ahead of the consumer: when the buffer
+        is full, the crawl waits (backpressure), so memory use doesn't depend
+        on the size of the crawl. Closing the generator (e.g. breaking out
+        of the loop) stops the crawl.
+
+        :param starting_phrase: The initial phrase to start processing from.
+        :type starting_phrase: str
+        :param max_depth: The maximum depth to traverse from the starting
+                          article.
+        :type max_depth: int
+        :param waiting_time: number of seconds to wait between processing
+                            articles.
+        :type waiting_time: float
+        :param buffer_size: Maximum number of processed articles waiting for
+                            the consumer. 0 means no background thread: an
+                            article is fetched only when the consumer asks
+                            for it.
+        :type buffer_size: int
+        :param strategy: Order of processing articles ('bfs', 'inlinks' or
+                         'novelty'; see auto_count_words).
+        :type strategy: str
+        :param max_pages: Maximum number of processed articles (optional).
+        :type max_pages: int | None
+        :return: Generator of records of the processed articles.
+        :rtype: Iterator[ArticleRecord]
+        """
+        if self.use_local_file:
+            raise ValueError("Can't use iter_articles on a single local "
+                             "file!")
+        if buffer_size < 0:
+            raise ValueError(f"Invalid buffer size: {buffer_size}")
+        frontier = create_frontier(strategy)
+        frontier.push(starting_phrase, 0)
+        seen_words = set()
 
+        def process(scraper, phrase, depth):
+            # The summary is read first, before boilerplate is pruned
+            summary = scraper.get_summary()
+            counts = scraper.count_words() or Counter()
+            new_words = counts.keys() - seen_words
+            seen_words.update(new_words)
+            return ArticleRecord(phrase, depth, counts,
+                                 scraper.get_children_phrases() or [],
+                                 summary=summary,
+                                 bytes_fetched=scraper.bytes_fetched,
+                                 new_words=len(new_words))
+
+        stop = threading.Event()
+        crawl = self._crawl_articles(frontier, max_depth, waiting_time,
+                                     CrawlBudget(max_pages=max_pages),
+                                     process, stop=stop)
+        if buffer_size == 0:
+            return crawl
+        return self._buffered(crawl, buffer_size, stop)
+
+    def _crawl_articles(self, frontier, max_depth, waiting_time, budget,
+                        process, fetch=None, stop=None):
+        """
+        The crawl loop of auto_count_words and iter_articles. Takes articles
+        from the frontier until it's empty or the budget is exhausted,
+        yields a record of every processed article and pushes its links
+        (prioritized by the novelty of the article).
+        :param frontier: Frontier with the starting articles.
+        :type frontier: BFSFrontier | BestFirstFrontier
+        :param budget: Budget of the crawl.
+        :type budget: CrawlBudget
+        :param process: Function (scraper, title, depth) -> ArticleRecord
+                        called with the fetched page, which is released
+                        afterwards.
+        :type process: Callable[[Scraper, str, int], ArticleRecord]
+        :param fetch: Function title -> Scraper with the fetched page
+                      (_load_scraper by default).
+        :type fetch: Callable[[str], Scraper] | None
+        :param stop: Event which ends the crawl, also during the waiting
+                     time between articles.
+        :type stop: threading.Event | None
+        :return: Generator of records of the processed articles.
+        :rtype: Iterator[ArticleRecord]
+        """
+        if fetch is None:
+            fetch = self._load_scraper
+        if stop is None:
+            stop = threading.Event()
         visited = set()
-        waiting_phrases_queue = Queue()
-        waiting_phrases_queue.put((starting_phrase, 0))
 
-        # Load the initial content of the JSON file and update it as the BFS
-        # goes. At the end of this function load new content only once to the
-        # JSON file.
-        total_counts = load_counter_from_json(json_path)
+        while len(frontier) > 0 and not stop.is_set():
+            exhausted = budget.exhausted()
+            if exhausted:
+                print(f"Stopping the crawl: {exhausted} exhausted.")
+                break
+            (current_phrase, depth_of_current_phrase) = frontier.pop()
+            if current_phrase in visited or \
+                    depth_of_current_phrase > max_depth:
+                continue
+            print(f"Currently processing: {current_phrase}")
+
+            # Get the data from the article for current_phrase
+            try:
+                current_scraper = fetch(current_phrase)
+            except (ConnectionError, PageNotFoundError) as e:
+                # If error occurred skip the subtree of this phrase
+                # and don't mark the phrase as visited.
+                print(f"Error while fetching the data for "
+                      f"{current_phrase}. Skipping this phrase. "
+                      f"Error: {e}")
+                continue
+            # If fetching was successful, proceed to process the
+            # article for current_phrase
+            visited.add(current_phrase)
+            budget.record_page(current_scraper.bytes_fetched)
+            record = process(current_scraper, current_phrase,
+                             depth_of_current_phrase)
+            # Only the record is kept; the parsed page is freed before the
+            # next one is fetched (unless it's in the page cache)
+            self._release_scraper(current_scraper)
+            current_scraper = None
+
+            # Each linked article is pushed once per page, so that
+            # the in-link counts aren't inflated by repeated links.
+            if depth_of_current_phrase < max_depth:
+                for phrase in dict.fromkeys(record.links):
+                    if phrase not in visited:
+                        frontier.push(phrase, depth_of_current_phrase + 1,
+                                      record.novelty)
+
+            yield record
+
+            # Wait for waiting_time seconds (or until the crawl is stopped)
+            if waiting_time > 0:
+                stop.wait(waiting_time)
+
+    # Number of seconds for which closing a buffered crawl waits for the
+    # background thread (it may be in the middle of fetching a page)
+    STOP_TIMEOUT = 1.0
+
+    @classmethod
+    def _buffered(cls, generator, buffer_size, stop):
+        """
+        Runs the generator in a background thread and yields its items
+        through a queue of at most `buffer_size` items. The `stop` event
+        (which the generator has to check) is set when the consumer closes
+        the returned generator.
+        """
+        buffer = Queue(maxsize=buffer_size)
+        # Marks the end of the crawl; an exception is passed through as is
+        end = object()
+
+        def produce():
+            try:
+                for item in generator:
+                    while not stop.is_set():
+                        try:
+                            buffer.put(item, timeout=0.1)
+                            break
+                        except Full:
+                            continue
+                    if stop.is_set():
+                        break
+                result = end
+            except Exception as e:
+                result = e
+            finally:
+                generator.close()
+            while not stop.is_set():
+                try:
+                    buffer.put(result, timeout=0.1)
+                    break
+                except Full:
+                    continue
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is end:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            # Unblock the producer if it's waiting for free space
+            try:
+                while True:
+                    buffer.get_nowait()
+            except Empty:
+                pass
+            # A page which is being fetched isn't waited for; the thread
+            # ends on its own afterwards
+            producer.join(cls.STOP_TIMEOUT)
+
+    def coordinated_count_words(self, starting_phrase, max_depth, queue_dir,
+                                workers=4, waiting_time=0.0,
+                                json_path=DEFAULT_JSON_PATH,
+                                lease_seconds=120.0, progress_interval=5.0):
+        """
+        Counts words like auto_count_words, but with several worker processes
+        sharing a durable queue in `queue_dir`. Workers started on other hosts
+        with run_crawl_worker (the --crawl-worker option) on the same
+        directory join the crawl. This method acts as the coordinator: it
+        starts local workers, reports progress, waits until the queue is
+        finished and merges the per-worker count shards into the JSON file.
+        Workers use the settings of this manager's fetcher and its pruning
+        profile; the other options of auto_count_words aren't available.
+
+        :param starting_phrase: The initial phrase to start processing from.
+        :type starting_phrase: str
+        :param max_depth: The maximum depth to traverse from the starting
+                          article.
+        :type max_depth: int
+        :param queue_dir: Directory of the shared queue (on a filesystem
+                          visible to all the hosts).
+        :type queue_dir: str
+        :param workers: Number of local worker processes.
+        :type workers: int
+        :param waiting_time: Number of seconds each worker waits between
+                             articles.
+        :type waiting_time: float
+        :param json_path: JSON path
+        :type json_path: str
+        :param lease_seconds: Time after which an article claimed by a worker
+                              that stopped responding is given to another one.
+        :type lease_seconds: float
+        :param progress_interval: Number of seconds between progress reports.
+        :type progress_interval: float
+        :return: Number of articles in each state at the end of the crawl.
+        :rtype: dict
+        """
+        if self.use_local_file:
+            raise ValueError("Can't use coordinated_count_words on a single "
+                             "local file!")
+        if workers < 1:
+            raise ValueError(f"Invalid number of workers: {workers}")
+
+        queue = SharedWorkQueue(queue_dir, lease_seconds)
+        queue.save_config({
+            "wiki_url": self.wiki_url,
+            "max_depth": max_depth,
+            "waiting_time": waiting_time,
+            "lease_seconds": lease_seconds,
+            "fetcher": self.fetcher.settings(),
+            "pruning_profile": self.pruning_profile
+        })
+        queue.add(starting_phrase, 0)
+
+        processes = []
+        restarts_left = workers
+        for number in range(workers):
+            processes.append(self._start_worker_process(queue_dir, number))
+
+        last_report = 0.0
+        while True:
+            if not any(process.is_alive() for process in processes):
+                if queue.is_finished():
+                    break
+                # Local workers died while there is still work (and no
+                # remote worker takes it). Start a new one.
+                if restarts_left == 0:
+                    print("Workers keep failing, stopping the crawl.")
+                    break
+                restarts_left -= 1
+                processes.append(self._start_worker_process(
+                    queue_dir, workers + restarts_left))
+            if time.monotonic() - last_report >= progress_interval:
+                last_report = time.monotonic()
+                print(f"Progress: {queue.progress()}")
+            time.sleep(0.2)
+        for process in processes:
+            process.join()
 
-        while not waiting_phrases_queue.empty():
-            (current_phrase, depth_of_current_phrase) = \
-                waiting_phrases_queue.get()
-            if current_phrase not in visited:
-                if depth_of_current_phrase <= max_depth:
-                    print(f"Currently processing: {current_phrase}")
-
-                    # Get the data from the article for current_phrase
-                    current_scraper = Scraper(self.wiki_url, current_phrase)
-                    try:
-                        current_scraper.fetch_data()
-                    except ConnectionError as e:
-                        # If error occurred skip the subtree of this phrase
-                        # and don't mark the phrase as visited.
-                        print(f"Error while fetching the data for "
-                              f"{current_phrase}. Skipping this phrase. "
-                              f"Error: {e}")
-                        continue
-                    # If fetching was successful, proceed to process the
-                    # article for current_phrase
-                    visited.add(current_phrase)
-                    # Get titles of all articles linked from the current phrase
-                    children_phrases = current_scraper.get_children_phrases()
-                    if not children_phrases:
-                        continue
-                    for phrase in children_phrases:
-                        if phrase not in visited and \
-                           depth_of_current_phrase < max_depth:
-                            # Add this phrase to the BFS queue
-                            waiting_phrases_queue.put(
-                                (phrase, depth_of_current_phrase + 1)
-                            )
-
-                    # Get counter of current article
-                    current_counts = current_scraper.count_words()
-                    if not current_counts:
-                        continue
-
-                    # Combine two Counters
-                    total_counts.update(current_counts)
-
-                    # Wait for waiting_time seconds
-                    if waiting_time > 0:
-                        time.sleep(waiting_time)
-
-        # End of the BFS. Update JSON files
+        progress = queue.progress()
+        print(f"Progress: {progress}")
+        if not queue.mark_merged():
+            print(f"Shards from {queue_dir} were already merged, "
+                  f"{json_path} wasn't updated.")
+            return progress
+        total_counts = load_counter_from_json(json_path)
+        for shard_path in queue.shard_paths():
+            total_counts.update(load_counter_from_json(shard_path))
         save_counter_to_json(total_counts, json_path)
+        return progress
+
+    @staticmethod
+    def _start_worker_process(queue_dir, number):
+        process = multiprocessing.Process(
+            target=run_crawl_worker,
+            args=(queue_dir, default_worker_id(number))
+        )
+        process.start()
+        return process
 
-    def count_words(self, phrase=None, json_path=DEFAULT_JSON_PATH):
+    def count_words(self, phrase=None, json_path=None,
+                    incremental=False, index_path=None,
+                    ngram=1):
         """
         Counts the occurrences of words in the specified phrase or in a locally
         provided HTML file, updates, or creates the JSON file with the counter.
@@ -144,23 +752,93 @@ class ScrapingManager:
         :param phrase: The phrase to count words from, or None if using a local
             HTML file instead.
         :type phrase: str or None
-        :param json_path: Path to a JSON file.
-        :type json_path: str
+        :param json_path: Path to a JSON file (default depends on `ngram`,
+                          see default_json_path).
+        :type json_path: str | None
+        :param incremental: If True, counting the same article again replaces
+                            its previous contribution (or does nothing if the
+                            article didn't change) instead of adding it twice.
+        :type incremental: bool
+        :param index_path: Path to the index used in the incremental mode
+                           (default depends on `json_path`, see
+                           default_index_path).
+        :type index_path: str | None
+        :param ngram: Length of the counted sequences of words (1 counts
+                      single words, 2 bigrams etc.).
+        :type ngram: int
         """
         if not self.use_local_file and phrase is None:
             raise ValueError("Phrase can only be None when "
                              "use_local_html_file_instead is set to True")
-        scraper = Scraper(self.wiki_url, phrase, self.use_local_file)
+        if incremental and ngram > 1:
+            raise ValueError("Incremental mode counts single words only")
+        if json_path is None:
+            json_path = self.default_json_path(ngram)
+
+        if incremental:
+            # Conditional requests bypass the page cache
+            scraper = Scraper(self.wiki_url, phrase, self.use_local_file,
+                              self.fetcher, self.pruner)
+            # Created first, it completes an interrupted save of the counts
+            index = ArticleIndex(index_path or
+                                 self.default_index_path(json_path),
+                                 self._index_settings(), json_path)
+            total_counter = load_counter_from_json(json_path)
+            # A local file is identified by its path
+            title = canonical_title(phrase) if phrase is not None \
+                else scraper.exact_url
+            scraper.fetch_data(index.conditional_headers(title))
+            old_counter, current_counter, _ = \
+                self._refresh_article(scraper, title, index)
+            if current_counter is None:
+                index.save()
+                print(f"{title} didn't change since it was counted.")
+                return
+            replace_contribution(total_counter, old_counter, current_counter)
+            # The counts have to match the index
+            index.save(lambda path: save_counter_to_json(total_counter, path))
+            return
 
         total_counter = load_counter_from_json(json_path)
-            
-        current_counter = scraper.count_words()
-        
+        scraper = self._load_scraper(phrase)
+        current_counter = scraper.count_words(ngram)
+        if scraper.pruning_report is not None:
+            print(BoilerplatePruner.describe(scraper.pruning_report))
+
         if not current_counter:
             return
         total_counter.update(current_counter)
         save_counter_to_json(total_counter, json_path)
 
+    @staticmethod
+    def _refresh_article(scraper, title, index):
+        """
+        Compares a fetched article with its record in the index and updates
+        the record.
+        :param scraper: Scraper with already fetched data.
+        :param title: Key of the article in the index.
+        :param index: ArticleIndex to check and update.
+        :return: Tuple (old counts, new counts, links). New counts are None
+                 if the article didn't change since it was counted.
+        :rtype: tuple[Counter, Counter | None, list[str]]
+        """
+        if scraper.not_modified and index.has_current_settings(title):
+            index.update_validators(title, scraper.etag, scraper.last_modified)
+            return index.get_counts(title), None, index.get_links(title)
+
+        revision_id = scraper.get_revision_id()
+        content_hash = scraper.get_content_hash()
+        if index.is_unchanged(title, revision_id, content_hash):
+            index.update_validators(title, scraper.etag, scraper.last_modified)
+            return index.get_counts(title), None, index.get_links(title)
+
+        old_counts = index.get_counts(title)
+        new_counts = scraper.count_words() or Counter()
+        links = scraper.get_children_phrases() or []
+        index.update(title, revision_id, content_hash, new_counts, links,
+                     scraper.etag, scraper.last_modified)
+        return old_counts, new_counts, links
+
     def get_table(self, table_number, phrase=None, save_as=None, first_row_header=False):
         """
         Extracts a specified table from a webpage or local file using a
@@ -214,8 +892,16 @@ class ScrapingManager:
             phrase_for_scraper = phrase
             csv_name = phrase
 
-        my_scraper = Scraper(self.wiki_url, phrase_for_scraper, self.use_local_file)
-        df = my_scraper.get_table(table_number, first_row_header)
+        if self.page_cache is not None:
+            my_scraper = self._load_scraper(phrase_for_scraper,
+                                            full_page=True)
+            df = my_scraper.get_table(table_number, first_row_header)
+        else:
+            my_scraper = Scraper(self.wiki_url, phrase_for_scraper,
+                                 self.use_local_file, self.fetcher)
+            # Stop downloading the page right after the wanted table
+            df = my_scraper.get_table(table_number, first_row_header,
+                                      streaming=True)
         if df is not None:
             # Write df into csv file
             csv_file = f"{csv_name.replace(" ", "_")}.csv"
@@ -238,8 +924,12 @@ class ScrapingManager:
         if not self.use_local_file and phrase is None:
             raise ValueError("Phrase can only be None when "
                              "use_local_html_file_instead is set to True")
-        scraper = Scraper(self.wiki_url, phrase, self.use_local_file)
-        return scraper.get_summary()
+        if self.page_cache is not None:
+            return self._load_scraper(phrase, full_page=True).get_summary()
+        scraper = Scraper(self.wiki_url, phrase, self.use_local_file,
+                          self.fetcher)
+        # Stop downloading the page right after the first paragraph
+        return scraper.get_summary(streaming=True)
 
 
 
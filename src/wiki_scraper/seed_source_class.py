@@ -0,0 +1,230 @@
+import os
+from abc import ABC, abstractmethod
+from urllib.parse import unquote, urljoin, urlparse
+import requests
+from bs4 import BeautifulSoup
+from .fetcher_class import Fetcher
+
+
+def title_from_href(href):
+    """
+    Extracts the article title from a link to a wiki page ("/wiki/Title" or
+    "/w/index.php?title=Title&...").
+    :return: Title or None if the link doesn't lead to an article.
+    :rtype: str | None
+    """
+    parsed = urlparse(href)
+    if parsed.path.startswith("/wiki/"):
+        title = parsed.path.removeprefix("/wiki/")
+    else:
+        query = dict(part.partition("=")[::2]
+                     for part in parsed.query.split("&"))
+        title = query.get("title")
+        if not title:
+            return None
+    return unquote(title).replace("_", " ")
+
+
+class TitleFileSeedSource:
+    """
+    Titles read from a text file, one per line. Empty lines and lines
+    starting with '#' are skipped.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path to the file with titles.
+        :type path: str
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"File {path} doesn't exist")
+        self.path = path
+        self.pages_fetched = 0
+
+    def titles(self):
+        """
+        :return: Generator of the titles.
+        :rtype: Iterator[str]
+        """
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                title = line.strip()
+                if title and not title.startswith("#"):
+                    yield title.replace("_", " ")
+
+
+class ListingSeedSource(ABC):
+    """
+    Titles enumerated from a paged listing of the wiki (Special:AllPages,
+    category pages). Pages of the listing are fetched one by one, following
+    its "next page" links until the last page. Subclasses decide which links
+    of a page are titles and which one leads to the next page.
+    """
+
+    def __init__(self, wiki_url, listing, fetcher=None):
+        """
+        :param wiki_url: URL of the wiki (e.g. https://host/wiki).
+        :type wiki_url: str
+        :param listing: Title of the first page of the listing, with an
+                        optional query string (e.g. "Special:AllPages?from=B").
+        :type listing: str
+        :param fetcher: Fetcher used for the requests.
+        :type fetcher: Fetcher | None
+        """
+        self.wiki_url = wiki_url
+        self.listing = listing
+        self.fetcher = fetcher if fetcher is not None else Fetcher()
+        self.pages_fetched = 0  # Number of downloaded listing pages
+
+    def first_page_url(self):
+        title, _, query = self.listing.partition("?")
+        url = f"{self.wiki_url}/{title.replace(' ', '_')}"
+        return f"{url}?{query}" if query else url
+
+    def fetch_page(self, url):
+        """
+        :return: Parsed listing page.
+        :rtype: BeautifulSoup
+        :raises ConnectionError: If the page couldn't be downloaded.
+        """
+        try:
+            response = self.fetcher.get(url)
+            if response.status_code == 404:
+                raise ConnectionError(f"{url} not found")
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise ConnectionError(f"Error while fetching {url}: {e}")
+        self.pages_fetched += 1
+        return BeautifulSoup(response.content, "html.parser")
+
+    def titles(self):
+        """
+        :return: Generator of the listed titles (each one once), fetching
+                 the pages of the listing as they're needed.
+        :rtype: Iterator[str]
+        """
+        seen = set()
+        visited_urls = set()
+        url = self.first_page_url()
+        while url is not None and url not in visited_urls:
+            visited_urls.add(url)
+            soup = self.fetch_page(url)
+            for title in self.find_titles(soup):
+                if title not in seen:
+                    seen.add(title)
+                    yield title
+            href = self.find_next_href(soup)
+            # The "next page" link is relative to the wiki's host
+            url = urljoin(url, href) if href else None
+
+    @abstractmethod
+    def find_titles(self, soup):
+        """
+        :return: Titles listed on the page.
+        :rtype: list[str]
+        """
+
+    @abstractmethod
+    def find_next_href(self, soup):
+        """
+        :return: Link to the next page of the listing or None.
+        :rtype: str | None
+        """
+
+    @staticmethod
+    def _titles_of_links(links):
+        titles = []
+        for link in links:
+            title = title_from_href(link.get("href", ""))
+            if title:
+                titles.append(title)
+        return titles
+
+    @staticmethod
+    def _next_href(container, label):
+        if container is None:
+            return None
+        for link in container.find_all("a", href=True):
+            if link.get_text().strip().lower().startswith(label):
+                return link["href"]
+        return None
+
+
+class AllPagesSeedSource(ListingSeedSource):
+    """
+    All articles of the wiki from Special:AllPages (redirects skipped).
+    """
+
+    def __init__(self, wiki_url, fetcher=None, start_from=None):
+        """
+        :param start_from: Title to start the listing at (optional).
+        :type start_from: str | None
+        """
+        listing = "Special:AllPages"
+        if start_from:
+            listing += f"?from={start_from.replace(' ', '_')}"
+        super().__init__(wiki_url, listing, fetcher)
+
+    def find_titles(self, soup):
+        body = soup.find("div", class_="mw-allpages-body") or soup
+        items = [item for chunk in body.find_all("ul",
+                                                 class_="mw-allpages-chunk")
+                 for item in chunk.find_all("li")
+                 if "allpagesredirect" not in (item.get("class") or [])]
+        return self._titles_of_links(item.find("a", href=True)
+                                     for item in items
+                                     if item.find("a", href=True))
+
+    def find_next_href(self, soup):
+        return self._next_href(soup.find("div", class_="mw-allpages-nav"),
+                               "next page")
+
+
+class CategorySeedSource(ListingSeedSource):
+    """
+    Articles of a category (the "Pages in category" section; subcategories
+    and files aren't included).
+    """
+
+    def __init__(self, wiki_url, category, fetcher=None):
+        """
+        :param category: Name of the category, with or without the
+                         "Category:" prefix.
+        :type category: str
+        """
+        if not category.startswith("Category:"):
+            category = f"Category:{category}"
+        super().__init__(wiki_url, category, fetcher)
+
+    def find_titles(self, soup):
+        section = soup.find("div", id="mw-pages")
+        if section is None:
+            return []
+        return self._titles_of_links(
+            link for group in section.find_all("div", class_="mw-category")
+            for link in group.find_all("a", href=True))
+
+    def find_next_href(self, soup):
+        return self._next_href(soup.find("div", id="mw-pages"), "next page")
+
+
+def create_seed_source(source, wiki_url, fetcher=None):
+    """
+    Creates a seed source from its description.
+    :param source: "Special:AllPages" (optionally "Special:AllPages?from=X"),
+                   "Category:<name>" or a path to a file with titles.
+    :type source: str
+    :rtype: TitleFileSeedSource | AllPagesSeedSource | CategorySeedSource
+    """
+    if source.startswith("Special:AllPages"):
+        _, _, query = source.partition("?")
+        start_from = dict(part.partition("=")[::2]
+                          for part in query.split("&")).get("from")
+        return AllPagesSeedSource(wiki_url, fetcher, unquote(start_from or ""))
+    if source.startswith("Category:"):
+        return CategorySeedSource(wiki_url, source, fetcher)
+    if os.path.isfile(source):
+        return TitleFileSeedSource(source)
+    raise ValueError(f"Invalid seed source: {source} (expected "
+                     f"Special:AllPages, Category:<name> or a file with "
+                     f"titles)")
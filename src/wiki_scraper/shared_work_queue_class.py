@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import time
+
+
+class WorkItem:
+    """
+    Phrase claimed from the SharedWorkQueue by a worker.
+    """
+
+    def __init__(self, phrase, depth, attempts, name, worker_id):
+        self.phrase = phrase
+        self.depth = depth
+        self.attempts = attempts
+        self.name = name  # Name of the entry in the queue directories
+        self.worker_id = worker_id
+
+
+class SharedWorkQueue:
+    """
+    Durable crawl frontier stored in a directory, so that several processes
+    (also on different hosts sharing the filesystem) can work on one crawl.
+    Every phrase is a small JSON file which moves between subdirectories:
+        pending/ -> leased/ -> done/ (or failed/)
+    Moving a file with os.rename is atomic, so only one worker can claim
+    a phrase. A claimed phrase whose lease wasn't renewed for
+    `lease_seconds` (e.g. its worker died) becomes visible in pending/ again.
+    Markers in seen/ make sure that each phrase is added only once.
+    """
+    SUBDIRECTORIES = ("pending", "leased", "done", "failed", "seen",
+                      "shards")
+    CONFIG_FILE = "config.json"
+
+    def __init__(self, directory, lease_seconds=120.0, max_attempts=3):
+        """
+        :param directory: Directory of the queue (created if needed).
+        :type directory: str
+        :param lease_seconds: Visibility timeout of a claimed phrase.
+        :type lease_seconds: float
+        :param max_attempts: Number of failed attempts after which a phrase
+                             is moved to failed/.
+        :type max_attempts: int
+        """
+        if lease_seconds <= 0:
+            raise ValueError(f"Invalid lease time: {lease_seconds}")
+        self.directory = directory
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for subdirectory in self.SUBDIRECTORIES:
+            os.makedirs(os.path.join(directory, subdirectory), exist_ok=True)
+
+    def _path(self, subdirectory, name):
+        return os.path.join(self.directory, subdirectory, name)
+
+    @staticmethod
+    def _entry_name(phrase):
+        return hashlib.sha1(phrase.encode("utf-8")).hexdigest()
+
+    def write_json_atomically(self, path, data):
+        """
+        Writes data as JSON so that readers never see a partial file.
+        """
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temporary_path, path)
+
+    def save_config(self, config):
+        """
+        Saves the settings of the crawl so that workers started on other
+        hosts can read them.
+        :param config: JSON serializable dictionary.
+        """
+        self.write_json_atomically(os.path.join(self.directory,
+                                                self.CONFIG_FILE), config)
+
+    def load_config(self):
+        """
+        :return: Settings saved with save_config.
+        :rtype: dict
+        """
+        path = os.path.join(self.directory, self.CONFIG_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} doesn't exist. Is {self.directory}"
+                                    f" a crawl queue?")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def add(self, phrase, depth):
+        """
+        Adds a phrase to the queue unless it was added before.
+        :return: True if the phrase was added.
+        :rtype: bool
+        """
+        name = self._entry_name(phrase)
+        try:
+            # O_EXCL makes the creation of the marker atomic
+            fd = os.open(self._path("seen", name),
+                         os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+        except FileExistsError:
+            return False
+        self.write_json_atomically(self._path("pending", name),
+                                   {"phrase": phrase, "depth": depth,
+                                    "attempts": 0})
+        return True
+
+    def claim(self, worker_id):
+        """
+        Claims one pending phrase for the given worker.
+        :return: Claimed item or None if nothing is pending at the moment.
+        :rtype: WorkItem | None
+        """
+        self.requeue_expired()
+        for name in sorted(os.listdir(self._path("pending", ""))):
+            if name.endswith(".tmp"):
+                continue
+            leased_name = f"{name}__{worker_id}"
+            try:
+                # The modification time of the leased file is the lease
+                # start. It's set before the move (rename keeps it), so
+                # requeue_expired never sees a fresh lease as expired.
+                os.utime(self._path("pending", name))
+                os.rename(self._path("pending", name),
+                          self._path("leased", leased_name))
+            except FileNotFoundError:
+                continue  # Another worker was faster
+            try:
+                with open(self._path("leased", leased_name), "r",
+                          encoding="utf-8") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                continue  # The claim was lost in the meantime
+            return WorkItem(data["phrase"], data["depth"], data["attempts"],
+                            name, worker_id)
+        return None
+
+    def _leased_path(self, item):
+        return self._path("leased", f"{item.name}__{item.worker_id}")
+
+    def renew(self, item):
+        """
+        Extends the lease of the item.
+        :return: False if the lease was already lost.
+        :rtype: bool
+        """
+        try:
+            os.utime(self._leased_path(item))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, item):
+        """
+        Marks the item as done.
+        :return: False if the lease was lost (the item was given to another
+                 worker), True otherwise.
+        :rtype: bool
+        """
+        try:
+            os.rename(self._leased_path(item), self._path("done", item.name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def release(self, item):
+        """
+        Gives back an item which couldn't be processed. It's retried later
+        or moved to failed/ after `max_attempts` attempts.
+        """
+        item.attempts += 1
+        target = "failed" if item.attempts >= self.max_attempts else "pending"
+        if not self.renew(item):
+            return  # Lease lost, the new owner takes care of it
+        # Update the leased file and move it in one step, so that the item
+        # is never missing from both directories
+        self.write_json_atomically(self._leased_path(item),
+                                   {"phrase": item.phrase,
+                                    "depth": item.depth,
+                                    "attempts": item.attempts})
+        try:
+            os.rename(self._leased_path(item), self._path(target, item.name))
+        except FileNotFoundError:
+            pass
+
+    def fail(self, item):
+        """
+        Moves an item which can never be processed (e.g. a missing article)
+        to failed/ right away, without further attempts.
+        :return: False if the lease was lost.
+        :rtype: bool
+        """
+        try:
+            os.rename(self._leased_path(item), self._path("failed", item.name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def requeue_expired(self):
+        """
+        Moves items with expired leases back to pending/.
+        :return: Number of requeued items.
+        :rtype: int
+        """
+        requeued = 0
+        now = time.time()
+        for leased_name in os.listdir(self._path("leased", "")):
+            path = self._path("leased", leased_name)
+            try:
+                expired = now - os.path.getmtime(path) > self.lease_seconds
+                if expired:
+                    name = leased_name.split("__", 1)[0]
+                    os.rename(path, self._path("pending", name))
+                    requeued += 1
+            except FileNotFoundError:
+                continue
+        return requeued
+
+    def progress(self):
+        """
+        :return: Number of items in each state.
+        :rtype: dict
+        """
+        return {state: len([n for n in os.listdir(self._path(state, ""))
+                            if not n.endswith(".tmp")])
+                for state in ("pending", "leased", "done", "failed")}
+
+    def is_finished(self):
+        """
+        :return: True if nothing is pending and nothing is being processed.
+        :rtype: bool
+        """
+        progress = self.progress()
+        return progress["pending"] == 0 and progress["leased"] == 0
+
+    def shard_path(self, worker_id):
+        """
+        :return: Path of the word counts shard of the given worker.
+        :rtype: str
+        """
+        return self._path("shards", f"worker-{worker_id}.json")
+
+    def mark_merged(self):
+        """
+        Marks the shards as merged into the final word counts.
+        :return: False if they were already merged before.
+        :rtype: bool
+        """
+        try:
+            fd = os.open(os.path.join(self.directory, "merged"),
+                         os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            return True
+        except FileExistsError:
+            return False
+
+    def shard_paths(self):
+        """
+        :return: Paths of all the written shards.
+        :rtype: list[str]
+        """
+        directory = self._path("shards", "")
+        return [os.path.join(directory, name)
+                for name in sorted(os.listdir(directory))
+                if name.endswith(".json")]
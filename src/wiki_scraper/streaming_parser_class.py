@@ -0,0 +1,140 @@
+from html import escape
+from html.parser import HTMLParser
+
+# Elements which never have a closing tag
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+                 "link", "meta", "param", "source", "track", "wbr"}
+
+
+class _TagStackParser(HTMLParser):
+    """
+    Incremental HTML parser which keeps a stack of the open tags, closing
+    unbalanced tags the lenient way (an end tag closes everything opened
+    after its start tag). Subclasses set `done` when they have their result,
+    which tells the caller to stop feeding data.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(tag)
+        self.on_start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        # <tag/> doesn't change the stack
+        if not self.done:
+            self.on_start(tag, dict(attrs), self_closing=True)
+
+    def handle_endtag(self, tag):
+        if self.done or tag not in self.stack:
+            return
+        while self.stack:
+            closed = self.stack.pop()
+            self.on_end(closed, len(self.stack))
+            if closed == tag or self.done:
+                break
+
+    def on_start(self, tag, attrs, self_closing=False):
+        pass
+
+    def on_end(self, tag, depth):
+        """
+        :param tag: Closed tag.
+        :param depth: Depth of the closed tag (length of the stack after it
+                      was removed).
+        """
+        pass
+
+
+class SummaryParser(_TagStackParser):
+    """
+    Finds the first non-empty <p> which is a direct child of the first
+    div.mw-parser-output (the same paragraph as Scraper.get_summary).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.container_depth = None  # Depth of div.mw-parser-output
+        self.paragraph_depth = None  # Depth of the collected <p>
+        self.skipped_depth = None  # Depth of <script>/<style> inside <p>
+        self.parts = []
+        self.result = None
+
+    def on_start(self, tag, attrs, self_closing=False):
+        depth = len(self.stack) - (0 if self_closing or
+                                   tag in VOID_ELEMENTS else 1)
+        if self.container_depth is None:
+            classes = (attrs.get("class") or "").split()
+            if tag == "div" and "mw-parser-output" in classes:
+                self.container_depth = depth
+            return
+        if self.paragraph_depth is None:
+            if tag == "p" and depth == self.container_depth + 1 and \
+                    not self_closing:
+                self.paragraph_depth = depth
+                self.parts = []
+        elif tag in ("script", "style") and self.skipped_depth is None:
+            self.skipped_depth = depth
+
+    def handle_data(self, data):
+        if self.paragraph_depth is not None and self.skipped_depth is None \
+                and not self.done:
+            self.parts.append(data)
+
+    def on_end(self, tag, depth):
+        if depth == self.skipped_depth:
+            self.skipped_depth = None
+        elif depth == self.paragraph_depth:
+            self.paragraph_depth = None
+            text = "".join(self.parts).strip()
+            if text:
+                self.result = text
+                self.done = True
+        elif depth == self.container_depth:
+            # The whole container was read and there is no summary
+            self.done = True
+
+
+class TableParser(_TagStackParser):
+    """
+    Collects the HTML of the n-th <table> of the document (counted in the
+    document order, nested tables included, like soup.find_all('table')).
+    """
+
+    def __init__(self, table_number):
+        """
+        :param table_number: 1-based index of the table.
+        :type table_number: int
+        """
+        super().__init__()
+        self.table_number = table_number
+        self.tables_seen = 0
+        self.recording_depth = None  # Depth of the recorded table
+        self.parts = []
+        self.result = None
+
+    def on_start(self, tag, attrs, self_closing=False):
+        if tag == "table" and not self_closing:
+            self.tables_seen += 1
+            if self.tables_seen == self.table_number:
+                self.recording_depth = len(self.stack) - 1
+        if self.recording_depth is not None:
+            self.parts.append(self.get_starttag_text())
+
+    def handle_data(self, data):
+        if self.recording_depth is not None and not self.done:
+            self.parts.append(escape(data, quote=False))
+
+    def on_end(self, tag, depth):
+        if self.recording_depth is None:
+            return
+        self.parts.append(f"</{tag}>")
+        if depth == self.recording_depth:
+            self.result = "".join(self.parts)
+            self.done = True
@@ -0,0 +1,221 @@
+from array import array
+import numpy as np
+
+
+def _join_strings(strings):
+    """
+    Packs strings into one UTF-8 byte array (separated with newlines, which
+    never occur in words or titles). A NumPy array of strings would reserve
+    the length of the longest string for every item.
+    :rtype: np.ndarray
+    """
+    return np.frombuffer("\n".join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def _split_strings(packed, number_of_strings):
+    """
+    Reverses _join_strings.
+    :rtype: list[str]
+    """
+    if number_of_strings == 0:
+        return []
+    return packed.tobytes().decode("utf-8").split("\n")
+
+
+class TermMatrix:
+    """
+    Sparse document-term matrix in the CSR format: row i is the article
+    `titles[i]`, column j the term `terms[j]`. The values of row i are
+    `data[indptr[i]:indptr[i + 1]]` in the columns
+    `indices[indptr[i]:indptr[i + 1]]` (sorted). Only the non-zero values
+    are stored, so the memory doesn't depend on the size of the vocabulary
+    times the number of articles.
+    """
+
+    def __init__(self, indptr, indices, data, terms, titles):
+        """
+        :param indptr: Offsets of the rows in `indices` and `data`
+                       (number of articles + 1 values).
+        :type indptr: np.ndarray
+        :param indices: Column of every stored value.
+        :type indices: np.ndarray
+        :param data: Stored values (counts or scores).
+        :type data: np.ndarray
+        :param terms: Term of every column.
+        :type terms: list[str]
+        :param titles: Title of the article of every row.
+        :type titles: list[str]
+        """
+        if len(indptr) != len(titles) + 1 or len(indices) != len(data) or \
+                indptr[-1] != len(data):
+            raise ValueError("Inconsistent sparse matrix arrays")
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.terms = terms
+        self.titles = titles
+
+    @property
+    def shape(self):
+        return len(self.titles), len(self.terms)
+
+    @property
+    def nnz(self):
+        """
+        Number of stored values.
+        """
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the arrays of the matrix (without the strings).
+        """
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def row_ids(self):
+        """
+        :return: Row of every stored value.
+        :rtype: np.ndarray
+        """
+        return np.repeat(np.arange(len(self.titles)), np.diff(self.indptr))
+
+    def document_frequencies(self):
+        """
+        :return: Number of articles containing each term.
+        :rtype: np.ndarray
+        """
+        return np.bincount(self.indices, minlength=len(self.terms))
+
+    def with_data(self, data):
+        """
+        :return: Matrix with the same articles and columns but other values
+                 (e.g. TF-IDF scores instead of counts).
+        :rtype: TermMatrix
+        """
+        return TermMatrix(self.indptr, self.indices, data, self.terms,
+                          self.titles)
+
+    def row(self, title):
+        """
+        :return: Terms of an article with their values.
+        :rtype: dict
+        """
+        i = self.titles.index(title)
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return {self.terms[j]: value.item() for j, value in
+                zip(self.indices[start:end], self.data[start:end])}
+
+    def save(self, path):
+        """
+        Saves the matrix to a compressed NumPy archive (.npz).
+        :param path: Path to the file.
+        :type path: str
+        """
+        with open(path, 'wb') as f:
+            np.savez_compressed(
+                f, indptr=self.indptr, indices=self.indices, data=self.data,
+                terms=_join_strings(self.terms),
+                titles=_join_strings(self.titles),
+                shape=np.array(self.shape, dtype=np.int64)
+            )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a matrix saved with save.
+        :rtype: TermMatrix
+        """
+        with np.load(path, allow_pickle=False) as f:
+            number_of_titles, number_of_terms = f["shape"].tolist()
+            return cls(f["indptr"], f["indices"], f["data"],
+                       _split_strings(f["terms"], number_of_terms),
+                       _split_strings(f["titles"], number_of_titles))
+
+
+class TermMatrixBuilder:
+    """
+    Builds a TermMatrix of counts one article at a time during a crawl. The
+    vocabulary (term -> column) is shared by all articles and the rows are
+    appended to flat typed arrays, so an article costs about 8 bytes per
+    distinct term. Adding an article which is already in the matrix (e.g.
+    when a saved matrix is extended by a new crawl) replaces its row.
+    """
+
+    def __init__(self):
+        self.columns = {}  # Term -> column
+        self.terms = []
+        self.titles = []
+        self.rows = {}  # Title -> row
+        self.replaced_rows = set()
+        self.indptr = array('q', [0])
+        self.indices = array('i')
+        self.data = array('q')
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """
+        Creates a builder which continues a saved matrix of counts.
+        :type matrix: TermMatrix
+        :rtype: TermMatrixBuilder
+        """
+        builder = cls()
+        builder.terms = list(matrix.terms)
+        builder.columns = {term: j for j, term in enumerate(builder.terms)}
+        builder.titles = list(matrix.titles)
+        builder.rows = {title: i for i, title in enumerate(builder.titles)}
+        builder.indptr = array('q', matrix.indptr.astype(np.int64).tobytes())
+        builder.indices = array('i',
+                                matrix.indices.astype(np.int32).tobytes())
+        builder.data = array('q', matrix.data.astype(np.int64).tobytes())
+        return builder
+
+    def add_article(self, title, counts):
+        """
+        Appends the counts of an article as a new row.
+        :param title: Title of the article.
+        :type title: str
+        :param counts: Number of occurrences of every term of the article.
+        :type counts: dict
+        """
+        columns = self.columns
+        row = []
+        for term, count in counts.items():
+            column = columns.get(term)
+            if column is None:
+                column = len(self.terms)
+                columns[term] = column
+                self.terms.append(term)
+            row.append((column, count))
+        row.sort()
+        if title in self.rows:
+            self.replaced_rows.add(self.rows[title])
+        self.rows[title] = len(self.titles)
+        self.titles.append(title)
+        self.indices.extend(column for column, _ in row)
+        self.data.extend(count for _, count in row)
+        self.indptr.append(len(self.indices))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def build(self):
+        """
+        :return: The matrix of the added articles (replaced rows dropped).
+        :rtype: TermMatrix
+        """
+        indptr = np.frombuffer(self.indptr, dtype=np.int64).copy()
+        indices = np.frombuffer(self.indices, dtype=np.int32).copy()
+        data = np.frombuffer(self.data, dtype=np.int64).copy()
+        titles = list(self.titles)
+        if self.replaced_rows:
+            kept_rows = np.ones(len(titles), dtype=bool)
+            kept_rows[list(self.replaced_rows)] = False
+            lengths = np.diff(indptr)
+            kept_values = np.repeat(kept_rows, lengths)
+            indices = indices[kept_values]
+            data = data[kept_values]
+            indptr = np.concatenate(([0], np.cumsum(lengths[kept_rows])))
+            titles = [title for title, kept in zip(titles, kept_rows)
+                      if kept]
+        return TermMatrix(indptr, indices, data, list(self.terms), titles)
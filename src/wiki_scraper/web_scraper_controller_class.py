@@ -1,6 +1,11 @@
 import pandas as pd
 
 from .scraping_manager_class import ScrapingManager
+from .fetcher_class import Fetcher
+from .crawl_worker_class import run_crawl_worker
+from .seed_source_class import create_seed_source
+from .multi_wiki_crawl_class import MultiWikiCrawl, WikiCrawlJob
+from .reprocess_archive import reprocess_archive
 from .analyze_relative_word_frequency import analyze_relative_word_frequency
 
 class WebScraperController:
@@ -8,12 +13,30 @@ class WebScraperController:
 
     def __init__(self, args):
         self.args = args
+        self.wiki_url = args.wiki_url or self.BASE_URL
         # By default this class doesn't operate on local files
         self.scraping_manager = ScrapingManager(
-            wiki_url=self.BASE_URL,
-            use_local_html_file_instead=False
+            wiki_url=self.wiki_url,
+            use_local_html_file_instead=False,
+            fetcher=self._create_fetcher(),
+            pruning_profile=args.prune
         )
 
+    def _create_fetcher(self):
+        return Fetcher(
+            connect_timeout=self.args.connect_timeout,
+            read_timeout=self.args.read_timeout,
+            max_retries=self.args.retries,
+            page_deadline=self.args.page_deadline,
+            hedge_after=self.args.hedge_after
+        )
+
+    def close(self):
+        """
+        Releases the resources of the scraping manager.
+        """
+        self.scraping_manager.close()
+
     def execute(self):
         """
         Starts the execution of tasks based on provided parsed arguments.
@@ -55,7 +78,11 @@ class WebScraperController:
                 print(results_table)
 
         elif self.args.count_words:
-            self.scraping_manager.count_words(self.args.count_words)
+            self.scraping_manager.count_words(
+                self.args.count_words,
+                incremental=self.args.incremental,
+                ngram=self.args.ngram
+            )
 
         elif self.args.analyze_relative_word_frequency:
             # --mode and --count are required
@@ -69,7 +96,9 @@ class WebScraperController:
             analyze_relative_word_frequency(
                 mode=self.args.mode,
                 count=self.args.count,
-                chart_path=chart_path
+                chart_path=chart_path,
+                output_path=self.args.output,
+                term_matrix_path=self.args.term_matrix
             )
 
         elif self.args.auto_count_words:
@@ -81,11 +110,133 @@ class WebScraperController:
                 print("Argument --wait is required. Returning")
                 return
 
+            if self.args.workers is not None:
+                if self.args.queue_dir is None:
+                    print("Argument --queue-dir is required when using "
+                          "--workers. Returning")
+                    return
+                unsupported = self._unsupported_worker_options()
+                if unsupported:
+                    print(f"{', '.join(unsupported)} can't be used with "
+                          f"--workers. Returning")
+                    return
+                self.scraping_manager.coordinated_count_words(
+                    starting_phrase=self.args.auto_count_words,
+                    max_depth=self.args.depth,
+                    queue_dir=self.args.queue_dir,
+                    workers=self.args.workers,
+                    waiting_time=self.args.wait
+                )
+                return
+
+            if self.args.also_crawl:
+                if self.args.memory_report_every is not None:
+                    print("Argument --memory-report-every can't be used with "
+                          "--also-crawl. Returning")
+                    return
+                # Every wiki is crawled at the same time, with its own
+                # connections, waiting time and output file
+                jobs = [WikiCrawlJob(self.wiki_url,
+                                     self.args.auto_count_words)]
+                jobs += [WikiCrawlJob(wiki_url, phrase)
+                         for wiki_url, phrase in self.args.also_crawl]
+                MultiWikiCrawl(jobs, self._create_fetcher,
+                               self.args.prune).run(
+                    max_depth=self.args.depth,
+                    **self._crawl_options()
+                )
+                return
+
             self.scraping_manager.auto_count_words(
                 starting_phrase=self.args.auto_count_words,
                 max_depth=self.args.depth,
-                waiting_time=self.args.wait
+                **self._crawl_options()
             )
 
+        elif self.args.count_listed_words:
+            # --wait is required
+            if self.args.wait is None:
+                print("Argument --wait is required. Returning")
+                return
+            seed_source = create_seed_source(
+                self.args.count_listed_words,
+                self.scraping_manager.wiki_url,
+                self.scraping_manager.fetcher
+            )
+            self.scraping_manager.auto_count_words(
+                starting_phrase=None,
+                max_depth=0,
+                seeds=seed_source.titles(),
+                **self._crawl_options()
+            )
+            print(f"Listing pages fetched: {seed_source.pages_fetched}")
+
+        elif self.args.reprocess:
+            # --number is required for tables
+            if self.args.extract == "tables" and self.args.number is None:
+                print("Argument --number is required when using --extract "
+                      "tables. Returning")
+                return
+            reprocess_archive(
+                self.args.reprocess,
+                extract=self.args.extract,
+                output_path=self.args.output,
+                processes=self.args.processes,
+                ngram=self.args.ngram,
+                pruning_profile=self.args.prune,
+                table_number=self.args.number,
+                first_row_header=self.args.first_row_is_a_header
+            )
+
+        elif self.args.crawl_worker:
+            processed = run_crawl_worker(self.args.crawl_worker)
+            print(f"Worker finished after processing {processed} articles.")
+
         else:
-            print("Couldn't recognize any relevant argument.")
\ No newline at end of file
+            print("Couldn't recognize any relevant argument.")
+
+    def _unsupported_worker_options(self):
+        """
+        :return: Given options which coordinated crawls (--workers) don't
+                 support. Workers only count words (BFS order) with the
+                 fetcher settings and --prune.
+        :rtype: list[str]
+        """
+        defaults = {
+            "strategy": "bfs", "max_pages": None, "max_seconds": None,
+            "max_bytes": None, "saturation_threshold": None,
+            "incremental": False, "counting": "exact", "memory_budget": None,
+            "ngram": 1, "max_ngrams": None, "also_crawl": None,
+            "memory_report_every": None, "archive": None,
+            "term_matrix": None
+        }
+        return ["--" + name.replace("_", "-")
+                for name, default in defaults.items()
+                if getattr(self.args, name) != default]
+
+    def _crawl_options(self):
+        """
+        :return: Arguments of auto_count_words shared by the crawling
+                 actions.
+        :rtype: dict
+        """
+        memory_budget = None
+        if self.args.memory_budget is not None:
+            memory_budget = int(self.args.memory_budget * 1024 * 1024)
+        return {
+            "waiting_time": self.args.wait,
+            "strategy": self.args.strategy,
+            "max_pages": self.args.max_pages,
+            "max_seconds": self.args.max_seconds,
+            "max_bytes": self.args.max_bytes,
+            "saturation_threshold": self.args.saturation_threshold,
+            "saturation_window": self.args.saturation_window,
+            "incremental": self.args.incremental,
+            "counting": self.args.counting,
+            "memory_budget": memory_budget,
+            "ngram": self.args.ngram,
+            "max_ngrams": self.args.max_ngrams,
+            "memory_report_every": self.args.memory_report_every,
+            "archive_path": self.args.archive,
+            "term_matrix_path": self.args.term_matrix
+        }
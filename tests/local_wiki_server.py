@@ -0,0 +1,161 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, quote
+
+
+def make_article(title, paragraphs, links=(), extra_html="",
+                 revision_id=None):
+    """
+    Builds HTML of an article which looks like a MediaWiki page.
+    :param title: Title of the article.
+    :param paragraphs: Texts of the paragraphs of the article.
+    :param links: Titles of the linked articles.
+    :param extra_html: Additional HTML appended to the article body.
+    :param revision_id: MediaWiki revision id put into an inline script.
+    :return: HTML of the article.
+    """
+    paragraphs_html = "".join(f"<p>{text}</p>" for text in paragraphs)
+    links_html = "".join(
+        f'<a href="/wiki/{quote(link.replace(" ", "_"))}" title="{link}">'
+        f'{link}</a> ' for link in links
+    )
+    script = ""
+    if revision_id is not None:
+        script = f'<script>RLCONF={{"wgRevisionId":{revision_id}}};</script>'
+    return f"""
+        <html>
+            <head>{script}</head>
+            <body>
+                <h1 class="firstHeading mw-first-heading">{title}</h1>
+                <div id="mw-content-text" class="mw-body-content">
+                    <div class="mw-parser-output">
+                        {paragraphs_html}
+                        {links_html}
+                        {extra_html}
+                    </div>
+                </div>
+            </body>
+        </html>
+        """
+
+
+class LocalWikiServer:
+    """
+    Local stand-in for a wiki used by the tests. Serves `pages` under
+    http://127.0.0.1:<port>/wiki/<title> and can simulate slow and failing
+    responses.
+    """
+
+    def __init__(self, pages, delays=None, failures=None, trickles=None,
+                 content_type="text/html; charset=utf-8"):
+        """
+        :param pages: Dictionary title -> HTML of the page. A title may
+                      contain a query string (e.g. "Special:AllPages?from=B").
+        :param delays: Dictionary title -> list of delays (in seconds) of the
+                       consecutive responses for this title.
+        :param failures: Dictionary title -> number of the first requests for
+                         this title answered with 503.
+        :param trickles: Dictionary title -> delay (in seconds) before every
+                         1 KB piece of the body of this title.
+        :param content_type: Content-Type header of the pages (encoded as
+                             UTF-8 whatever it says).
+        """
+        self.pages = pages
+        self.delays = {k: list(v) for k, v in (delays or {}).items()}
+        self.failures = dict(failures or {})
+        self.trickles = dict(trickles or {})
+        self.content_type = content_type
+        self.request_counts = Counter()
+        self.not_modified_responses = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def wiki_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/wiki"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handle(self, handler):
+        path = handler.path.removeprefix("/wiki/")
+        path, _, query = path.partition("?")
+        title = unquote(path).replace("_", " ")
+        key = f"{title}?{unquote(query)}" if query else title
+        if key not in self.pages:
+            key = title
+
+        with self._lock:
+            self.request_counts[key] += 1
+            delays = self.delays.get(key)
+            delay = delays.pop(0) if delays else 0
+            failing = self.failures.get(key, 0) > 0
+            if failing:
+                self.failures[key] -= 1
+
+        if delay:
+            time.sleep(delay)
+        try:
+            if failing:
+                handler.send_response(503)
+                handler.end_headers()
+                return
+            if key not in self.pages:
+                handler.send_response(404)
+                handler.end_headers()
+                return
+            body = self.pages[key].encode("utf-8")
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if handler.headers.get("If-None-Match") == etag:
+                with self._lock:
+                    self.not_modified_responses += 1
+                handler.send_response(304)
+                handler.send_header("ETag", etag)
+                handler.end_headers()
+                return
+            handler.send_response(200)
+            handler.send_header("ETag", etag)
+            handler.send_header("Content-Type", self.content_type)
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            trickle = self.trickles.get(key)
+            if trickle is None:
+                handler.wfile.write(body)
+                return
+            for start in range(0, len(body), 1024):
+                time.sleep(trickle)
+                handler.wfile.write(body[start:start + 1024])
+                handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on this response (timeout, hedging)
+            pass
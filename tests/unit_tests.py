@@ -1,13 +1,51 @@
+import gzip
 import json
+import math
 import os
+import random
+import shutil
 import sys
+import tempfile
+import time
+import tracemalloc
 import unittest
+from unittest import mock
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project root to sys.path to allow imports from src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import numpy as np
+import soupsieve
+from bs4 import BeautifulSoup
+from src.wiki_scraper.analyze_relative_word_frequency import get_keyness_df, \
+    analyze_relative_word_frequency, get_tfidf_matrix, get_top_terms_df
+from src.wiki_scraper.article_index_class import ArticleIndex
+from src.wiki_scraper.boilerplate_pruner_class import BoilerplatePruner, \
+    selector_key
+from src.wiki_scraper.crawl_budget_class import SaturationMonitor
+from src.wiki_scraper.crawl_frontier_class import BestFirstFrontier
+from src.wiki_scraper.counting_backend_class import ExactCountingBackend, \
+    SpaceSavingCountingBackend, SpillingCountingBackend, BloomFilter, \
+    create_counting_backend, iter_counts_json, write_counts_json
+from src.wiki_scraper.fetcher_class import Fetcher
+from src.wiki_scraper.memory_monitor_class import MemoryMonitor
+from src.wiki_scraper.multi_wiki_crawl_class import MultiWikiCrawl, \
+    WikiCrawlJob, path_for_wiki
+from src.wiki_scraper.ngram_counter_class import NGramCounter
+from src.wiki_scraper.page_archive_class import PageArchive
+from src.wiki_scraper.page_cache_class import PageCache, canonical_title
+from src.wiki_scraper.reprocess_archive import reprocess_archive
 from src.wiki_scraper.scraper_class import Scraper
-from src.wiki_scraper.scraping_manager_class import load_counter_from_json
+from src.wiki_scraper.seed_source_class import TitleFileSeedSource, \
+    ListingSeedSource, create_seed_source
+from src.wiki_scraper.shared_work_queue_class import SharedWorkQueue
+from src.wiki_scraper.scraping_manager_class import load_counter_from_json, \
+    save_counter_to_json, ScrapingManager
+from src.wiki_scraper.term_matrix_class import TermMatrix, \
+    TermMatrixBuilder
+from tests.local_wiki_server import LocalWikiServer, make_article
 
 class MyTestCase(unittest.TestCase):
 
@@ -71,5 +109,1576 @@ class MyTestCase(unittest.TestCase):
         summary = scraper.get_summary()
         self.assertEqual(summary, "this is an example of a summary.")
 
+
+class FetcherTestCase(unittest.TestCase):
+
+    def test_server_errors_are_retried(self):
+        pages = {"Pikachu": make_article("Pikachu", ["Electric mouse."])}
+        with LocalWikiServer(pages, failures={"Pikachu": 2}) as server:
+            fetcher = Fetcher(max_retries=3, backoff_base=0.01)
+            scraper = Scraper(server.wiki_url, "Pikachu", fetcher=fetcher)
+            self.assertEqual(scraper.get_summary(), "Electric mouse.")
+            self.assertEqual(server.request_counts["Pikachu"], 3)
+            self.assertEqual(fetcher.retries_done, 2)
+
+    def test_stalled_request_times_out_and_is_retried(self):
+        pages = {"Pikachu": make_article("Pikachu", ["Electric mouse."])}
+        with LocalWikiServer(pages, delays={"Pikachu": [2]}) as server:
+            fetcher = Fetcher(read_timeout=0.3, backoff_base=0.01)
+            scraper = Scraper(server.wiki_url, "Pikachu", fetcher=fetcher)
+            self.assertEqual(scraper.get_summary(), "Electric mouse.")
+            self.assertLess(fetcher.latency_percentile(100), 1.5)
+
+    def test_exhausted_retries_raise_connection_error(self):
+        pages = {"Pikachu": make_article("Pikachu", ["Electric mouse."])}
+        with LocalWikiServer(pages, failures={"Pikachu": 5}) as server:
+            fetcher = Fetcher(max_retries=1, backoff_base=0.01)
+            scraper = Scraper(server.wiki_url, "Pikachu", fetcher=fetcher)
+            with self.assertRaises(ConnectionError):
+                scraper.fetch_data()
+
+    def test_hedged_request_wins_over_slow_one(self):
+        pages = {"Pikachu": make_article("Pikachu", ["Electric mouse."])}
+        with LocalWikiServer(pages, delays={"Pikachu": [2]}) as server:
+            fetcher = Fetcher(hedge_after=0.1, max_retries=0)
+            scraper = Scraper(server.wiki_url, "Pikachu", fetcher=fetcher)
+            self.assertEqual(scraper.get_summary(), "Electric mouse.")
+            self.assertEqual(fetcher.hedges_sent, 1)
+            self.assertLess(fetcher.latency_percentile(50), 1.5)
+
+    def test_page_deadline_covers_slow_body(self):
+        # Every piece of the body arrives within the read timeout, but the
+        # whole body takes much longer than the page deadline
+        pages = {"Pikachu": make_article("Pikachu", ["Electric mouse. " * 500])}
+        with LocalWikiServer(pages, trickles={"Pikachu": 0.1}) as server:
+            fetcher = Fetcher(read_timeout=1.0, page_deadline=0.5,
+                              max_retries=0)
+            scraper = Scraper(server.wiki_url, "Pikachu", fetcher=fetcher)
+            start = time.monotonic()
+            with self.assertRaises(ConnectionError):
+                scraper.fetch_data()
+            self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_close_stops_hedging_threads(self):
+        pages = {"Pikachu": make_article("Pikachu", ["Electric mouse."])}
+        with LocalWikiServer(pages) as server:
+            fetcher = Fetcher(hedge_after=1.0)
+            scraper = Scraper(server.wiki_url, "Pikachu", fetcher=fetcher)
+            self.assertEqual(scraper.get_summary(), "Electric mouse.")
+            self.assertIsNotNone(fetcher._executor)
+            fetcher.close()
+            self.assertIsNone(fetcher._executor)
+            # The fetcher still works after closing
+            scraper = Scraper(server.wiki_url, "Pikachu", fetcher=fetcher)
+            self.assertEqual(scraper.get_summary(), "Electric mouse.")
+
+    def test_latency_percentiles(self):
+        fetcher = Fetcher()
+        self.assertIsNone(fetcher.latency_percentile(50))
+        fetcher.latencies = [float(i) for i in range(1, 101)]
+        self.assertEqual(fetcher.latency_percentile(50), 50.0)
+        self.assertEqual(fetcher.latency_percentile(99), 99.0)
+        self.assertEqual(fetcher.latency_percentile(100), 100.0)
+
+    def test_latency_sample_is_bounded(self):
+        fetcher = Fetcher()
+        fetcher.LATENCY_SAMPLE_SIZE = 1000
+        for i in range(20000):
+            fetcher._record_latency(i / 20000)
+        self.assertEqual(len(fetcher.latencies), 1000)
+        self.assertEqual(fetcher.pages_fetched, 20000)
+        self.assertIn("Fetched 20000 pages", fetcher.latency_report())
+        self.assertAlmostEqual(fetcher.latency_percentile(50), 0.5,
+                               delta=0.1)
+        self.assertGreater(fetcher.latency_percentile(99), 0.9)
+
+
+def make_chain_corpus(number_of_pages):
+    """
+    Synthetic wiki: "Start" links to every page, each page links to the next
+    one. Pages after the fifth one repeat the same words.
+    """
+    titles = [f"Page {i}" for i in range(number_of_pages)]
+    pages = {"Start": make_article("Start", ["start"], titles)}
+    for i, title in enumerate(titles):
+        text = f"unique{i} common words" if i < 5 else "common words"
+        next_titles = titles[i + 1:i + 2]
+        pages[title] = make_article(title, [text], next_titles)
+    return pages
+
+
+class CrawlStrategyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.json_file = "temporary_crawl_counts.json"
+
+    def tearDown(self):
+        if os.path.exists(self.json_file):
+            os.remove(self.json_file)
+
+    def test_best_first_frontier_prefers_most_linked_phrase(self):
+        frontier = BestFirstFrontier("inlinks")
+        frontier.push("a", 1)
+        frontier.push("b", 1)
+        frontier.push("b", 2)
+        frontier.push("c", 1)
+        self.assertEqual(frontier.pop(), ("b", 1))
+        self.assertEqual(frontier.pop(), ("a", 1))
+        self.assertEqual(frontier.pop(), ("c", 1))
+        self.assertEqual(len(frontier), 0)
+
+    def test_best_first_frontier_by_novelty(self):
+        frontier = BestFirstFrontier("novelty")
+        frontier.push("a", 1, 0.1)
+        frontier.push("b", 1, 0.9)
+        self.assertEqual(frontier.pop(), ("b", 1))
+
+    def test_saturation_monitor(self):
+        monitor = SaturationMonitor(threshold=1, window=2)
+        monitor.record(0)
+        self.assertFalse(monitor.saturated())
+        monitor.record(1)
+        self.assertTrue(monitor.saturated())
+        monitor.record(5)
+        self.assertFalse(monitor.saturated())
+
+    def test_page_budget_stops_the_crawl(self):
+        with LocalWikiServer(make_chain_corpus(10)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            manager.auto_count_words("Start", max_depth=5,
+                                     json_path=self.json_file, max_pages=3)
+            self.assertEqual(sum(server.request_counts.values()), 3)
+        counts = load_counter_from_json(self.json_file)
+        self.assertEqual(counts["start"], 2)  # Body and heading
+        self.assertEqual(counts["common"], 2)
+
+    def test_saturation_stops_the_crawl(self):
+        with LocalWikiServer(make_chain_corpus(30)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            manager.auto_count_words("Start", max_depth=1,
+                                     json_path=self.json_file,
+                                     strategy="inlinks",
+                                     saturation_threshold=1,
+                                     saturation_window=3)
+            self.assertLess(sum(server.request_counts.values()), 12)
+        counts = load_counter_from_json(self.json_file)
+        for i in range(5):
+            self.assertEqual(counts[f"unique{i}"], 1)
+
+
+class CoordinatedCrawlTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.queue_dir = tempfile.mkdtemp()
+        self.json_file = "temporary_coordinated_counts.json"
+        self.reference_json_file = "temporary_reference_counts.json"
+
+    def tearDown(self):
+        shutil.rmtree(self.queue_dir, ignore_errors=True)
+        for path in (self.json_file, self.reference_json_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_phrase_is_claimed_once_and_added_once(self):
+        queue = SharedWorkQueue(self.queue_dir)
+        self.assertTrue(queue.add("Pikachu", 0))
+        self.assertFalse(queue.add("Pikachu", 1))
+        item = queue.claim("worker-a")
+        self.assertEqual((item.phrase, item.depth), ("Pikachu", 0))
+        self.assertIsNone(queue.claim("worker-b"))
+        self.assertFalse(queue.is_finished())
+        self.assertTrue(queue.complete(item))
+        self.assertTrue(queue.is_finished())
+
+    def test_expired_lease_is_given_to_another_worker(self):
+        queue = SharedWorkQueue(self.queue_dir, lease_seconds=1)
+        queue.add("Pikachu", 0)
+        item = queue.claim("worker-a")
+        leased_path = os.path.join(self.queue_dir, "leased",
+                                   f"{item.name}__worker-a")
+        os.utime(leased_path, (0, 0))
+        second_item = queue.claim("worker-b")
+        self.assertEqual(second_item.phrase, "Pikachu")
+        # The first worker lost its lease
+        self.assertFalse(queue.complete(item))
+        self.assertTrue(queue.complete(second_item))
+
+    def claim_with_requeue_after_rename(self, age_lease):
+        """
+        Claims the only pending item while another queue requeues expired
+        leases right after the item was moved to leased/.
+        """
+        queue = SharedWorkQueue(self.queue_dir, lease_seconds=1)
+        other_queue = SharedWorkQueue(self.queue_dir, lease_seconds=1)
+        queue.add("Pikachu", 0)
+        name = os.listdir(os.path.join(self.queue_dir, "pending"))[0]
+        # The item has been pending for a long time
+        os.utime(os.path.join(self.queue_dir, "pending", name), (0, 0))
+        rename = os.rename
+        calls = []
+
+        def rename_then_requeue(source, target):
+            rename(source, target)
+            if not calls:
+                calls.append(target)
+                if age_lease:
+                    os.utime(target, (0, 0))
+                other_queue.requeue_expired()
+
+        with mock.patch("os.rename", side_effect=rename_then_requeue):
+            return queue.claim("worker-a")
+
+    def test_fresh_claim_of_an_old_item_isnt_requeued(self):
+        item = self.claim_with_requeue_after_rename(age_lease=False)
+        self.assertEqual(item.phrase, "Pikachu")
+        self.assertEqual(SharedWorkQueue(self.queue_dir).progress()["leased"],
+                         1)
+
+    def test_lost_claim_is_skipped(self):
+        self.assertIsNone(self.claim_with_requeue_after_rename(age_lease=True))
+        self.assertEqual(SharedWorkQueue(self.queue_dir).progress()["pending"],
+                         1)
+
+    def test_failed_item_is_retried_then_moved_to_failed(self):
+        queue = SharedWorkQueue(self.queue_dir, max_attempts=2)
+        queue.add("Pikachu", 0)
+        queue.release(queue.claim("worker-a"))
+        self.assertEqual(queue.progress()["pending"], 1)
+        queue.release(queue.claim("worker-a"))
+        self.assertEqual(queue.progress()["failed"], 1)
+        self.assertTrue(queue.is_finished())
+
+    def test_missing_article_fails_without_stopping_the_crawl(self):
+        pages = make_chain_corpus(3)
+        pages["Start"] = make_article("Start", ["start"],
+                                      ["Page 0", "Missing page"])
+        with LocalWikiServer(pages) as server:
+            progress = ScrapingManager(server.wiki_url).coordinated_count_words(
+                "Start", max_depth=3, queue_dir=self.queue_dir, workers=2,
+                json_path=self.json_file, progress_interval=60
+            )
+        self.assertEqual(progress["done"], 4)
+        self.assertEqual(progress["failed"], 1)
+        self.assertEqual(load_counter_from_json(self.json_file)["unique2"], 1)
+
+    def test_workers_use_the_fetcher_settings_and_pruning(self):
+        pages = {"Start": make_article(
+            "Start", ["start"], extra_html='<div class="navbox">navword</div>')}
+        with LocalWikiServer(pages) as server:
+            manager = ScrapingManager(server.wiki_url,
+                                      fetcher=Fetcher(read_timeout=7.0),
+                                      pruning_profile="mediawiki")
+            manager.coordinated_count_words(
+                "Start", max_depth=0, queue_dir=self.queue_dir, workers=1,
+                json_path=self.json_file, progress_interval=60
+            )
+        config = SharedWorkQueue(self.queue_dir).load_config()
+        self.assertEqual(config["fetcher"]["read_timeout"], 7.0)
+        self.assertEqual(config["pruning_profile"], "mediawiki")
+        counts = load_counter_from_json(self.json_file)
+        self.assertEqual(counts["start"], 2)
+        self.assertNotIn("navword", counts)
+
+    def test_coordinated_crawl_matches_single_process_crawl(self):
+        with LocalWikiServer(make_chain_corpus(12)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            manager.auto_count_words("Start", max_depth=2,
+                                     json_path=self.reference_json_file)
+            progress = manager.coordinated_count_words(
+                "Start", max_depth=2, queue_dir=self.queue_dir, workers=3,
+                json_path=self.json_file, progress_interval=60
+            )
+        self.assertEqual(progress["done"], 13)
+        self.assertEqual(progress["failed"], 0)
+        self.assertEqual(load_counter_from_json(self.json_file),
+                         load_counter_from_json(self.reference_json_file))
+        self.assertGreater(len(os.listdir(
+            os.path.join(self.queue_dir, "shards"))), 0)
+
+
+class StreamingParsingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.html_file = "temporary_streaming_html_file.html"
+        table_rows = "".join(f"<tr><td>row{i}</td><td>{i}</td></tr>"
+                             for i in range(3))
+        self.html_content = f"""
+            <html><body>
+            <table><tr><td>menu</td><td>1</td></tr></table>
+            <div id="mw-content-text">
+            <div class="mw-parser-output">
+                <div><p>Nested paragraph isn't a summary.</p></div>
+                <p> <br/> </p>
+                <p>Pikachu &amp; <b>Raichu</b><br>are <a href="/wiki/x">mice</a>.
+                <script>var ignored = 1;</script></p>
+                <p>Second paragraph.</p>
+                <table><tr><th>Name</th><th>No</th></tr>{table_rows}</table>
+            </div></div>
+            </body></html>
+            """
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(self.html_content)
+
+    def tearDown(self):
+        if os.path.exists(self.html_file):
+            os.remove(self.html_file)
+
+    def test_streaming_summary_matches_full_parse(self):
+        streaming = Scraper(self.html_file, use_local_html_file_instead=True)
+        full = Scraper(self.html_file, use_local_html_file_instead=True)
+        self.assertEqual(streaming.get_summary(streaming=True),
+                         full.get_summary())
+        self.assertIsNone(streaming.soup)
+
+    def test_streaming_table_matches_full_parse(self):
+        streaming = Scraper(self.html_file, use_local_html_file_instead=True)
+        full = Scraper(self.html_file, use_local_html_file_instead=True)
+        streamed_df = streaming.get_table(2, True, streaming=True)
+        self.assertTrue(streamed_df.equals(full.get_table(2, True)))
+        with self.assertRaises(ValueError):
+            streaming.get_table(3, streaming=True)
+
+    def test_streaming_summary_stops_download_early(self):
+        padding = "<p>filler text</p>" * 50000  # About 1 MB after summary
+        pages = {"Huge": make_article("Huge", ["Huge summary."],
+                                      extra_html=padding)}
+        with LocalWikiServer(pages) as server:
+            scraper = Scraper(server.wiki_url, "Huge")
+            self.assertEqual(scraper.get_summary(streaming=True),
+                             "Huge summary.")
+            page_size = len(pages["Huge"].encode("utf-8"))
+            self.assertLess(scraper.bytes_fetched, page_size / 10)
+
+    def test_streaming_decodes_utf8_without_a_charset(self):
+        pages = {"Flabébé": make_article("Flabébé", ["Flabébé is a Pokémon."])}
+        with LocalWikiServer(pages, content_type="text/html") as server:
+            scraper = Scraper(server.wiki_url, "Flabébé")
+            self.assertEqual(scraper.get_summary(streaming=True),
+                             "Flabébé is a Pokémon.")
+
+
+class IncrementalCountingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.json_file = "temporary_incremental_counts.json"
+        self.index_file = "temporary_incremental_index.json"
+        self.html_file = "temporary_incremental_html_file.html"
+        self.other_json_file = "temporary_incremental_other_counts.json"
+
+    def tearDown(self):
+        for path in (self.json_file, self.index_file, self.html_file,
+                     self.other_json_file,
+                     ScrapingManager.default_index_path(self.json_file),
+                     ScrapingManager.default_index_path(self.other_json_file)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def count_local_file(self, text):
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(make_article("Local", [text]))
+        manager = ScrapingManager(self.html_file, True)
+        manager.count_words(json_path=self.json_file, incremental=True,
+                            index_path=self.index_file)
+        return load_counter_from_json(self.json_file)
+
+    def test_counting_the_same_file_twice_is_idempotent(self):
+        first = self.count_local_file("pikachu uses thunderbolt")
+        second = self.count_local_file("pikachu uses thunderbolt")
+        self.assertEqual(first, second)
+        self.assertEqual(second["pikachu"], 1)
+
+    def test_changed_file_replaces_its_contribution(self):
+        self.count_local_file("pikachu uses thunderbolt")
+        counts = self.count_local_file("pikachu uses quick attack")
+        self.assertNotIn("thunderbolt", counts)
+        self.assertEqual(counts["pikachu"], 1)
+        self.assertEqual(counts["attack"], 1)
+
+    def test_every_counts_file_has_its_own_index(self):
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(make_article("Local", ["pikachu uses thunderbolt"]))
+        manager = ScrapingManager(self.html_file, True)
+        for json_path in (self.json_file, self.other_json_file):
+            manager.count_words(json_path=json_path, incremental=True)
+        # The article isn't treated as already counted in the other file
+        self.assertEqual(load_counter_from_json(self.other_json_file),
+                         load_counter_from_json(self.json_file))
+        self.assertEqual(ScrapingManager.default_index_path("a/counts.json"),
+                         "a/counts.index.json")
+
+    def test_changed_pruning_profile_counts_articles_again(self):
+        pages = {"Pikachu": make_article(
+            "Pikachu", ["thunderbolt"], revision_id=1,
+            extra_html='<div class="navbox">navwords</div>')}
+        with LocalWikiServer(pages) as server:
+            for profile in (None, "mediawiki"):
+                manager = ScrapingManager(server.wiki_url,
+                                          pruning_profile=profile)
+                manager.auto_count_words("Pikachu", 0,
+                                         json_path=self.json_file,
+                                         incremental=True,
+                                         index_path=self.index_file)
+            # The page didn't change, but it was requested unconditionally
+            self.assertEqual(server.not_modified_responses, 0)
+        counts = load_counter_from_json(self.json_file)
+        self.assertNotIn("navwords", counts)
+        self.assertEqual(counts["thunderbolt"], 1)
+
+    def test_interrupted_save_is_completed_by_the_next_run(self):
+        pages = {"Pikachu": make_article("Pikachu", ["thunderbolt"],
+                                         revision_id=1)}
+        replace = os.replace
+
+        def interrupted_replace(source, destination):
+            # The process stops after the index is written
+            if source.endswith(".pending"):
+                raise KeyboardInterrupt
+            replace(source, destination)
+
+        with LocalWikiServer(pages) as server:
+            manager = ScrapingManager(server.wiki_url)
+            with mock.patch("src.wiki_scraper.article_index_class.os.replace",
+                            side_effect=interrupted_replace):
+                with self.assertRaises(KeyboardInterrupt):
+                    manager.count_words("Pikachu", json_path=self.json_file,
+                                        incremental=True,
+                                        index_path=self.index_file)
+            self.assertFalse(os.path.exists(self.json_file))
+            manager.count_words("Pikachu", json_path=self.json_file,
+                                incremental=True, index_path=self.index_file)
+        self.assertFalse(os.path.exists(f"{self.json_file}.pending"))
+        self.assertEqual(load_counter_from_json(self.json_file),
+                         Counter(pikachu=1, thunderbolt=1))
+
+    def test_save_interrupted_before_the_index_is_dropped(self):
+        index = ArticleIndex(self.index_file, counts_path=self.json_file)
+        index.update("Pikachu", 1, None, {"thunderbolt": 1}, [])
+        index.save(lambda path: save_counter_to_json(
+            Counter(thunderbolt=1), path))
+        # New counts written, but not the index
+        save_counter_to_json(Counter(thunderbolt=2),
+                             f"{self.json_file}.pending")
+        ArticleIndex(self.index_file, counts_path=self.json_file)
+        self.assertFalse(os.path.exists(f"{self.json_file}.pending"))
+        self.assertEqual(load_counter_from_json(self.json_file),
+                         Counter(thunderbolt=1))
+
+    def test_titles_are_recorded_canonically(self):
+        pages = {"Pikachu": make_article("Pikachu", ["thunderbolt"],
+                                         revision_id=1)}
+        pages["pikachu"] = pages["Pikachu"]
+        with LocalWikiServer(pages) as server:
+            manager = ScrapingManager(server.wiki_url)
+            for phrase in ("pikachu", "Pikachu"):
+                manager.count_words(phrase, json_path=self.json_file,
+                                    incremental=True,
+                                    index_path=self.index_file)
+        self.assertEqual(load_counter_from_json(self.json_file)["thunderbolt"],
+                         1)
+        self.assertEqual(list(ArticleIndex(self.index_file).articles),
+                         ["Pikachu"])
+
+    def test_recrawl_skips_unchanged_and_replaces_changed_articles(self):
+        pages = {
+            "Start": make_article("Start", ["start"], ["Pikachu", "Eevee"],
+                                  revision_id=1),
+            "Pikachu": make_article("Pikachu", ["thunderbolt"],
+                                    revision_id=1),
+            "Eevee": make_article("Eevee", ["tackle"], revision_id=1)
+        }
+        with LocalWikiServer(pages) as server:
+            manager = ScrapingManager(server.wiki_url)
+            manager.auto_count_words("Start", 1, json_path=self.json_file,
+                                     incremental=True,
+                                     index_path=self.index_file)
+            first = load_counter_from_json(self.json_file)
+
+            pages["Pikachu"] = make_article("Pikachu", ["quick attack"],
+                                            revision_id=2)
+            manager.auto_count_words("Start", 1, json_path=self.json_file,
+                                     incremental=True,
+                                     index_path=self.index_file)
+            second = load_counter_from_json(self.json_file)
+            self.assertEqual(server.request_counts["Eevee"], 2)
+            # Start and Eevee were answered with 304 Not Modified
+            self.assertEqual(server.not_modified_responses, 2)
+
+        self.assertEqual(first["thunderbolt"], 1)
+        self.assertNotIn("thunderbolt", second)
+        self.assertEqual(second["attack"], 1)
+        self.assertEqual(second["tackle"], 1)
+        self.assertEqual(second["start"], 2)
+
+
+def make_zipf_pages(number_of_pages, vocabulary_size, words_per_page, seed=0):
+    """
+    Per-page Counters with Zipf-distributed words (like real text: a few
+    frequent words and a long tail).
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(vocabulary_size)]
+    weights = [1 / (i + 1) for i in range(vocabulary_size)]
+    return [Counter(rng.choices(vocabulary, weights, k=words_per_page))
+            for _ in range(number_of_pages)]
+
+
+class CountingBackendTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pages = make_zipf_pages(200, 5000, 300)
+        self.exact = ExactCountingBackend()
+        for page in self.pages:
+            self.exact.add(page)
+        self.json_file = "temporary_backend_counts.json"
+
+    def tearDown(self):
+        if os.path.exists(self.json_file):
+            os.remove(self.json_file)
+
+    def test_space_saving_counts_are_within_error_bound(self):
+        backend = SpaceSavingCountingBackend(capacity=500)
+        for page in self.pages:
+            backend.add(page)
+        self.assertLessEqual(len(backend), 500)
+        bound = backend.error_bound()
+        for word, count in backend.most_common():
+            true_count = self.exact.counts[word]
+            self.assertGreaterEqual(count, true_count)
+            self.assertLessEqual(count - true_count, bound)
+        # Every word more frequent than the bound is kept
+        for word, count in self.exact.most_common():
+            if count <= bound:
+                break
+            self.assertIn(word, backend)
+
+    def test_space_saving_stays_within_memory_budget(self):
+        budget = 200000
+        tracemalloc.start()
+        try:
+            backend = create_counting_backend("top-k", budget)
+            largest = 0
+            for i in range(300):
+                backend.add({f"word{i}-{j}": j % 7 + 1 for j in range(500)})
+                self.assertLessEqual(len(backend.heap),
+                                     2 * backend.capacity)
+                largest = max(largest, tracemalloc.get_traced_memory()[0])
+        finally:
+            tracemalloc.stop()
+        self.assertLess(largest, budget)
+
+    def test_space_saving_guaranteed_top_is_exact_top(self):
+        backend = SpaceSavingCountingBackend(capacity=500)
+        for page in self.pages:
+            backend.add(page)
+        guaranteed = backend.guaranteed_top(20)
+        self.assertGreater(len(guaranteed), 5)
+        exact_words = [w for w, _ in self.exact.most_common(len(guaranteed))]
+        self.assertEqual([w for w, _ in guaranteed], exact_words)
+
+    def test_spilling_backend_is_exact_and_bounded(self):
+        backend = SpillingCountingBackend(capacity=300)
+        try:
+            for page in self.pages:
+                backend.add(page)
+                self.assertLess(len(backend.counts), 300)
+            backend.remove(self.pages[0])
+            self.exact.remove(self.pages[0])
+            self.assertGreater(len(backend.run_paths), 1)
+            self.assertEqual(len(backend), len(self.exact))
+            backend.save(self.json_file)
+        finally:
+            backend.close()
+        self.assertEqual(len(backend), len(self.exact))
+        self.assertEqual(load_counter_from_json(self.json_file),
+                         self.exact.counts)
+
+    def test_spilled_words_are_still_known(self):
+        backend = SpillingCountingBackend(capacity=300)
+        try:
+            for page in self.pages:
+                backend.add(page)
+            self.assertGreater(len(backend.run_paths), 1)
+            self.assertTrue(all(word in backend for word in self.exact.counts))
+            unseen = sum(f"unseen{i}" in backend for i in range(2000))
+            self.assertLess(unseen, 100)
+        finally:
+            backend.close()
+
+    def test_bloom_filter_grows_without_false_negatives(self):
+        bloom = BloomFilter(initial_capacity=100)
+        for i in range(5000):
+            bloom.add(f"word{i}")
+        self.assertGreater(len(bloom.filters), 1)
+        self.assertTrue(all(f"word{i}" in bloom for i in range(5000)))
+        false_positives = sum(f"other{i}" in bloom for i in range(5000))
+        self.assertLess(false_positives, 5000 * 0.04)
+
+    def test_counts_file_is_read_in_pieces(self):
+        counts = Counter({'a "quoted"\tword': 3, "é": 12345, "back\\slash": 7,
+                          "plain": 1})
+        with open(self.json_file, 'w', encoding='utf-8') as f:
+            json.dump(counts, f, indent=4, ensure_ascii=False)
+        for chunk_size in (1, 2, 5, 1024):
+            self.assertEqual(dict(iter_counts_json(self.json_file,
+                                                   chunk_size)), counts)
+        write_counts_json(counts.items(), self.json_file)
+        self.assertEqual(dict(iter_counts_json(self.json_file, 3)), counts)
+        with open(self.json_file, 'w', encoding='utf-8') as f:
+            f.write('{"a": 1, "b": 2, "c')
+        self.assertEqual(list(iter_counts_json(self.json_file, 4)),
+                         [("a", 1), ("b", 2)])
+
+    def test_crawl_with_spilling_backend_matches_exact_crawl(self):
+        with LocalWikiServer(make_chain_corpus(10)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            manager.auto_count_words("Start", 1, json_path=self.json_file)
+            exact_counts = load_counter_from_json(self.json_file)
+            os.remove(self.json_file)
+            manager.auto_count_words("Start", 1, json_path=self.json_file,
+                                     counting="spill", memory_budget=800)
+        self.assertEqual(load_counter_from_json(self.json_file),
+                         exact_counts)
+
+    def test_failed_spilling_crawl_removes_its_runs(self):
+        manager = ScrapingManager("unused")
+        with mock.patch.object(manager, "_crawl_articles",
+                               side_effect=RuntimeError("crawl failed")), \
+                mock.patch.object(SpillingCountingBackend, "close",
+                                  autospec=True,
+                                  side_effect=SpillingCountingBackend.close) \
+                as close:
+            with self.assertRaises(RuntimeError):
+                manager.auto_count_words("Start", 1,
+                                         json_path=self.json_file,
+                                         counting="spill", memory_budget=800)
+        close.assert_called_once()
+        self.assertFalse(os.path.isdir(close.call_args[0][0].spill_dir))
+
+    def test_spilling_crawl_loads_existing_counts_in_batches(self):
+        with LocalWikiServer(make_chain_corpus(10)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            manager.auto_count_words("Start", 1, json_path=self.json_file)
+            once = load_counter_from_json(self.json_file)
+            with mock.patch("src.wiki_scraper.scraping_manager_class."
+                            "load_counter_from_json") as full_load:
+                manager.auto_count_words("Start", 1,
+                                         json_path=self.json_file,
+                                         counting="spill", memory_budget=800)
+            full_load.assert_not_called()
+        twice = load_counter_from_json(self.json_file)
+        self.assertEqual(twice, Counter({word: 2 * count
+                                         for word, count in once.items()}))
+
+    def test_top_k_crawl_keeps_exact_counts_file(self):
+        top_k_file = "temporary_backend_counts.top-k.json"
+        exact_counts = {"pikachu": 1000, "rare": 1}
+        write_counts_json(exact_counts.items(), self.json_file)
+        with mock.patch.object(ScrapingManager, "DEFAULT_JSON_PATH",
+                               os.path.abspath(self.json_file)), \
+                LocalWikiServer(make_chain_corpus(5)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            try:
+                manager.auto_count_words("Start", 1, counting="top-k",
+                                         memory_budget=800)
+                with self.assertRaises(ValueError):
+                    manager.auto_count_words("Start", 1,
+                                             json_path=self.json_file,
+                                             counting="top-k",
+                                             memory_budget=800)
+                self.assertTrue(os.path.exists(top_k_file))
+                self.assertNotIn("pikachu",
+                                 load_counter_from_json(top_k_file))
+            finally:
+                if os.path.exists(top_k_file):
+                    os.remove(top_k_file)
+        self.assertEqual(load_counter_from_json(self.json_file),
+                         exact_counts)
+
+
+class KeynessTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.word_counts = {"the": 50, "pikachu": 30, "thunderbolt": 10,
+                            "xyzzyqq": 3, "and": 1}
+        self.json_file = "temporary_keyness_counts.json"
+        self.csv_file = "temporary_keyness.csv"
+
+    def tearDown(self):
+        for path in (self.json_file, self.csv_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_keyness_matches_scalar_formulas(self):
+        reference_size = 10 ** 6
+        df = get_keyness_df(self.word_counts, reference_size=reference_size)
+        c = sum(self.word_counts.values())
+        d = reference_size
+        for row in df.itertuples(index=False):
+            a = self.word_counts[row.word]
+            b = row[3] * d  # frequency in the language
+            e1 = c * (a + b) / (c + d)
+            e2 = d * (a + b) / (c + d)
+            g2 = 2 * (a * math.log(a / e1) +
+                      (b * math.log(b / e2) if b > 0 else 0))
+            sign = 1 if a / c >= b / d else -1
+            self.assertAlmostEqual(row[4], sign * g2, places=6)
+            self.assertAlmostEqual(
+                row[5], math.log2(((a + 0.5) / c) / ((b + 0.5) / d)))
+
+    def test_keyness_is_sorted_and_signed(self):
+        df = get_keyness_df(self.word_counts)
+        scores = df["log-likelihood"].tolist()
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(len(df), len(self.word_counts))
+        by_word = df.set_index("word")["log-likelihood"]
+        self.assertGreater(by_word["pikachu"], 0)
+        self.assertLess(by_word["and"], 0)
+
+    def test_keyness_mode_saves_full_table(self):
+        with open(self.json_file, 'w', encoding='utf-8') as f:
+            json.dump(self.word_counts, f)
+        analyze_relative_word_frequency("keyness", 2,
+                                        json_path=self.json_file,
+                                        output_path=self.csv_file)
+        with open(self.csv_file, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), len(self.word_counts) + 1)
+
+
+class NGramCountingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.json_file = "temporary_ngram_counts.json"
+        self.html_file = "temporary_ngram_html_file.html"
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(make_article("Thunder Shock", [
+                "Pikachu uses Thunder Shock. Raichu uses Thunder Shock."
+            ]))
+
+    def tearDown(self):
+        for path in (self.json_file, self.html_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_scraper_counts_bigrams_without_crossing_the_title(self):
+        scraper = Scraper(self.html_file, use_local_html_file_instead=True)
+        bigrams = scraper.count_words(ngram=2)
+        self.assertEqual(bigrams["uses thunder"], 2)
+        self.assertEqual(bigrams["thunder shock"], 3)  # Twice + title
+        self.assertNotIn("shock thunder", bigrams)
+
+    def test_compact_counter_matches_joined_strings(self):
+        scraper = Scraper(self.html_file, use_local_html_file_instead=True)
+        counter = NGramCounter(3)
+        counter.add(counter.count_segments(scraper.get_word_segments()))
+        self.assertEqual(dict(counter.most_common()),
+                         dict(scraper.count_words(ngram=3)))
+
+    def test_pruning_keeps_frequent_ngrams(self):
+        counter = NGramCounter(2, max_ngrams=10)
+        frequent = ["pikachu", "uses"] * 20
+        rare = [f"rare{i}" for i in range(30)]
+        counter.add(counter.count_segments([frequent, rare]))
+        self.assertLessEqual(len(counter), 10)
+        self.assertEqual(counter.pruning_rounds, 1)
+        self.assertEqual(dict(counter.most_common(1)), {"pikachu uses": 20})
+
+    def test_pruning_threshold_follows_the_current_counts(self):
+        counter = NGramCounter(2, max_ngrams=6)
+        counter.add_joined({f"old {i}": 100 if i < 2 else 50
+                            for i in range(7)})
+        self.assertEqual(counter.prune_threshold, 51)
+        # A later round doesn't start from the earlier threshold
+        late = {"late bigram": 5}
+        late.update({f"rare {i}": 1 for i in range(4)})
+        counter.add_joined(late)
+        self.assertEqual(counter.pruning_rounds, 2)
+        self.assertEqual(dict(counter.most_common())["late bigram"], 5)
+
+    def test_pruning_frees_unused_words(self):
+        counter = NGramCounter(2, max_ngrams=20)
+        for page in range(50):
+            rare = [f"rare{page}-{i}" for i in range(30)]
+            counter.add(counter.count_segments([["pikachu", "uses"] * 5,
+                                                rare]))
+        self.assertLessEqual(len(counter.word_ids), 2 * len(counter))
+        self.assertLess(len(counter.words), 100)
+        self.assertEqual(counter.most_common(1), [("pikachu uses", 250)])
+        self.assertEqual(set(counter.word_ids),
+                         {word for ngram, _ in counter.most_common()
+                          for word in ngram.split(" ")})
+
+    def test_ngram_counts_are_saved_and_merged(self):
+        manager = ScrapingManager(self.html_file, True)
+        manager.count_words(json_path=self.json_file, ngram=2)
+        manager.count_words(json_path=self.json_file, ngram=2)
+        counts = load_counter_from_json(self.json_file)
+        self.assertEqual(counts["thunder shock"], 6)
+
+    def test_crawl_counts_ngrams(self):
+        with LocalWikiServer(make_chain_corpus(3)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            manager.auto_count_words("Start", 1, json_path=self.json_file,
+                                     ngram=2)
+        counts = load_counter_from_json(self.json_file)
+        self.assertEqual(counts["common words"], 3)
+        self.assertEqual(counts["page 0"], 2)  # Title and link on Start
+
+
+class StreamingCrawlTestCase(unittest.TestCase):
+
+    def test_records_are_yielded_in_crawl_order(self):
+        with LocalWikiServer(make_chain_corpus(3)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            records = list(manager.iter_articles("Start", 1))
+        self.assertEqual([record.title for record in records],
+                         ["Start", "Page 0", "Page 1", "Page 2"])
+        self.assertEqual(records[0].links, ["Page 0", "Page 1", "Page 2"])
+        self.assertEqual(records[1].depth, 1)
+        self.assertEqual(records[1].summary, "unique0 common words")
+        self.assertEqual(records[1].counts["common"], 1)
+
+    def test_prefetching_is_bounded(self):
+        with LocalWikiServer(make_chain_corpus(20)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            articles = manager.iter_articles("Start", 1, buffer_size=2)
+            next(articles)
+            time.sleep(0.5)
+            # The consumed record, a full buffer and one record waiting
+            # for free space
+            self.assertLessEqual(sum(server.request_counts.values()), 4)
+            articles.close()
+            requests_after_close = sum(server.request_counts.values())
+            time.sleep(0.2)
+            self.assertEqual(sum(server.request_counts.values()),
+                             requests_after_close)
+
+    def test_without_buffer_pages_are_fetched_on_demand(self):
+        with LocalWikiServer(make_chain_corpus(5)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            for record in manager.iter_articles("Start", 1, buffer_size=0):
+                if record.title == "Page 0":
+                    break
+            self.assertEqual(sum(server.request_counts.values()), 2)
+
+    def test_page_budget(self):
+        with LocalWikiServer(make_chain_corpus(5)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            records = list(manager.iter_articles("Start", 1, max_pages=2))
+        self.assertEqual(len(records), 2)
+
+    def test_closing_interrupts_waiting_time(self):
+        with LocalWikiServer(make_chain_corpus(5)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            articles = manager.iter_articles("Start", 1, waiting_time=10.0,
+                                             buffer_size=2)
+            next(articles)
+            start = time.monotonic()
+            articles.close()
+            self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_records_carry_novelty(self):
+        with LocalWikiServer(make_chain_corpus(6)) as server:
+            manager = ScrapingManager(server.wiki_url)
+            records = {record.title: record
+                       for record in manager.iter_articles("Start", 1)}
+        # "Page 0" brings three new words, "Page 5" repeats earlier ones
+        self.assertEqual(records["Page 0"].new_words, 3)
+        self.assertEqual(records["Page 5"].novelty, 0.0)
+
+
+class PageCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.json_file = "temporary_cache_counts.json"
+        tables = "".join(
+            f"<table><tr><th>Type</th><th>Power</th></tr>"
+            f"<tr><td>Electric</td><td>{power}</td></tr></table>"
+            for power in (40, 90))
+        self.pages = {"Pikachu": make_article(
+            "Pikachu", ["Pikachu is an Electric-type Pokémon."],
+            extra_html=tables)}
+        self.csv_file = os.path.join("data", "Pikachu.csv")
+        self.csv_existed = os.path.exists(self.csv_file)
+
+    def tearDown(self):
+        if os.path.exists(self.json_file):
+            os.remove(self.json_file)
+        if not self.csv_existed and os.path.exists(self.csv_file):
+            os.remove(self.csv_file)
+
+    def test_operations_on_one_article_fetch_it_once(self):
+        with LocalWikiServer(self.pages) as server:
+            manager = ScrapingManager(server.wiki_url, cache_bytes=10 ** 7)
+            summary = manager.get_summary("Pikachu")
+            first_table = manager.get_table(1, "Pikachu")
+            second_table = manager.get_table(2, "pikachu")
+            manager.count_words("Pikachu", json_path=self.json_file)
+            self.assertEqual(server.request_counts["Pikachu"], 1)
+        self.assertEqual(summary, "Pikachu is an Electric-type Pokémon.")
+        self.assertIsNotNone(first_table)
+        self.assertIsNotNone(second_table)
+        self.assertEqual(manager.page_cache.misses, 1)
+        self.assertEqual(manager.page_cache.hits, 3)
+        counts = load_counter_from_json(self.json_file)
+        self.assertEqual(counts["pikachu"], 2)  # Summary and heading
+
+    def test_least_recently_used_page_is_evicted(self):
+        pages = {f"Page {i}": make_article(f"Page {i}", ["x" * 1000])
+                 for i in range(3)}
+        with LocalWikiServer(pages) as server:
+            manager = ScrapingManager(server.wiki_url)
+            # The parsed tree and the downloaded HTML
+            page_size = (PageCache.PARSED_BYTES_PER_HTML_BYTE + 1) * \
+                len(pages["Page 0"].encode("utf-8"))
+            manager.page_cache = PageCache(2 * page_size)
+            manager.get_summary("Page 0")
+            manager.get_summary("Page 1")
+            manager.get_summary("Page 0")
+            manager.get_summary("Page 2")
+            self.assertIn("Page 0", manager.page_cache)
+            self.assertNotIn("Page 1", manager.page_cache)
+            self.assertEqual(manager.page_cache.evictions, 1)
+            self.assertLessEqual(manager.page_cache.bytes, 2 * page_size)
+
+    def test_canonical_title(self):
+        self.assertEqual(canonical_title(" pikachu_(Pokémon) "),
+                         "Pikachu (Pokémon)")
+
+    def test_cache_is_shared_by_threads(self):
+        with LocalWikiServer(make_chain_corpus(5)) as server:
+            manager = ScrapingManager(server.wiki_url, cache_bytes=10 ** 7)
+            list(manager.iter_articles("Start", 1))
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                summaries = list(executor.map(
+                    manager.get_summary,
+                    [f"Page {i % 5}" for i in range(40)]))
+            self.assertEqual(sum(server.request_counts.values()), 6)
+        self.assertEqual(summaries[1], "unique1 common words")
+        self.assertEqual(manager.page_cache.hits, 40)
+
+    def test_cached_page_is_pruned_by_threads_safely(self):
+        pages = {"Pikachu": make_article("Pikachu", ["Electric mouse."],
+                                         extra_html=BOILERPLATE_HTML * 5)}
+        with LocalWikiServer(pages) as server:
+            # Threads get the page while the first one is still pruning it
+            for _ in range(30):
+                manager = ScrapingManager(server.wiki_url,
+                                          cache_bytes=10 ** 7,
+                                          pruning_profile="bulbapedia")
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    counts = list(executor.map(
+                        lambda _: manager._load_scraper(
+                            "Pikachu").count_words(),
+                        range(32)))
+                self.assertTrue(all(c == counts[0] for c in counts))
+            # The cached page itself stays complete
+            cached = manager._load_scraper("Pikachu", full_page=True)
+            self.assertIn("navwords", cached.soup.get_text())
+        self.assertNotIn("navwords", counts[0])
+        self.assertEqual(counts[0]["electricity"], 5)
+
+    def test_downloaded_html_counts_towards_the_size(self):
+        scraper = Scraper("unused", "Pikachu")
+        scraper.load_html(b"<p>abc</p>")
+        cache = PageCache(10 ** 6)
+        self.assertEqual(cache.estimate_size(scraper),
+                         10 * PageCache.PARSED_BYTES_PER_HTML_BYTE + 10)
+
+
+def make_listing_corpus():
+    """
+    Synthetic wiki with Special:AllPages split into two pages (with one
+    redirect), a paged category and a list article which also links to
+    unrelated pages.
+    """
+    species = ["Bulbasaur", "Ivysaur", "Venusaur", "Charmander"]
+    pages = {title: make_article(title, [f"{title} is a Pokémon species"],
+                                 ["Type", "Move"])
+             for title in species}
+    for title in ("Type", "Move"):
+        pages[title] = make_article(title, ["unrelated"])
+
+    def all_pages(entries, next_from=None):
+        items = "".join(
+            f'<li{" class=allpagesredirect" if redirect else ""}>'
+            f'<a href="/wiki/{title}" title="{title}">{title}</a></li>'
+            for title, redirect in entries)
+        nav = ""
+        if next_from:
+            nav = (f'<div class="mw-allpages-nav"><a href="/wiki/'
+                   f'Special:AllPages?from={next_from}">Next page '
+                   f'({next_from})</a></div>')
+        return (f'<html><body>{nav}<div class="mw-allpages-body">'
+                f'<ul class="mw-allpages-chunk">{items}</ul></div>'
+                f'</body></html>')
+
+    pages["Special:AllPages"] = all_pages(
+        [("Bulbasaur", False), ("Bulba", True), ("Charmander", False)],
+        next_from="Ivysaur")
+    pages["Special:AllPages?from=Ivysaur"] = all_pages(
+        [("Ivysaur", False), ("Move", False)])
+
+    def category(titles, next_from=None):
+        links = "".join(f'<li><a href="/wiki/{title}" title="{title}">'
+                        f'{title}</a></li>' for title in titles)
+        nav = ""
+        if next_from:
+            nav = (f'<a href="/wiki/Category:Grass_Pokémon?pagefrom='
+                   f'{next_from}#mw-pages">next page</a>')
+        return (f'<html><body><div id="mw-subcategories"><div '
+                f'class="mw-category"><a href="/wiki/Category:Seeds">Seeds'
+                f'</a></div></div><div id="mw-pages">(previous page) {nav}'
+                f'<div class="mw-category"><ul>{links}</ul></div></div>'
+                f'</body></html>')
+
+    pages["Category:Grass Pokémon"] = category(["Bulbasaur", "Ivysaur"],
+                                               next_from="Venusaur")
+    pages["Category:Grass Pokémon?pagefrom=Venusaur"] = \
+        category(["Venusaur"])
+    pages["Pokémon list"] = make_article("Pokémon list", ["list"], species)
+    return pages
+
+
+class SeedSourceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.json_file = "temporary_seed_counts.json"
+        self.titles_file = "temporary_seed_titles.txt"
+
+    def tearDown(self):
+        for path in (self.json_file, self.titles_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_all_pages_are_enumerated_across_pages(self):
+        with LocalWikiServer(make_listing_corpus()) as server:
+            source = create_seed_source("Special:AllPages", server.wiki_url)
+            titles = list(source.titles())
+        self.assertEqual(titles, ["Bulbasaur", "Charmander", "Ivysaur",
+                                  "Move"])
+        self.assertEqual(source.pages_fetched, 2)
+
+    def test_category_pages_are_enumerated_across_pages(self):
+        with LocalWikiServer(make_listing_corpus()) as server:
+            source = create_seed_source("Category:Grass Pokémon",
+                                        server.wiki_url)
+            titles = list(source.titles())
+        self.assertEqual(titles, ["Bulbasaur", "Ivysaur", "Venusaur"])
+
+    def test_title_file(self):
+        with open(self.titles_file, 'w', encoding='utf-8') as f:
+            f.write("# Starters\nBulbasaur\n\nCharmander\nMr._Mime\n")
+        source = create_seed_source(self.titles_file, "unused")
+        self.assertIsInstance(source, TitleFileSeedSource)
+        self.assertEqual(list(source.titles()),
+                         ["Bulbasaur", "Charmander", "Mr. Mime"])
+
+    def test_seeds_are_the_exact_work_list(self):
+        with LocalWikiServer(make_listing_corpus()) as server:
+            manager = ScrapingManager(server.wiki_url)
+            source = create_seed_source("Category:Grass Pokémon",
+                                        server.wiki_url)
+            manager.auto_count_words(None, 0, json_path=self.json_file,
+                                     seeds=source.titles())
+            seeded_requests = sum(server.request_counts.values())
+            self.assertEqual(server.request_counts["Type"], 0)
+        counts = load_counter_from_json(self.json_file)
+        self.assertEqual(counts["species"], 3)
+        self.assertNotIn("unrelated", counts)
+        # Two listing pages and three articles, instead of the list page,
+        # all its links and the links of the linked pages
+        self.assertEqual(seeded_requests, 5)
+
+    def test_invalid_seed_source(self):
+        with self.assertRaises(ValueError):
+            create_seed_source("Pikachu", "unused")
+
+    def test_listing_requires_page_extractors(self):
+        class TitlesOnlySource(ListingSeedSource):
+            def find_titles(self, soup):
+                return []
+
+        with self.assertRaises(TypeError):
+            TitlesOnlySource("unused", "Special:AllPages")
+
+
+class MultiWikiCrawlTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.json_files = []
+
+    def tearDown(self):
+        for path in self.json_files:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_wikis_are_crawled_concurrently_with_own_outputs(self):
+        first_pages = make_chain_corpus(4)
+        second_pages = {"Home": make_article("Home", ["other wiki"])}
+        # Each wiki answers slowly, so sequential crawls would take the sum
+        # of both durations
+        first_delays = {title: [0.15] for title in first_pages}
+        second_delays = {"Home": [0.6]}
+        with LocalWikiServer(first_pages, first_delays) as first, \
+                LocalWikiServer(second_pages, second_delays) as second:
+            jobs = [WikiCrawlJob(first.wiki_url, "Start"),
+                    WikiCrawlJob(second.wiki_url, "Home")]
+            self.json_files = [path_for_wiki(job.wiki_url, "word-counts.json")
+                               for job in jobs]
+            for job, path in zip(jobs, self.json_files):
+                job.json_path = path
+            crawl = MultiWikiCrawl(jobs)
+            start = time.monotonic()
+            crawl.run(max_depth=1)
+            elapsed = time.monotonic() - start
+        self.assertLess(elapsed, 0.75 + 0.6 - 0.2)
+        self.assertTrue(all(job.error is None for job in jobs))
+        first_counts = load_counter_from_json(self.json_files[0])
+        second_counts = load_counter_from_json(self.json_files[1])
+        self.assertEqual(first_counts["common"], 4)
+        self.assertNotIn("wiki", first_counts)
+        self.assertEqual(second_counts["wiki"], 1)
+        fetchers = [manager.fetcher for manager in crawl.managers.values()]
+        self.assertIsNot(fetchers[0].session, fetchers[1].session)
+
+    def test_host_can_be_crawled_once(self):
+        with self.assertRaises(ValueError):
+            MultiWikiCrawl([WikiCrawlJob("https://a.org/wiki", "X"),
+                            WikiCrawlJob("https://a.org/wiki/", "Y")])
+
+    def test_memory_reports_are_rejected(self):
+        crawl = MultiWikiCrawl([WikiCrawlJob("https://a.org/wiki", "X"),
+                                WikiCrawlJob("https://b.org/wiki", "Y")])
+        with self.assertRaises(ValueError):
+            crawl.run(max_depth=0, memory_report_every=1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_failed_crawl_does_not_stop_the_others(self):
+        pages = {"Home": make_article("Home", ["text"])}
+        with LocalWikiServer(pages) as server:
+            jobs = [WikiCrawlJob(server.wiki_url, "Home",
+                                 json_path="temporary_multi_counts.json"),
+                    WikiCrawlJob("https://other.org/wiki", "Home")]
+            self.json_files = [jobs[0].json_path]
+            crawl = MultiWikiCrawl(jobs)
+            # A crawl on a local file can't be started
+            crawl.managers["other.org"].use_local_file = True
+            crawl.run(max_depth=0)
+        self.assertIsNone(jobs[0].error)
+        self.assertIsInstance(jobs[1].error, ValueError)
+        self.assertEqual(load_counter_from_json(jobs[0].json_path)["text"], 1)
+
+
+BOILERPLATE_HTML = (
+    '<h2>Biology<span class="mw-editsection">[edit]</span></h2>\n'
+    '<p>Pikachu stores electricity<sup class="reference">[1]</sup></p>\n'
+    '<span style="display:none">hiddenmeta</span>\n'
+    '<script>var trackingcode = 1;</script>\n'
+    '<table class="navbox"><tr><td><a href="/wiki/Raichu">Raichu</a> '
+    'navwords<span class="mw-editsection">[edit]</span></td></tr></table>\n'
+    '<table class="sortable"><tr><th>Move</th></tr>\n'
+    '<tr><td>Thunderbolt</td></tr></table>\n'
+    '<div class="mw-references-wrap"><ol class="references">'
+    '<li>refsource</li></ol></div>'
+)
+
+
+class BoilerplatePruningTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.html_file = "temporary_boilerplate.html"
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(make_article("Pikachu", ["Pikachu is a mouse"],
+                                 ["Pichu"], BOILERPLATE_HTML))
+
+    def tearDown(self):
+        if os.path.exists(self.html_file):
+            os.remove(self.html_file)
+
+    def test_boilerplate_is_removed_before_counting(self):
+        pruner = BoilerplatePruner.from_profile("mediawiki")
+        scraper = Scraper(self.html_file, use_local_html_file_instead=True,
+                          pruner=pruner)
+        counts = scraper.count_words()
+        for word in ("edit", "hiddenmeta", "trackingcode", "navwords",
+                     "refsource", "1"):
+            self.assertNotIn(word, counts)
+        self.assertEqual(counts["electricity"], 1)
+        self.assertEqual(counts["thunderbolt"], 1)  # Kept by mediawiki
+        self.assertEqual(scraper.get_children_phrases(), ["Pichu"])
+
+        unpruned = Scraper(self.html_file, use_local_html_file_instead=True)
+        self.assertEqual(unpruned.count_words()["raichu"], 1)
+
+    def test_report_counts_nested_subtrees_once(self):
+        pruner = BoilerplatePruner.from_profile("bulbapedia")
+        scraper = Scraper(self.html_file, use_local_html_file_instead=True,
+                          pruner=pruner)
+        scraper.count_words()
+        scraper.get_children_phrases()
+        report = scraper.pruning_report
+        # Edit link, reference, hidden span, script, navbox (with its edit
+        # link), learnset table and references
+        self.assertEqual(report["removed_elements"], 7)
+        self.assertEqual(report["removed_chars"], len(
+            "[edit][1]hiddenmetavar trackingcode = 1;Raichu navwords[edit]"
+            "Move\nThunderboltrefsource"))
+        self.assertEqual(pruner.pages, 1)
+        self.assertIn("7 elements", BoilerplatePruner.describe(report))
+
+    def test_pruning_keeps_cached_page_for_tables(self):
+        pages = {"Pikachu": make_article("Pikachu", ["Pikachu is a mouse"],
+                                         extra_html=BOILERPLATE_HTML)}
+        with LocalWikiServer(pages) as server:
+            manager = ScrapingManager(server.wiki_url, cache_bytes=10 ** 7,
+                                      pruning_profile="bulbapedia")
+            manager._load_scraper("Pikachu").count_words()
+            scraper = manager._load_scraper("Pikachu", full_page=True)
+            self.assertEqual(len(scraper.soup.find_all("table")), 2)
+            # The words were counted on a copy, no second download needed
+            self.assertEqual(server.request_counts["Pikachu"], 1)
+
+    def test_indexed_matching_agrees_with_soupsieve(self):
+        pruner = BoilerplatePruner.from_profile("bulbapedia")
+        with open(self.html_file, 'r', encoding='utf-8') as f:
+            soup = BeautifulSoup(f, "html.parser")
+        root = soup.find("div", id="mw-content-text")
+        expected = soupsieve.select(", ".join(pruner.selectors), root)
+        self.assertEqual([element for element in root.find_all(True)
+                          if pruner.matches(element)], expected)
+        self.assertEqual(selector_key("div > table.roundy[style*='a b']"),
+                         ("class", "roundy"))
+        self.assertEqual(selector_key("[style*='display: none']"),
+                         ("attr", "style"))
+
+    def test_invalid_profile(self):
+        with self.assertRaises(ValueError):
+            BoilerplatePruner.from_profile("unknown")
+
+
+def make_large_pages_corpus(number_of_pages, paragraphs=300):
+    """
+    Chain of large pages sharing their vocabulary, so that the counts stay
+    small and the memory of a crawl is dominated by the parsed pages.
+    """
+    titles = [f"Page {i}" for i in range(number_of_pages)]
+    text = [" ".join(f"w{j}" for j in range(k * 20, k * 20 + 20))
+            for k in range(paragraphs)]
+    pages = {"Start": make_article("Start", ["start"], titles)}
+    for i, title in enumerate(titles):
+        pages[title] = make_article(title, text, titles[i + 1:i + 2])
+    return pages
+
+
+class CrawlMemoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.json_file = "temporary_memory_counts.json"
+
+    def tearDown(self):
+        if os.path.exists(self.json_file):
+            os.remove(self.json_file)
+
+    def test_released_scraper_frees_the_tree(self):
+        pages = make_large_pages_corpus(1)
+        with LocalWikiServer(pages) as server:
+            scraper = Scraper(server.wiki_url, "Page 0")
+            tracemalloc.start()
+            scraper.fetch_data()
+            loaded, _ = tracemalloc.get_traced_memory()
+            scraper.release()
+            released, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.assertIsNone(scraper.soup)
+            self.assertLess(released, loaded / 10)
+            # The page is loaded again when needed
+            self.assertEqual(scraper.get_summary(), "w0 w1 w2 w3 w4 w5 w6 w7 "
+                             "w8 w9 w10 w11 w12 w13 w14 w15 w16 w17 w18 w19")
+
+    def test_crawl_peak_memory_has_a_ceiling(self):
+        pages = make_large_pages_corpus(40)
+        tracemalloc.start()
+        BeautifulSoup(pages["Page 0"], "html.parser")
+        _, tree_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        with LocalWikiServer(pages) as server:
+            manager = ScrapingManager(server.wiki_url)
+            tracemalloc.start()
+            manager.auto_count_words("Start", 1, json_path=self.json_file)
+            _, crawl_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        # Parsed pages don't pile up: the whole crawl of 41 pages needs
+        # about as much memory as a few trees
+        self.assertLess(crawl_peak, 8 * tree_peak)
+        self.assertEqual(load_counter_from_json(self.json_file)["w0"], 40)
+
+    def test_memory_monitor_reports_every_n_pages(self):
+        monitor = MemoryMonitor(2)
+        monitor.start()
+        self.assertIsNone(monitor.record_page())
+        report = monitor.record_page()
+        monitor.stop()
+        self.assertIn("Memory after 2 pages", report)
+        if sys.platform.startswith("linux"):
+            self.assertIn("peak RSS", report)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_failed_crawl_stops_memory_tracing(self):
+        manager = ScrapingManager("unused")
+        with mock.patch.object(manager, "_crawl_articles",
+                               side_effect=RuntimeError("crawl failed")):
+            with self.assertRaises(RuntimeError):
+                manager.auto_count_words("Start", 1,
+                                         json_path=self.json_file,
+                                         memory_report_every=1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class PageArchiveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.archive_path = os.path.join(self.directory, "pages.warc.gz")
+        self.json_file = os.path.join(self.directory, "counts.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def crawl(self, pages):
+        with LocalWikiServer(pages) as server:
+            manager = ScrapingManager(server.wiki_url)
+            manager.auto_count_words("Start", 1, json_path=self.json_file,
+                                     archive_path=self.archive_path)
+            return server.wiki_url
+
+    def test_crawl_writes_a_warc_record_per_page(self):
+        wiki_url = self.crawl(make_chain_corpus(6))
+        archive = PageArchive(self.archive_path)
+        records = archive.records()
+        self.assertEqual(len(records), 7)
+        self.assertEqual(records[0].title, "Start")
+        self.assertEqual(records[0].url, f"{wiki_url}/Start")
+        self.assertIn(b"unique0", archive.read(records[1]))
+        # Every record is a gzip member, so the whole file is a .warc.gz
+        with gzip.open(self.archive_path, 'rb') as f:
+            content = f.read()
+        self.assertEqual(content.count(b"WARC/1.0\r\n"), 7)
+        self.assertEqual(content.count(b"WARC-Type: resource\r\n"), 7)
+
+    def test_records_are_found_without_the_index(self):
+        self.crawl(make_chain_corpus(3))
+        indexed = PageArchive(self.archive_path).records()
+        os.remove(f"{self.archive_path}.idx")
+        scanned = PageArchive(self.archive_path).records()
+        self.assertEqual([record.to_dict() for record in scanned],
+                         [record.to_dict() for record in indexed])
+
+    def test_latest_records_keep_the_newest_version(self):
+        archive = PageArchive(self.archive_path)
+        archive.append("Page", "url", b"old")
+        archive.append("Other", "url", b"other")
+        archive.append("Page", "url", b"new")
+        latest = archive.latest_records()
+        self.assertEqual([record.title for record in latest],
+                         ["Other", "Page"])
+        self.assertEqual(archive.read(latest[1]), b"new")
+
+    def test_reprocessed_counts_match_the_crawl(self):
+        self.crawl(make_chain_corpus(10))
+        crawled = load_counter_from_json(self.json_file)
+        output = os.path.join(self.directory, "reprocessed.json")
+        processed = reprocess_archive(self.archive_path, output_path=output,
+                                      processes=2, chunk_size=3)
+        self.assertEqual(processed, 11)
+        self.assertEqual(load_counter_from_json(output), crawled)
+
+    def test_reprocess_rebuilds_the_link_graph(self):
+        self.crawl(make_chain_corpus(4))
+        output = os.path.join(self.directory, "links.json")
+        reprocess_archive(self.archive_path, extract="links",
+                          output_path=output, processes=1)
+        with open(output, 'r', encoding='utf-8') as f:
+            link_graph = json.load(f)
+        self.assertEqual(link_graph["Start"],
+                         ["Page 0", "Page 1", "Page 2", "Page 3"])
+        self.assertEqual(link_graph["Page 0"], ["Page 1"])
+
+    def test_scan_handles_records_split_between_chunks(self):
+        archive = PageArchive(self.archive_path)
+        for i in range(30):
+            archive.append(f"Page {i}", f"url {i}",
+                           os.urandom(random.Random(i).randint(0, 3000)))
+        indexed = [record.to_dict() for record in archive.records()]
+        for chunk_size in (7, 512, 64 * 1024):
+            archive.SCAN_CHUNK_SIZE = chunk_size
+            self.assertEqual([record.to_dict() for record in archive.scan()],
+                             indexed)
+        # A record cut off at the end of the file is left out
+        with open(self.archive_path, 'ab') as f:
+            f.write(gzip.compress(b"WARC/1.0\r\n")[:10])
+        self.assertEqual(len(archive.scan()), 30)
+
+    def test_reprocess_saves_tables_of_subpages(self):
+        table = "<table><tr><th>Level</th><td>Move</td></tr>" \
+                "<tr><th>1</th><td>Growl</td></tr></table>"
+        pages = {
+            "Start": make_article("Start", ["start"], [
+                "Pikachu (Pokémon)/Generation I learnset", "No table"]),
+            "Pikachu (Pokémon)/Generation I learnset": make_article(
+                "Pikachu (Pokémon)/Generation I learnset", ["moves"],
+                extra_html=table),
+            "No table": make_article("No table", ["nothing"])
+        }
+        self.crawl(pages)
+        output = os.path.join(self.directory, "tables")
+        reprocess_archive(self.archive_path, extract="tables",
+                          output_path=output, processes=1, table_number=1,
+                          first_row_header=True)
+        self.assertEqual(os.listdir(output), [
+            "Pikachu_(Pokémon)_Generation_I_learnset.csv"])
+        with open(os.path.join(output, os.listdir(output)[0]), 'r',
+                  encoding='utf-8') as f:
+            content = f.read()
+        self.assertIn("Growl", content)
+
+    def test_reprocess_skips_tables_which_can_not_be_read(self):
+        pages = {
+            "Start": make_article("Start", ["start"], ["Empty", "Good"],
+                                  extra_html="<table></table>"),
+            "Empty": make_article("Empty", ["empty"],
+                                  extra_html="<table></table>"),
+            "Good": make_article("Good", ["good"], extra_html=(
+                "<table><tr><th>Level</th><td>Move</td></tr></table>"))
+        }
+        wiki_url = self.crawl(pages)
+        output = os.path.join(self.directory, "tables")
+        with mock.patch("builtins.print") as printed:
+            reprocess_archive(self.archive_path, extract="tables",
+                              output_path=output, processes=1,
+                              table_number=1)
+        self.assertEqual(os.listdir(output), ["Good.csv"])
+        warnings = " ".join(str(call) for call in printed.call_args_list)
+        self.assertIn(f"{wiki_url}/Empty:", warnings)
+        self.assertNotIn("Empty/Empty", warnings)
+
+    def test_reprocess_keeps_the_counts_of_the_crawl(self):
+        self.crawl(make_chain_corpus(3))
+        crawled = load_counter_from_json(self.json_file)
+        # Counts of earlier crawls, which aren't in the archive
+        save_counter_to_json(crawled + Counter(earlier=5), self.json_file)
+        with mock.patch.object(ScrapingManager, "DEFAULT_JSON_PATH",
+                               self.json_file):
+            reprocess_archive(self.archive_path, processes=1)
+        self.assertEqual(load_counter_from_json(self.json_file)["earlier"], 5)
+        reprocessed = os.path.join(self.directory,
+                                   "reprocessed-counts.json")
+        self.assertEqual(load_counter_from_json(reprocessed), crawled)
+
+    def test_reprocess_requires_a_table_number(self):
+        with self.assertRaises(ValueError):
+            reprocess_archive(self.archive_path, extract="tables")
+
+
+class TermMatrixTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.matrix_path = os.path.join(self.directory, "matrix.npz")
+        self.json_file = os.path.join(self.directory, "counts.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def dense(matrix):
+        array = np.zeros(matrix.shape)
+        for i in range(matrix.shape[0]):
+            start, end = matrix.indptr[i], matrix.indptr[i + 1]
+            array[i, matrix.indices[start:end]] = matrix.data[start:end]
+        return array
+
+    def test_builder_appends_csr_rows(self):
+        builder = TermMatrixBuilder()
+        builder.add_article("A", {"pikachu": 2, "electric": 1})
+        builder.add_article("B", {"fire": 3, "electric": 1})
+        matrix = builder.build()
+        self.assertEqual(matrix.shape, (2, 3))
+        self.assertEqual(matrix.terms, ["pikachu", "electric", "fire"])
+        self.assertEqual(matrix.indptr.tolist(), [0, 2, 4])
+        # Columns are sorted within a row
+        self.assertEqual(matrix.indices.tolist(), [0, 1, 1, 2])
+        self.assertEqual(matrix.data.tolist(), [2, 1, 1, 3])
+        self.assertEqual(matrix.row("B"), {"electric": 1, "fire": 3})
+        self.assertEqual(matrix.document_frequencies().tolist(), [1, 2, 1])
+
+    def test_extended_matrix_replaces_recounted_articles(self):
+        builder = TermMatrixBuilder()
+        builder.add_article("A", {"old": 1})
+        builder.add_article("B", {"b": 1})
+        builder.build().save(self.matrix_path)
+        builder = TermMatrixBuilder.from_matrix(
+            TermMatrix.load(self.matrix_path))
+        builder.add_article("A", {"new": 2})
+        matrix = builder.build()
+        self.assertEqual(matrix.titles, ["B", "A"])
+        self.assertEqual(matrix.row("A"), {"new": 2})
+        self.assertEqual(matrix.row("B"), {"b": 1})
+        self.assertEqual(matrix.indptr.tolist(), [0, 1, 2])
+
+    def test_saved_matrix_loads_without_pickle(self):
+        builder = TermMatrixBuilder()
+        builder.add_article("Pokémon", {"é": 1, "word": 5})
+        builder.add_article("Empty", {})
+        builder.build().save(self.matrix_path)
+        matrix = TermMatrix.load(self.matrix_path)
+        self.assertEqual(matrix.titles, ["Pokémon", "Empty"])
+        self.assertEqual(matrix.row("Pokémon"), {"é": 1, "word": 5})
+        self.assertEqual(matrix.row("Empty"), {})
+
+    def test_crawl_builds_a_row_per_article(self):
+        with LocalWikiServer(make_chain_corpus(8)) as server:
+            ScrapingManager(server.wiki_url).auto_count_words(
+                "Start", 1, json_path=self.json_file,
+                term_matrix_path=self.matrix_path)
+        matrix = TermMatrix.load(self.matrix_path)
+        self.assertEqual(matrix.shape[0], 9)
+        self.assertEqual(matrix.row("Page 2")["unique2"], 1)
+        # Columns add up to the merged counts
+        column_sums = np.bincount(matrix.indices, weights=matrix.data,
+                                  minlength=matrix.shape[1])
+        totals = dict(zip(matrix.terms, column_sums.astype(int).tolist()))
+        self.assertEqual(totals, dict(load_counter_from_json(self.json_file)))
+
+    def test_tfidf_matches_a_dense_computation(self):
+        builder = TermMatrixBuilder()
+        builder.add_article("A", {"pikachu": 4, "the": 10, "electric": 2})
+        builder.add_article("B", {"charmander": 3, "the": 8, "fire": 2})
+        builder.add_article("C", {"the": 5, "electric": 1, "fire": 1})
+        matrix = builder.build()
+        counts = self.dense(matrix)
+        tf = counts / counts.sum(axis=1, keepdims=True)
+        df = (counts > 0).sum(axis=0)
+        expected = tf * (np.log(4 / (1 + df)) + 1)
+        expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+        np.testing.assert_allclose(self.dense(get_tfidf_matrix(matrix)),
+                                   expected)
+
+    def test_top_terms_are_ranked_per_article(self):
+        builder = TermMatrixBuilder()
+        builder.add_article("A", {"pikachu": 4, "the": 5, "electric": 2})
+        builder.add_article("B", {"charmander": 3, "the": 4, "fire": 2})
+        builder.add_article("C", {"the": 5})
+        matrix = builder.build()
+        df = get_top_terms_df(matrix, 2)
+        self.assertEqual(df["article"].tolist(), ["A", "A", "B", "B", "C"])
+        self.assertEqual(df["rank"].tolist(), [1, 2, 1, 2, 1])
+        self.assertEqual(df["word"].tolist()[0], "pikachu")
+        self.assertEqual(df["word"].tolist()[2], "charmander")
+        self.assertEqual(df["count in the article"].tolist()[0], 4)
+        only_b = get_top_terms_df(matrix, 1, titles=["B"])
+        self.assertEqual(only_b["word"].tolist(), ["charmander"])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,20 @@ import argparse
 from src.wiki_scraper.web_scraper_controller_class import WebScraperController
 
 
+def positive_int(value):
+    """
+    Argument type of options which have to be positive integers.
+    :raises argparse.ArgumentTypeError: If the value isn't one.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"has to be at least 1: {value}")
+    return number
+
+
 def parse_arguments():
     """
     Parses command-line arguments for various operations.
@@ -47,6 +61,35 @@ def parse_arguments():
              " (requires --depth)."
     )
 
+    action_group.add_argument(
+        "--count-listed-words",
+        metavar="SEED SOURCE",
+        type=str,
+        help="Count words in exactly the articles listed by the source,"
+             " without following links (requires --wait). The source is"
+             " Special:AllPages (optionally Special:AllPages?from=TITLE),"
+             " Category:NAME or a file with one title per line. Accepts"
+             " the options of --auto-count-words except --depth."
+    )
+
+    action_group.add_argument(
+        "--crawl-worker",
+        metavar="QUEUE DIRECTORY",
+        type=str,
+        help="Join a coordinated --auto-count-words crawl (started with"
+             " --workers) as a worker. The queue directory has to be shared"
+             " with the coordinator."
+    )
+
+    action_group.add_argument(
+        "--reprocess",
+        metavar="ARCHIVE",
+        type=str,
+        help="Rebuild word counts, the link graph or tables from a page"
+             " archive written with --archive, without downloading anything"
+             " (see --extract and --processes)."
+    )
+
     action_group.add_argument(
         "--analyze-relative-word-frequency",
         action="store_true",
@@ -86,11 +129,237 @@ def parse_arguments():
         help="Time of waiting (in seconds) between processing sites"
              " (required for --auto-count-words)"
     )
+    parser.add_argument(
+        "--strategy",
+        choices=["bfs", "inlinks", "novelty"],
+        default="bfs",
+        help="Order of processing articles in --auto-count-words: by depth"
+             " (bfs), most linked first (inlinks) or linked from the most"
+             " novel articles first (novelty). Default: bfs"
+    )
+    parser.add_argument(
+        "--max-pages",
+        metavar="NUMBER OF PAGES",
+        type=int,
+        default=None,
+        help="Maximum number of articles processed by --auto-count-words"
+             " (optional)"
+    )
+    parser.add_argument(
+        "--max-seconds",
+        metavar="NUMBER OF SECONDS",
+        type=float,
+        default=None,
+        help="Maximum duration of --auto-count-words (optional)"
+    )
+    parser.add_argument(
+        "--max-bytes",
+        metavar="NUMBER OF BYTES",
+        type=int,
+        default=None,
+        help="Maximum number of bytes downloaded by --auto-count-words"
+             " (optional)"
+    )
+    parser.add_argument(
+        "--saturation-threshold",
+        metavar="NUMBER OF WORDS",
+        type=float,
+        default=None,
+        help="Stop --auto-count-words when the average number of new words"
+             " per article drops below this value (optional)"
+    )
+    parser.add_argument(
+        "--saturation-window",
+        metavar="NUMBER OF PAGES",
+        type=int,
+        default=20,
+        help="Number of recent articles used by --saturation-threshold"
+             " (default: 20)"
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep per-article counts in an index next to the counts file"
+             " (data/word-counts.index.json by default), so that"
+             " counting an article again replaces its previous contribution"
+             " and unchanged articles are skipped (--count-words and"
+             " --auto-count-words)"
+    )
+    parser.add_argument(
+        "--ngram",
+        metavar="NUMBER OF WORDS",
+        type=int,
+        default=1,
+        help="Count sequences of this many words instead of single words"
+             " (--count-words and --auto-count-words). N-gram counts are"
+             " saved to data/<N>-gram-counts.json. Default: 1"
+    )
+    parser.add_argument(
+        "--max-ngrams",
+        metavar="NUMBER OF N-GRAMS",
+        type=int,
+        default=None,
+        help="Prune rare n-grams when more than this number is stored"
+             " during --auto-count-words (optional)"
+    )
+    parser.add_argument(
+        "--prune",
+        choices=["mediawiki", "bulbapedia"],
+        default=None,
+        help="Remove boilerplate (navigation boxes, references, edit links,"
+             " hidden metadata; with bulbapedia also learnset/stat tables"
+             " and project notices) before counting words and following"
+             " links (--count-words, --auto-count-words,"
+             " --count-listed-words). Prints what was removed per page."
+    )
+    parser.add_argument(
+        "--counting",
+        choices=["exact", "spill", "top-k"],
+        default="exact",
+        help="How --auto-count-words keeps the counts: exact (in memory),"
+             " spill (exact, spilled to disk above --memory-budget) or top-k"
+             " (approximate counts of the most frequent words within"
+             " --memory-budget, saved to data/word-counts.top-k.json)."
+             " Default: exact"
+    )
+    parser.add_argument(
+        "--memory-budget",
+        metavar="NUMBER OF MEGABYTES",
+        type=float,
+        default=None,
+        help="Memory for the counts (required for --counting spill/top-k)"
+    )
+    parser.add_argument(
+        "--also-crawl",
+        metavar=("WIKI URL", "ARTICLE TITLE"),
+        nargs=2,
+        action="append",
+        default=None,
+        help="Crawl another wiki from the given article at the same time"
+             " as --auto-count-words (can be repeated). Every wiki has its"
+             " own connections, --wait and counts file"
+             " (data/<host>-word-counts.json)."
+    )
+    parser.add_argument(
+        "--memory-report-every",
+        metavar="NUMBER OF PAGES",
+        type=positive_int,
+        default=None,
+        help="Print memory usage (allocated by Python and peak RSS) every"
+             " this many articles of --auto-count-words or"
+             " --count-listed-words (optional; slows the crawl down, not"
+             " available with --also-crawl)"
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="PATH",
+        type=str,
+        default=None,
+        help="Append every page downloaded by --auto-count-words or"
+             " --count-listed-words to a compressed WARC archive, which can"
+             " be processed again with --reprocess (optional)"
+    )
+    parser.add_argument(
+        "--term-matrix",
+        metavar="PATH",
+        type=str,
+        default=None,
+        help="Keep the counts of every article of --auto-count-words or"
+             " --count-listed-words as a row of a sparse document-term"
+             " matrix saved to this file (.npz; an existing matrix is"
+             " extended). With --mode tfidf: the matrix to analyze"
+             " (default: data/term-matrix.npz)"
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="NUMBER OF PROCESSES",
+        type=int,
+        default=None,
+        help="Run --auto-count-words with this number of worker processes"
+             " sharing a queue (requires --queue-dir)"
+    )
+    parser.add_argument(
+        "--queue-dir",
+        metavar="PATH",
+        type=str,
+        default=None,
+        help="Directory of the shared queue used with --workers"
+    )
+
+    # Arguments for --reprocess
+    parser.add_argument(
+        "--extract",
+        choices=["counts", "links", "tables"],
+        default="counts",
+        help="What --reprocess rebuilds: word counts (saved to"
+             " data/reprocessed-word-counts.json, replacing the file), the"
+             " link graph (JSON) or the table --number of every article"
+             " (CSV files)."
+             " Default: counts"
+    )
+    parser.add_argument(
+        "--processes",
+        metavar="NUMBER OF PROCESSES",
+        type=int,
+        default=None,
+        help="Number of processes used by --reprocess (default: one per"
+             " CPU core)"
+    )
+
+    # Arguments for fetching pages (used by every online mode)
+    parser.add_argument(
+        "--wiki-url",
+        metavar="URL",
+        type=str,
+        default=None,
+        help="URL of the wiki's articles (default:"
+             " https://bulbapedia.bulbagarden.net/wiki)"
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        metavar="NUMBER OF SECONDS",
+        type=float,
+        default=5.0,
+        help="Time of waiting (in seconds) for the connection with the wiki"
+             " (default: 5)"
+    )
+    parser.add_argument(
+        "--read-timeout",
+        metavar="NUMBER OF SECONDS",
+        type=float,
+        default=30.0,
+        help="Time of waiting (in seconds) for the data from the wiki"
+             " (default: 30)"
+    )
+    parser.add_argument(
+        "--retries",
+        metavar="NUMBER OF RETRIES",
+        type=int,
+        default=3,
+        help="Number of retries of a failed request (default: 3)"
+    )
+    parser.add_argument(
+        "--page-deadline",
+        metavar="NUMBER OF SECONDS",
+        type=float,
+        default=90.0,
+        help="Maximum time (in seconds) spent on fetching one page,"
+             " including retries (default: 90)"
+    )
+    parser.add_argument(
+        "--hedge-after",
+        metavar="NUMBER OF SECONDS",
+        type=float,
+        default=None,
+        help="Send a second request for a page if the first one didn't"
+             " finish after this time (optional)"
+    )
 
     # Arguments for --analyze-relative-word-frequency
     parser.add_argument(
         "--mode",
-        choices=["language", "article"],
+        choices=["language", "article", "keyness", "tfidf"],
         default=None,
         help="Mode of analyze (required for the analyze)."
              " required for --analyze-relative-word-frequency"
@@ -110,10 +379,23 @@ def parse_arguments():
         default=None,
         help="Path for saving the chart (optional)"
     )
+    parser.add_argument(
+        "--output",
+        metavar="PATH",
+        type=str,
+        default=None,
+        help="Path for saving the full keyness table as CSV"
+             " (optional, --mode keyness), the top words of every article"
+             " as CSV (optional, --mode tfidf) or for the results of"
+             " --reprocess (optional)"
+    )
 
     return parser.parse_args()
 
 if __name__ == "__main__":
     args = parse_arguments()
     controller = WebScraperController(args)
-    controller.execute()
+    try:
+        controller.execute()
+    finally:
+        controller.close()